@@ -1,20 +1,32 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from datetime import datetime
 from models.rag_chatbot import RAGChatbot
 from api.validators import (
     validate_add_document,
     validate_add_documents,
+    validate_ingest_ndjson_args,
     validate_chat_request,
     validate_retrieve_request,
+    validate_retrieve_batch_request,
+    validate_add_shards_request,
+    validate_snapshot_request,
     ValidationError
 )
 from utils.logger import setup_logger
 
 from flask import request, jsonify
 from werkzeug.utils import secure_filename
-from services.file_manager import FileManager
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import HTTPException
+from services.file_manager import FileManager, UPLOAD_MODES
+from services.job_queue import IngestionJobQueue, JobQueueFullError
+from services.collection_snapshot import list_snapshots
+from services.ndjson_ingest import ingest_ndjson
+from utils.upload_stream import receive_stream
 from config import Config
 import os
+import sys
+import json
 
 logger = setup_logger(__name__)
 
@@ -92,6 +104,40 @@ def add_documents():
         logger.error(f"Error in add_documents: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@api_bp.route('/ingest_ndjson', methods=['POST'])
+def ingest_ndjson_stream():
+    """Add documents from a streamed NDJSON body, one {"text", "metadata"} object per line
+    
+    The body is parsed as it arrives and written in batches; the response
+    streams NDJSON running counts, ending with a line where done is true.
+    The body is never held in memory, so it is limited by
+    NDJSON_MAX_BODY_BYTES rather than MAX_CONTENT_LENGTH.
+    """
+    try:
+        # Must be set before the stream is opened; None would fall back to MAX_CONTENT_LENGTH
+        request.max_content_length = Config.NDJSON_MAX_BODY_BYTES or sys.maxsize
+        
+        validated_data = validate_ingest_ndjson_args(request.args)
+        batch_size = min(validated_data['batch_size'], chatbot.vector_store.max_batch_size)
+        
+        updates = ingest_ndjson(request.stream, chatbot.add_documents_batch, batch_size)
+        
+        return Response(stream_with_context(json.dumps(update) + '\n' for update in updates),
+                        mimetype='application/x-ndjson')
+    
+    except ValidationError as e:
+        logger.warning(f"Validation error in ingest_ndjson: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+    
+    except HTTPException as e:
+        # e.g. 413 when the body exceeds NDJSON_MAX_BODY_BYTES
+        logger.warning(f"Rejected ingest_ndjson request: {str(e)}")
+        return jsonify({'error': e.description}), e.code
+    
+    except Exception as e:
+        logger.error(f"Error in ingest_ndjson: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @api_bp.route('/chat', methods=['POST'])
 def chat():
     """Chat endpoint"""
@@ -102,7 +148,9 @@ def chat():
         result = chatbot.chat(
             validated_data['query'],
             validated_data['conversation_id'],
-            validated_data['n_results']
+            validated_data['n_results'],
+            where=validated_data['where'],
+            where_document=validated_data['where_document']
         )
         
         return jsonify({
@@ -127,7 +175,10 @@ def retrieve():
         
         results = chatbot.retrieve_documents(
             validated_data['query'],
-            validated_data['n_results']
+            validated_data['n_results'],
+            validated_data['mode'],
+            validated_data['where'],
+            validated_data['where_document']
         )
         
         return jsonify({
@@ -144,6 +195,37 @@ def retrieve():
         logger.error(f"Error in retrieve: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@api_bp.route('/retrieve_batch', methods=['POST'])
+def retrieve_batch():
+    """Retrieve relevant documents for many queries in one request"""
+    try:
+        data = request.get_json()
+        validated_data = validate_retrieve_batch_request(data)
+        
+        results = chatbot.retrieve_documents_batch(
+            validated_data['queries'],
+            validated_data['n_results'],
+            validated_data['mode'],
+            validated_data['where'],
+            validated_data['where_document']
+        )
+        
+        return jsonify({
+            'success': True,
+            'results': [
+                {'query': query, 'results': query_results}
+                for query, query_results in zip(validated_data['queries'], results)
+            ]
+        })
+    
+    except ValidationError as e:
+        logger.warning(f"Validation error in retrieve_batch: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+    
+    except Exception as e:
+        logger.error(f"Error in retrieve_batch: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @api_bp.route('/collection_info', methods=['GET'])
 def collection_info():
     """Get information about the collection"""
@@ -155,6 +237,121 @@ def collection_info():
         logger.error(f"Error in collection_info: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@api_bp.route('/admin/shards', methods=['GET'])
+def list_shards():
+    """List collection shards and their document counts"""
+    try:
+        return jsonify({
+            'success': True,
+            'shards': chatbot.vector_store.list_shards()
+        })
+    
+    except Exception as e:
+        logger.error(f"Error in list_shards: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@api_bp.route('/admin/shards', methods=['POST'])
+def add_shards():
+    """Add shards and (by default) rebalance documents onto them"""
+    try:
+        validated_data = validate_add_shards_request(request.get_json(silent=True))
+        
+        result = chatbot.vector_store.add_shards(validated_data['count'], validated_data['rebalance'])
+        
+        return jsonify({
+            'success': True,
+            **result
+        })
+    
+    except ValidationError as e:
+        logger.warning(f"Validation error in add_shards: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+    
+    except Exception as e:
+        logger.error(f"Error in add_shards: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@api_bp.route('/admin/shards/rebalance', methods=['POST'])
+def rebalance_shards():
+    """Move documents to the shards they route to"""
+    try:
+        result = chatbot.vector_store.rebalance_shards()
+        
+        return jsonify({
+            'success': True,
+            **result
+        })
+    
+    except Exception as e:
+        logger.error(f"Error in rebalance_shards: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@api_bp.route('/admin/snapshots', methods=['GET'])
+def get_snapshots():
+    """List collection snapshots"""
+    try:
+        return jsonify({
+            'success': True,
+            'snapshots': list_snapshots(Config.SNAPSHOT_DIR)
+        })
+    
+    except Exception as e:
+        logger.error(f"Error in get_snapshots: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@api_bp.route('/admin/snapshots', methods=['POST'])
+def create_snapshot():
+    """Write a snapshot of the collection with its stored embeddings"""
+    try:
+        validated_data = validate_snapshot_request(request.get_json(silent=True), require_name=False)
+        name = validated_data['name'] or f"snapshot-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        
+        result = chatbot.vector_store.export_snapshot(os.path.join(Config.SNAPSHOT_DIR, name))
+        
+        return jsonify({
+            'success': True,
+            'name': name,
+            **result
+        })
+    
+    except ValidationError as e:
+        logger.warning(f"Validation error in create_snapshot: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+    
+    except ValueError as e:
+        logger.warning(f"Snapshot conflict in create_snapshot: {str(e)}")
+        return jsonify({'error': str(e)}), 409
+    
+    except Exception as e:
+        logger.error(f"Error in create_snapshot: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@api_bp.route('/admin/snapshots/restore', methods=['POST'])
+def restore_snapshot():
+    """Load a snapshot into the empty collection without re-embedding"""
+    try:
+        validated_data = validate_snapshot_request(request.get_json(silent=True), require_name=True)
+        
+        result = chatbot.vector_store.import_snapshot(os.path.join(Config.SNAPSHOT_DIR, validated_data['name']))
+        
+        return jsonify({
+            'success': True,
+            'name': validated_data['name'],
+            **result
+        })
+    
+    except ValidationError as e:
+        logger.warning(f"Validation error in restore_snapshot: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+    
+    except ValueError as e:
+        logger.warning(f"Snapshot conflict in restore_snapshot: {str(e)}")
+        return jsonify({'error': str(e)}), 409
+    
+    except Exception as e:
+        logger.error(f"Error in restore_snapshot: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @api_bp.route('/conversation/<conversation_id>', methods=['GET'])
 def get_conversation(conversation_id):
     """Get conversation history"""
@@ -184,6 +381,9 @@ def list_conversations():
 # Initialize file manager
 file_manager = FileManager(chatbot.vector_store)
 
+# Initialize background ingestion queue
+job_queue = IngestionJobQueue(file_manager)
+
 @api_bp.route('/upload_file', methods=['POST'])
 def upload_file():
     """Upload and process a single file"""
@@ -205,18 +405,39 @@ def upload_file():
         if 'description' in request.form:
             custom_metadata['description'] = request.form['description']
         
-        # Process file
-        result = file_manager.upload_and_process_file(file, custom_metadata)
+        # 'update' replaces the stored version of document_name, re-embedding only changed chunks
+        mode = request.form.get('mode', 'create')
+        if mode not in UPLOAD_MODES:
+            raise ValueError(f"Invalid mode '{mode}'. Supported modes: {', '.join(UPLOAD_MODES)}")
+        document_name = request.form.get('document_name')
         
-        if result['success']:
-            return jsonify(result), 200
-        else:
-            return jsonify(result), 409  # Conflict (duplicate)
+        # Save file and queue it for background ingestion
+        upload = file_manager.prepare_upload(file)
+        
+        if 'file_path' not in upload:
+            return jsonify(upload), 409  # Conflict (duplicate)
+        
+        try:
+            job = job_queue.submit_file(upload['file_path'], upload['filename'], custom_metadata,
+                                        upload['file_info'], document_name, mode)
+        except JobQueueFullError:
+            os.remove(upload['file_path'])
+            raise
+        
+        return jsonify({
+            'success': True,
+            'job': job,
+            'status_url': f"/jobs/{job['job_id']}"
+        }), 202
             
     except ValueError as e:
         logger.warning(f"Validation error in upload_file: {str(e)}")
         return jsonify({'error': str(e)}), 400
     
+    except JobQueueFullError as e:
+        logger.warning(f"Job queue full in upload_file: {str(e)}")
+        return jsonify({'error': str(e)}), 503
+    
     except Exception as e:
         logger.error(f"Error in upload_file: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -237,55 +458,156 @@ def upload_files():
         if 'tags' in request.form:
             custom_metadata['tags'] = request.form['tags']
         
-        # Process files
-        result = file_manager.upload_and_process_file(files, custom_metadata)
-        # result = file_manager.upload_multiple_files(files, custom_metadata)
+        # Save every file, then queue them together for parallel ingestion
+        uploads = []
+        results = []
+        seen_hashes = set()
+        for file in files:
+            try:
+                upload = file_manager.prepare_upload(file, seen_hashes)
+            except ValueError as e:
+                upload = {
+                    'success': False,
+                    'filename': file.filename,
+                    'error': str(e)
+                }
+            
+            if 'file_path' in upload:
+                uploads.append(upload)
+            else:
+                results.append(upload)
+        
+        if not uploads:
+            return jsonify({
+                'success': False,
+                'total_files_queued': 0,
+                'results': results
+            }), 409
         
+        try:
+            job = job_queue.submit_files(uploads, custom_metadata)
+        except JobQueueFullError as e:
+            for upload in uploads:
+                os.remove(upload['file_path'])
+            logger.warning(f"Job queue full in upload_files: {str(e)}")
+            return jsonify({'error': str(e)}), 503
         
-        return jsonify(result), 200
+        return jsonify({
+            'success': True,
+            'total_files_queued': len(uploads),
+            'job': job,
+            'status_url': f"/jobs/{job['job_id']}",
+            'results': results
+        }), 202
         
     except Exception as e:
         logger.error(f"Error in upload_files: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get status of a background ingestion job"""
+    try:
+        job = job_queue.get_job(job_id)
+        
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        return jsonify({
+            'success': True,
+            'job': job
+        })
+    except Exception as e:
+        logger.error(f"Error in get_job: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @api_bp.route('/uploaded_files', methods=['GET'])
 def get_uploaded_files():
-    """Get list of uploaded files"""
+    """Get a page of uploaded files (?limit=&offset=)"""
     try:
-        files = file_manager.get_uploaded_files()
+        limit = request.args.get('limit', 100, type=int)
+        offset = request.args.get('offset', 0, type=int)
+        if limit < 1 or limit > 1000 or offset < 0:
+            return jsonify({'error': 'limit must be between 1 and 1000 and offset must be non-negative'}), 400
+        
+        files = file_manager.get_uploaded_files(limit, offset)
         return jsonify({
             'success': True,
             'files': files,
-            'count': len(files)
+            'count': len(files),
+            'total': file_manager.count_uploaded_files(),
+            'limit': limit,
+            'offset': offset
         })
     except Exception as e:
         logger.error(f"Error in get_uploaded_files: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
-# Add to routes.py
 @api_bp.route('/upload_large_file', methods=['POST'])
 def upload_large_file():
-    """Handle large file uploads with streaming"""
+    """Handle large file uploads with streaming
+    
+    Accepts either a multipart 'file' part or a raw request body with the
+    filename given in the 'filename' query parameter. Either way the body is
+    spooled to disk and hashed as it arrives, and the file is queued for
+    background ingestion.
+    """
     try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
-        
-        file = request.files['file']
+        if request.files:
+            if 'file' not in request.files:
+                return jsonify({'error': 'No file provided'}), 400
+            file = request.files['file']
+            form = request.form
+        else:
+            filename = request.args.get('filename')
+            if not filename:
+                return jsonify({'error': 'No file provided'}), 400
+            file = FileStorage(stream=receive_stream(request.stream), filename=filename)
+            form = request.args
         
         # Get custom metadata from form data
         custom_metadata = {}
-        if 'category' in request.form:
-            custom_metadata['category'] = request.form['category']
-        if 'tags' in request.form:
-            custom_metadata['tags'] = request.form['tags']
-        if 'description' in request.form:
-            custom_metadata['description'] = request.form['description']
+        if 'category' in form:
+            custom_metadata['category'] = form['category']
+        if 'tags' in form:
+            custom_metadata['tags'] = form['tags']
+        if 'description' in form:
+            custom_metadata['description'] = form['description']
         
-        # Use the existing method (same as upload_file)
-        result = file_manager.upload_and_process_file(file, custom_metadata)
+        mode = form.get('mode', 'create')
+        if mode not in UPLOAD_MODES:
+            raise ValueError(f"Invalid mode '{mode}'. Supported modes: {', '.join(UPLOAD_MODES)}")
+        document_name = form.get('document_name')
         
-        return jsonify(result), 200
+        try:
+            upload = file_manager.prepare_upload(file)
+        finally:
+            file.close()
         
+        if 'file_path' not in upload:
+            return jsonify(upload), 409  # Conflict (duplicate)
+        
+        try:
+            job = job_queue.submit_file(upload['file_path'], upload['filename'], custom_metadata,
+                                        upload['file_info'], document_name, mode)
+        except JobQueueFullError:
+            os.remove(upload['file_path'])
+            raise
+        
+        return jsonify({
+            'success': True,
+            'job': job,
+            'status_url': f"/jobs/{job['job_id']}"
+        }), 202
+        
+    except ValueError as e:
+        logger.warning(f"Validation error in upload_large_file: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+    
+    except JobQueueFullError as e:
+        logger.warning(f"Job queue full in upload_large_file: {str(e)}")
+        return jsonify({'error': str(e)}), 503
+    
     except Exception as e:
         logger.error(f"Error in upload_large_file: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -309,12 +631,13 @@ def get_file_stats():
 def delete_file(file_hash):
     """Delete all documents associated with a file"""
     try:
-        success = file_manager.delete_file_documents(file_hash)
+        deleted = file_manager.delete_file_documents(file_hash)
         
-        if success:
+        if deleted is not None:
             return jsonify({
                 'success': True,
-                'message': 'File documents deleted successfully'
+                'message': 'File documents deleted successfully',
+                'documents_deleted': deleted
             })
         else:
             return jsonify({'error': 'File not found'}), 404
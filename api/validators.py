@@ -1,5 +1,7 @@
+import re
 from typing import Dict, Any, List, Optional
 from utils.logger import setup_logger
+from config import Config
 
 logger = setup_logger(__name__)
 
@@ -67,6 +69,21 @@ def validate_add_documents(data: Dict[str, Any]) -> Dict[str, Any]:
         'metadatas': metadatas
     }
 
+def validate_ingest_ndjson_args(args: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate NDJSON ingest query parameters"""
+    batch_size = args.get('batch_size', Config.NDJSON_BATCH_SIZE)
+    try:
+        batch_size = int(batch_size)
+    except (TypeError, ValueError):
+        raise ValidationError("batch_size must be an integer")
+    
+    if batch_size < 1 or batch_size > 10000:
+        raise ValidationError("batch_size must be between 1 and 10000")
+    
+    return {
+        'batch_size': batch_size
+    }
+
 def validate_chat_request(data: Dict[str, Any]) -> Dict[str, Any]:
     """Validate chat request"""
     if not data:
@@ -90,9 +107,77 @@ def validate_chat_request(data: Dict[str, Any]) -> Dict[str, Any]:
     return {
         'query': query.strip(),
         'conversation_id': conversation_id,
-        'n_results': n_results
+        'n_results': n_results,
+        **_validate_filters(data)
     }
 
+_WHERE_OPERATORS = ('$eq', '$ne', '$gt', '$gte', '$lt', '$lte', '$in', '$nin')
+
+def _validate_where(where: Any, field: str = 'where') -> None:
+    """Check a metadata filter against Chroma's filter syntax"""
+    if not isinstance(where, dict) or not where:
+        raise ValidationError(f"{field} must be a non-empty object")
+    
+    for key, condition in where.items():
+        if key in ('$and', '$or'):
+            if not isinstance(condition, list) or not condition:
+                raise ValidationError(f"{field}.{key} must be a non-empty array of filters")
+            for sub_where in condition:
+                _validate_where(sub_where, f"{field}.{key}")
+            continue
+        
+        if key.startswith('$'):
+            raise ValidationError(f"Unsupported operator {key} in {field}")
+        
+        conditions = condition.items() if isinstance(condition, dict) else [('$eq', condition)]
+        if not conditions:
+            raise ValidationError(f"{field}.{key} must not be empty")
+        
+        for operator, value in conditions:
+            if operator not in _WHERE_OPERATORS:
+                raise ValidationError(f"Unsupported operator {operator} in {field}.{key}")
+            values = value if operator in ('$in', '$nin') else [value]
+            if operator in ('$in', '$nin') and (not isinstance(value, list) or not value):
+                raise ValidationError(f"{field}.{key}.{operator} must be a non-empty array")
+            if not all(isinstance(item, (str, int, float, bool)) for item in values):
+                raise ValidationError(f"{field}.{key} values must be strings, numbers or booleans")
+
+def _validate_where_document(where_document: Any, field: str = 'where_document') -> None:
+    """Check a document text filter ($contains / $not_contains, combined with $and / $or)"""
+    if not isinstance(where_document, dict) or len(where_document) != 1:
+        raise ValidationError(f"{field} must be an object with exactly one operator")
+    
+    operator, value = next(iter(where_document.items()))
+    if operator in ('$and', '$or'):
+        if not isinstance(value, list) or not value:
+            raise ValidationError(f"{field}.{operator} must be a non-empty array of filters")
+        for sub_filter in value:
+            _validate_where_document(sub_filter, f"{field}.{operator}")
+    elif operator in ('$contains', '$not_contains'):
+        if not isinstance(value, str) or not value:
+            raise ValidationError(f"{field}.{operator} must be a non-empty string")
+    else:
+        raise ValidationError(f"Unsupported operator {operator} in {field}")
+
+def _validate_filters(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate the optional where / where_document retrieval filters"""
+    where = data.get('where')
+    if where is not None:
+        _validate_where(where)
+    
+    where_document = data.get('where_document')
+    if where_document is not None:
+        _validate_where_document(where_document)
+    
+    return {'where': where, 'where_document': where_document}
+
+def _validate_retrieval_mode(data: Dict[str, Any]) -> Optional[str]:
+    """Validate the optional retrieval mode; None means the configured default"""
+    mode = data.get('mode')
+    if mode is not None and mode not in ('dense', 'hybrid'):
+        raise ValidationError("mode must be 'dense' or 'hybrid'")
+    return mode
+
 def validate_retrieve_request(data: Dict[str, Any]) -> Dict[str, Any]:
     """Validate retrieve documents request"""
     if not data:
@@ -111,5 +196,70 @@ def validate_retrieve_request(data: Dict[str, Any]) -> Dict[str, Any]:
     
     return {
         'query': query.strip(),
-        'n_results': n_results
-    }
\ No newline at end of file
+        'n_results': n_results,
+        'mode': _validate_retrieval_mode(data),
+        **_validate_filters(data)
+    }
+
+def validate_retrieve_batch_request(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate batch retrieve request"""
+    if not data:
+        raise ValidationError("Request body is required")
+    
+    if 'queries' not in data:
+        raise ValidationError("Queries array is required")
+    
+    queries = data['queries']
+    if not isinstance(queries, list) or not queries:
+        raise ValidationError("Queries must be a non-empty array")
+    
+    if len(queries) > Config.MAX_BATCH_QUERIES:
+        raise ValidationError(f"At most {Config.MAX_BATCH_QUERIES} queries are allowed per batch")
+    
+    validated_queries = []
+    for i, query in enumerate(queries):
+        if not isinstance(query, str) or not query.strip():
+            raise ValidationError(f"Query at index {i} must be a non-empty string")
+        validated_queries.append(query.strip())
+    
+    n_results = data.get('n_results', 5)
+    if not isinstance(n_results, int) or n_results < 1 or n_results > 20:
+        raise ValidationError("n_results must be an integer between 1 and 20")
+    
+    return {
+        'queries': validated_queries,
+        'n_results': n_results,
+        'mode': _validate_retrieval_mode(data),
+        **_validate_filters(data)
+    }
+
+def validate_add_shards_request(data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Validate add shards request"""
+    data = data or {}
+    
+    count = data.get('count', 1)
+    if not isinstance(count, int) or isinstance(count, bool) or count < 1 or count > 64:
+        raise ValidationError("count must be an integer between 1 and 64")
+    
+    rebalance = data.get('rebalance', True)
+    if not isinstance(rebalance, bool):
+        raise ValidationError("rebalance must be a boolean")
+    
+    return {
+        'count': count,
+        'rebalance': rebalance
+    }
+
+_SNAPSHOT_NAME = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]{0,127}$')
+
+def validate_snapshot_request(data: Optional[Dict[str, Any]], require_name: bool) -> Dict[str, Any]:
+    """Validate create / restore snapshot request"""
+    data = data or {}
+    
+    name = data.get('name')
+    if name is None and not require_name:
+        return {'name': None}
+    if not isinstance(name, str) or not _SNAPSHOT_NAME.match(name) or name.endswith('.tmp'):
+        raise ValidationError("name must be 1-128 letters, digits, '.', '_' or '-', starting with a letter or digit")
+    
+    return {'name': name}
@@ -2,6 +2,7 @@ from flask import Flask
 from flask_cors import CORS
 from api.routes import api_bp
 from utils.logger import setup_logger
+from utils.upload_stream import HashingRequest
 from config import Config
 
 
@@ -11,6 +12,9 @@ logger = setup_logger(__name__)
 def create_app():
     """Application factory"""
     app = Flask(__name__)
+    
+    # Hash uploaded file parts while they are received
+    app.request_class = HashingRequest
 
     # Configure file uploads
     app.config['MAX_CONTENT_LENGTH'] = Config.MAX_FILE_SIZE #100MB
@@ -36,11 +40,19 @@ def main():
         logger.info("Available endpoints:")
         logger.info("  POST /add_document - Add single document")
         logger.info("  POST /add_documents - Add multiple documents")
+        logger.info("  POST /ingest_ndjson - Stream NDJSON documents in batches")
         logger.info("  POST /chat - Chat with the bot")
         logger.info("  POST /retrieve - Retrieve relevant documents")
+        logger.info("  POST /retrieve_batch - Retrieve documents for many queries at once")
         logger.info("  GET /collection_info - Get collection information")
+        logger.info("  GET/POST /admin/shards - List or add collection shards")
+        logger.info("  POST /admin/shards/rebalance - Move documents to their shards")
+        logger.info("  GET/POST /admin/snapshots - List or write collection snapshots")
+        logger.info("  POST /admin/snapshots/restore - Load a snapshot without re-embedding")
         logger.info("  GET /conversation/<id> - Get conversation history")
         logger.info("  GET /conversations - List all conversations")
+        logger.info("  POST /upload_file - Queue a file for ingestion")
+        logger.info("  GET /jobs/<id> - Get ingestion job status")
         logger.info("  GET /health - Health check")
         
         app.run(
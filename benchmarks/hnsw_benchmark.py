@@ -0,0 +1,151 @@
+"""Measure Chroma HNSW settings: recall@k against exact search, latency, build time and index size
+
+Usage:
+    python benchmarks/hnsw_benchmark.py [--n 50000] [--dim 384] [--queries 200] [--k 10]
+                                        [--space cosine] [--m 8,16,32] [--construction-ef 100,200]
+                                        [--search-ef 10,50,100,200] [files ...]
+
+Builds one collection per (space, M, construction_ef) combination from a
+synthetic clustered corpus, or from the given text files chunked with the
+app's splitter and embedded with the configured EMBEDDING_PROVIDER. Every
+search_ef is then measured on the same index. Queries run one at a time;
+recall@k is measured against exact brute-force search in the same space.
+The chosen values go in HNSW_M, HNSW_CONSTRUCTION_EF and HNSW_SEARCH_EF
+(or HNSW_COLLECTION_PARAMS).
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_index_benchmark import iter_vectors, make_queries
+
+BATCH = 5000
+
+def int_list(value: str):
+    return [int(item) for item in value.split(',')]
+
+def synthetic_corpus(n: int, dim: int, queries: int, seed: int):
+    """(vectors, queries) from the clustered generator of vector_index_benchmark"""
+    vectors = np.concatenate([block for _, block in iter_vectors(n, dim, seed)])
+    return vectors, make_queries(n, dim, queries, seed)
+
+def sample_corpus(paths, queries: int, seed: int):
+    """(vectors, queries) from text files: chunks as documents, the opening words of random chunks as queries"""
+    from config import Config
+    from utils.text_splitter import RecursiveTextSplitter
+    from services.embedding_provider import create_embedding_provider
+
+    splitter = RecursiveTextSplitter(Config.CHUNK_SIZE, Config.CHUNK_OVERLAP)
+    chunks = []
+    for path in paths:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            chunks.extend(splitter.split_text(f.read()))
+    if not chunks:
+        raise SystemExit("No text found in the given files")
+
+    rng = random.Random(seed)
+    picks = [rng.choice(chunks) for _ in range(queries)]
+    texts = [' '.join(chunk.split()[:rng.randint(4, 12)]) for chunk in picks]
+
+    embed = create_embedding_provider()
+    return np.asarray(embed(chunks), dtype=np.float32), np.asarray(embed(texts), dtype=np.float32)
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int, space: str) -> np.ndarray:
+    """Indexes of the true k nearest vectors of each query"""
+    if space == 'cosine':
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+    best_ids = []
+    for start in range(0, len(queries), 256):
+        block = queries[start:start + 256]
+        scores = block @ vectors.T
+        if space == 'l2':
+            # Rank by squared distance; the query's own norm does not change the order
+            scores = 2 * scores - np.einsum('ij,ij->i', vectors, vectors)
+        top = np.argpartition(-scores, min(k, len(vectors) - 1), axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        best_ids.append(np.take_along_axis(top, order, axis=1))
+    return np.concatenate(best_ids)
+
+def directory_mb(path: str) -> float:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names) / 1e6
+
+def measure(collection, queries: np.ndarray, truth: np.ndarray, k: int):
+    """(p50 ms, p99 ms, recall@k) of one-at-a-time queries"""
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        result = collection.query(query_embeddings=[query], n_results=k, include=[])
+        latencies.append(time.perf_counter() - started)
+        hits += len({int(doc_id) for doc_id in result['ids'][0]} & set(expected.tolist()))
+    return (float(np.percentile(latencies, 50) * 1000), float(np.percentile(latencies, 99) * 1000),
+            hits / (len(queries) * k))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*', help='Text files to embed instead of a synthetic corpus')
+    parser.add_argument('--n', type=int, default=50000, help='Number of synthetic vectors')
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--space', default='cosine', help='Comma-separated: l2, cosine, ip')
+    parser.add_argument('--m', type=int_list, default=[8, 16, 32])
+    parser.add_argument('--construction-ef', type=int_list, default=[100, 200])
+    parser.add_argument('--search-ef', type=int_list, default=[10, 50, 100, 200])
+    args = parser.parse_args()
+
+    import chromadb
+    from chromadb.api.client import SharedSystemClient
+
+    if args.files:
+        vectors, queries = sample_corpus(args.files, args.queries, args.seed)
+    else:
+        vectors, queries = synthetic_corpus(args.n, args.dim, args.queries, args.seed)
+    print(f"Corpus: {len(vectors)} x {vectors.shape[1]} vectors, {len(queries)} queries, k={args.k}")
+
+    print(f"{'space':<8}{'M':>5}{'c_ef':>6}{'s_ef':>6}{'build s':>10}{'index MB':>10}"
+          f"{'p50 ms':>10}{'p99 ms':>10}{'recall':>10}")
+    for space in args.space.split(','):
+        truth = exact_top_k(vectors, queries, args.k, space)
+        for m in args.m:
+            for construction_ef in args.construction_ef:
+                directory = tempfile.mkdtemp(prefix='hnsw-benchmark-')
+                try:
+                    client = chromadb.PersistentClient(path=directory)
+                    collection = client.create_collection(name='benchmark', configuration={'hnsw': {
+                        'space': space, 'max_neighbors': m, 'ef_construction': construction_ef,
+                        'ef_search': args.search_ef[0]
+                    }})
+
+                    started = time.perf_counter()
+                    for start in range(0, len(vectors), BATCH):
+                        block = vectors[start:start + BATCH]
+                        collection.add(ids=[str(i) for i in range(start, start + len(block))], embeddings=block)
+                    build_seconds = time.perf_counter() - started
+                    index_mb = directory_mb(directory)
+
+                    for search_ef in args.search_ef:
+                        # A loaded index keeps its ef_search, so reopen the collection after changing it
+                        collection.modify(configuration={'hnsw': {'ef_search': search_ef}})
+                        SharedSystemClient.clear_system_cache()
+                        collection = chromadb.PersistentClient(path=directory).get_collection(name='benchmark')
+                        p50, p99, recall = measure(collection, queries, truth, args.k)
+                        print(f"{space:<8}{m:>5}{construction_ef:>6}{search_ef:>6}{build_seconds:>10.1f}"
+                              f"{index_mb:>10.0f}{p50:>10.2f}{p99:>10.2f}{recall:>10.3f}")
+                finally:
+                    SharedSystemClient.clear_system_cache()
+                    shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Benchmark the built-in RecursiveTextSplitter against langchain's splitter
+
+Usage:
+    python benchmarks/text_splitter_benchmark.py [--size-mb 20] [files ...]
+
+Splits a synthetic corpus (or the given text files) with both splitters,
+checks that they produce identical chunks, and reports import time, split
+time and peak traced memory. langchain is only needed for the comparison.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import subprocess
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.text_splitter import RecursiveTextSplitter, DEFAULT_SEPARATORS
+
+WORDS = [
+    'policy', 'document', 'section', 'the', 'and', 'of', 'employee', 'shall', 'must', 'within',
+    'days', 'request', 'approval', 'manager', 'ERR-4021', 'SKU-88A', 'compliance', 'report'
+]
+
+def synthetic_corpus(size_bytes: int, seed: int = 0) -> str:
+    """Generate paragraph-structured text of roughly size_bytes"""
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    while total < size_bytes:
+        sentences = []
+        for _ in range(rng.randint(2, 8)):
+            sentence = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 30)))
+            sentences.append(sentence.capitalize() + rng.choice(['.', '.', '.', '?', '!']))
+        paragraph = ' '.join(sentences)
+        parts.append(paragraph)
+        total += len(paragraph) + 2
+    return '\n\n'.join(parts)
+
+def measure_import(statement: str) -> float:
+    """Time an import in a fresh interpreter"""
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if result.returncode != 0:
+        return float('nan')
+    return float(result.stdout.strip())
+
+def measure_split(split_func, text: str):
+    """Return (chunks, seconds, peak traced bytes) for one split"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = split_func(text)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return chunks, elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*', help='Text files to use instead of a synthetic corpus')
+    parser.add_argument('--size-mb', type=float, default=20, help='Synthetic corpus size in MB')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--chunk-overlap', type=int, default=200)
+    args = parser.parse_args()
+
+    if args.files:
+        texts = []
+        for path in args.files:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                texts.append(f.read())
+        text = '\n\n'.join(texts)
+    else:
+        text = synthetic_corpus(int(args.size_mb * 1024 * 1024))
+
+    print(f"Corpus: {len(text) / (1024 * 1024):.1f} MB, chunk_size={args.chunk_size}, overlap={args.chunk_overlap}")
+
+    native = RecursiveTextSplitter(args.chunk_size, args.chunk_overlap, DEFAULT_SEPARATORS)
+    native_spans, native_time, native_peak = measure_split(lambda t: list(native.iter_spans(t)), text)
+    native_import = measure_import('from utils.text_splitter import RecursiveTextSplitter')
+
+    print(f"{'splitter':<12}{'import s':>10}{'split s':>10}{'MB/s':>10}{'peak MB':>10}{'chunks':>10}")
+    print(f"{'native':<12}{native_import:>10.3f}{native_time:>10.2f}{len(text) / native_time / 1e6:>10.1f}"
+          f"{native_peak / 1e6:>10.1f}{len(native_spans):>10}")
+
+    try:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+    except ImportError:
+        print("langchain not installed; skipping comparison")
+        return
+
+    langchain_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        length_function=len,
+        separators=DEFAULT_SEPARATORS
+    )
+    langchain_chunks, langchain_time, langchain_peak = measure_split(langchain_splitter.split_text, text)
+    langchain_import = measure_import('from langchain.text_splitter import RecursiveCharacterTextSplitter')
+
+    print(f"{'langchain':<12}{langchain_import:>10.3f}{langchain_time:>10.2f}{len(text) / langchain_time / 1e6:>10.1f}"
+          f"{langchain_peak / 1e6:>10.1f}{len(langchain_chunks):>10}")
+
+    identical = langchain_chunks == [text[start:end] for start, end in native_spans]
+    print(f"Identical chunks: {identical}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Benchmark the flat NumPy index backend against Chroma's HNSW index
+
+Usage:
+    python benchmarks/vector_index_benchmark.py [--n 100000] [--dim 384] [--queries 200] [--k 10]
+                                                [--backends chroma,flat,flat-int8]
+
+Every backend is built from the same synthetic clustered embeddings in a
+fresh interpreter, so resident memory is measured per backend. Queries run
+one at a time; recall@k is measured against exact brute-force search.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BATCH = 5000
+
+def iter_vectors(n: int, dim: int, seed: int):
+    """Yield (start, block) of normalized clustered vectors, identical on every call"""
+    centers = np.random.default_rng(seed).normal(size=(max(1, n // 1000), dim)).astype(np.float32)
+    for start in range(0, n, BATCH):
+        rng = np.random.default_rng([seed, start])
+        count = min(BATCH, n - start)
+        block = centers[rng.integers(len(centers), size=count)] + 0.5 * rng.normal(size=(count, dim))
+        yield start, (block / np.linalg.norm(block, axis=1, keepdims=True)).astype(np.float32)
+
+def make_queries(n: int, dim: int, count: int, seed: int) -> np.ndarray:
+    """Noisy copies of random corpus vectors"""
+    rng = np.random.default_rng(seed + 1)
+    picks = set(rng.choice(n, size=count, replace=False).tolist())
+    base = np.concatenate([block[[i - start for i in range(start, start + len(block)) if i in picks]]
+                           for start, block in iter_vectors(n, dim, seed)])
+    queries = base + 0.1 * rng.normal(size=base.shape)
+    return (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+def exact_top_k(n: int, dim: int, seed: int, queries: np.ndarray, k: int) -> np.ndarray:
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_ids = np.zeros((len(queries), 0), dtype=np.int64)
+    for start, block in iter_vectors(n, dim, seed):
+        scores = np.concatenate([best_scores, queries @ block.T], axis=1)
+        ids = np.concatenate([best_ids, np.broadcast_to(np.arange(start, start + len(block)), (len(queries), len(block)))], axis=1)
+        top = np.argsort(-scores, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_ids = np.take_along_axis(ids, top, axis=1)
+    return best_ids
+
+def resident_mb() -> float:
+    """Current resident set size (Linux), else the peak"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_worker(args) -> None:
+    """Build one backend, query it and print a JSON result line"""
+    directory = tempfile.mkdtemp(prefix='vector-index-benchmark-')
+    try:
+        if args.worker == 'chroma':
+            import chromadb
+            client = chromadb.PersistentClient(path=directory)
+            collection = client.create_collection(name='benchmark')
+        else:
+            from services.flat_index import FlatIndexCollection
+            collection = FlatIndexCollection(directory, 'int8' if args.worker == 'flat-int8' else 'float32')
+
+        queries = make_queries(args.n, args.dim, args.queries, args.seed)
+        baseline = resident_mb()
+
+        started = time.perf_counter()
+        for start, block in iter_vectors(args.n, args.dim, args.seed):
+            collection.add(ids=[str(i) for i in range(start, start + len(block))], embeddings=block,
+                           documents=[f"document {i}" for i in range(start, start + len(block))])
+        build_seconds = time.perf_counter() - started
+
+        latencies = []
+        found = []
+        for query in queries:
+            started = time.perf_counter()
+            result = collection.query(query_embeddings=[query], n_results=args.k)
+            latencies.append(time.perf_counter() - started)
+            found.append([int(doc_id) for doc_id in result['ids'][0]])
+
+        print(json.dumps({
+            'build_s': build_seconds,
+            'p50_ms': float(np.percentile(latencies, 50) * 1000),
+            'p95_ms': float(np.percentile(latencies, 95) * 1000),
+            'rss_mb': resident_mb() - baseline,
+            'disk_mb': sum(os.path.getsize(os.path.join(root, name))
+                           for root, _, names in os.walk(directory) for name in names) / 1e6,
+            'ids': found
+        }))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=100000, help='Number of stored vectors')
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--backends', default='chroma,flat,flat-int8')
+    parser.add_argument('--worker', choices=['chroma', 'flat', 'flat-int8'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    print(f"Corpus: {args.n} x {args.dim} vectors, {args.queries} queries, k={args.k}")
+    truth = exact_top_k(args.n, args.dim, args.seed, make_queries(args.n, args.dim, args.queries, args.seed), args.k)
+
+    print(f"{'backend':<12}{'build s':>10}{'p50 ms':>10}{'p95 ms':>10}{'recall':>10}{'RSS MB':>10}{'disk MB':>10}")
+    for backend in args.backends.split(','):
+        command = [sys.executable, os.path.abspath(__file__), '--worker', backend, '--n', str(args.n),
+                   '--dim', str(args.dim), '--queries', str(args.queries), '--k', str(args.k), '--seed', str(args.seed)]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"{backend:<12}failed: {completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'unknown error'}")
+            continue
+
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        recall = np.mean([len(set(found) & set(expected)) / args.k for found, expected in zip(result['ids'], truth.tolist())])
+        print(f"{backend:<12}{result['build_s']:>10.1f}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+              f"{recall:>10.3f}{result['rss_mb']:>10.0f}{result['disk_mb']:>10.0f}")
+
+if __name__ == '__main__':
+    main()
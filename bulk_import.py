@@ -0,0 +1,248 @@
+"""Bulk import a directory tree or a tar/zip archive into the vector store
+
+Usage:
+    python bulk_import.py SOURCE [--workers 8] [--batch-files 32] [--checkpoint PATH] [--metadata JSON]
+
+Files are extracted in the shared process pool and written through the same
+FileManager path as HTTP uploads, so they are registered, deduplicated and
+listed like any other upload. Every finished file is appended to a JSONL
+checkpoint; rerunning the same command skips files already recorded there
+and retries the ones that failed.
+Archive members are staged into the upload folder one batch at a time.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import tarfile
+import zipfile
+import argparse
+from pathlib import Path
+from typing import Dict, Any, BinaryIO, Iterator, Tuple, Callable, Set
+
+from config import Config
+
+Entry = Tuple[str, Callable[[], str], bool]  # (key, materialize, staged)
+
+def iter_directory(root: str) -> Iterator[Entry]:
+    """Yield an entry for every file under root in a stable order"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            yield Path(os.path.relpath(path, root)).as_posix(), lambda path=path: path, False
+
+def iter_archive(archive_path: str, staging_dir: str) -> Iterator[Entry]:
+    """Yield an entry for every archive member; materialize copies it into staging_dir
+
+    Members are read in archive order, so materialize must be called before
+    advancing to the next member (compressed tars are read sequentially).
+    """
+    def stage(name: str, open_member: Callable[[], BinaryIO]) -> str:
+        staged_path = os.path.join(staging_dir, f".import_{uuid.uuid4().hex}_{Path(name).name}")
+        with open_member() as source, open(staged_path, 'wb') as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+        return staged_path
+
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                yield info.filename, lambda info=info: stage(info.filename, lambda: archive.open(info)), True
+    else:
+        with tarfile.open(archive_path, 'r:*') as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                yield member.name, lambda member=member: stage(member.name, lambda: archive.extractfile(member)), True
+
+# Checkpoint statuses a rerun skips; failed files are tried again
+DONE_STATUSES = ('imported', 'duplicate', 'unsupported')
+
+def load_checkpoint(checkpoint_path: str) -> Set[str]:
+    """Keys of files the checkpoint records as done"""
+    done = set()
+    if not os.path.exists(checkpoint_path):
+        return done
+
+    with open(checkpoint_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                if record.get('status') in DONE_STATUSES:
+                    done.add(record['key'])
+            except (ValueError, KeyError, AttributeError):
+                # A run killed mid-write can leave a truncated last line
+                continue
+    return done
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+class BulkImporter:
+    """Feeds files to FileManager in batches, checkpointing and reporting throughput"""
+
+    def __init__(self, file_manager, checkpoint_path: str, batch_files: int,
+                 custom_metadata: Dict[str, Any] = None):
+        self.file_manager = file_manager
+        self.batch_files = batch_files
+        self.custom_metadata = custom_metadata
+        self.done = load_checkpoint(checkpoint_path)
+        self.checkpoint = open(checkpoint_path, 'a', encoding='utf-8')
+        if self.checkpoint.tell() and not _ends_with_newline(checkpoint_path):
+            # Terminate a truncated last line so the next record starts cleanly
+            self.checkpoint.write('\n')
+        self.seen_hashes = set()
+        self.batch = []
+        self.counts = {'imported': 0, 'failed': 0, 'duplicate': 0, 'unsupported': 0, 'skipped': 0}
+        self.chunks = 0
+        self.embeddings = 0
+        self.started = time.perf_counter()
+
+    def run(self, entries: Iterator[Entry]) -> Dict[str, Any]:
+        """Import every entry not yet in the checkpoint"""
+        try:
+            for key, materialize, staged in entries:
+                if key in self.done:
+                    self.counts['skipped'] += 1
+                    continue
+
+                self._add(key, materialize, staged)
+
+            self._flush()
+        finally:
+            # Interrupted: staged members of the unprocessed batch are staged afresh on resume
+            for item in self.batch:
+                self._cleanup(item['file_path'], item['staged'])
+            self.batch = []
+            self.checkpoint.close()
+
+        self._report(final=True)
+        return {**self.counts, 'chunks_created': self.chunks, 'documents_added': self.embeddings}
+
+    def _add(self, key: str, materialize: Callable[[], str], staged: bool) -> None:
+        if not self.file_manager.is_allowed_file(key):
+            self._record(key, 'unsupported')
+            return
+
+        file_path = materialize()
+
+        try:
+            file_info = self.file_manager.file_processor.get_file_info(file_path, key)
+            duplicate = self.file_manager.find_duplicate(file_info['file_hash'], key, self.seen_hashes)
+        except Exception as e:
+            self._cleanup(file_path, staged)
+            self._record(key, 'failed', error=str(e))
+            return
+
+        if duplicate:
+            self._cleanup(file_path, staged)
+            self._record(key, 'duplicate', file_hash=file_info['file_hash'])
+            return
+
+        self.seen_hashes.add(file_info['file_hash'])
+        self.batch.append({'key': key, 'file_path': file_path, 'filename': key,
+                           'file_info': file_info, 'staged': staged})
+
+        if len(self.batch) >= self.batch_files:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Process the pending batch and checkpoint its files"""
+        if not self.batch:
+            return
+
+        batch, self.batch = self.batch, []
+        try:
+            result = self.file_manager.process_saved_files(batch, self.custom_metadata)
+        finally:
+            for item in batch:
+                self._cleanup(item['file_path'], item['staged'])
+
+        for item, file_result in zip(batch, result['results']):
+            if file_result['success']:
+                self.chunks += file_result['chunks_created']
+                self.embeddings += file_result['documents_added']
+                self._record(item['key'], 'imported', file_hash=item['file_info']['file_hash'],
+                             chunks=file_result['chunks_created'])
+            else:
+                self._record(item['key'], 'failed', error=file_result.get('error'))
+
+        self.checkpoint.flush()
+        os.fsync(self.checkpoint.fileno())
+        self._report()
+
+    def _record(self, key: str, status: str, **details) -> None:
+        self.counts[status] += 1
+        self.checkpoint.write(json.dumps({'key': key, 'status': status, **details}) + '\n')
+
+    @staticmethod
+    def _cleanup(file_path: str, staged: bool) -> None:
+        if staged and os.path.exists(file_path):
+            os.remove(file_path)
+
+    def _report(self, final: bool = False) -> None:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        processed = self.counts['imported'] + self.counts['failed']
+        print(
+            f"{'done' if final else 'progress'}: {self.counts['imported']} imported, {self.counts['failed']} failed, "
+            f"{self.counts['duplicate']} duplicate, {self.counts['unsupported']} unsupported, "
+            f"{self.counts['skipped']} already done | {processed / elapsed:.2f} files/s, "
+            f"{self.chunks / elapsed:.1f} chunks/s, {self.embeddings / elapsed:.1f} embeddings/s",
+            flush=True
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', help='Directory, .zip or .tar(.gz/.bz2/.xz) archive to import')
+    parser.add_argument('--workers', type=int, default=Config.PROCESS_POOL_WORKERS or os.cpu_count() or 1,
+                        help='Parallel extraction worker processes')
+    parser.add_argument('--batch-files', type=int, default=None,
+                        help='Files per extraction batch and checkpoint (default: 4 x workers)')
+    parser.add_argument('--checkpoint', default=None,
+                        help='JSONL checkpoint file (default: <source>.import-checkpoint.jsonl)')
+    parser.add_argument('--metadata', default=None, help='JSON object of custom metadata added to every chunk')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.source):
+        parser.error(f"Source not found: {args.source}")
+
+    custom_metadata = json.loads(args.metadata) if args.metadata else None
+    if custom_metadata is not None and not isinstance(custom_metadata, dict):
+        parser.error("--metadata must be a JSON object")
+
+    source = os.path.abspath(args.source).rstrip(os.sep)
+    checkpoint_path = args.checkpoint or f"{source}.import-checkpoint.jsonl"
+
+    # Size the shared pool before anything creates it
+    Config.PROCESS_POOL_WORKERS = args.workers
+
+    from services.vector_store import VectorStore
+    from services.file_manager import FileManager
+
+    file_manager = FileManager(VectorStore())
+
+    if os.path.isdir(source):
+        entries = iter_directory(source)
+    else:
+        entries = iter_archive(source, file_manager.upload_folder)
+
+    importer = BulkImporter(file_manager, checkpoint_path, args.batch_files or 4 * args.workers, custom_metadata)
+    print(f"Importing {source} with {args.workers} workers; checkpoint: {checkpoint_path} "
+          f"({len(importer.done)} files already done)", flush=True)
+
+    try:
+        summary = importer.run(entries)
+    except KeyboardInterrupt:
+        print("Interrupted; rerun the same command to resume", file=sys.stderr)
+        sys.exit(130)
+
+    sys.exit(1 if summary['failed'] else 0)
+
+if __name__ == '__main__':
+    main()
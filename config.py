@@ -1,4 +1,5 @@
 import os
+import json
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,6 +15,36 @@ class Config:
     CHROMA_DB_PATH = os.getenv('CHROMA_DB_PATH', './data/chroma_db')
     COLLECTION_NAME = os.getenv('COLLECTION_NAME', 'documents')
     
+    # Vector Index Backend ('chroma' or 'flat': exact search over a memory-mapped NumPy matrix)
+    VECTOR_BACKEND = os.getenv('VECTOR_BACKEND', 'chroma').lower()
+    FLAT_INDEX_PATH = os.getenv('FLAT_INDEX_PATH', './data/flat_index')
+    FLAT_INDEX_DTYPE = os.getenv('FLAT_INDEX_DTYPE', 'float32')
+    FLAT_INDEX_METADATA_KEYS = os.getenv('FLAT_INDEX_METADATA_KEYS', 'file_hash,source_type,category').split(',')
+    
+    # HNSW Index Parameters (chroma backend; space: l2, cosine or ip)
+    # HNSW_COLLECTION_PARAMS overrides them per collection, e.g. {"documents": {"search_ef": 200}}; shards inherit their collection's
+    HNSW_SPACE = os.getenv('HNSW_SPACE', 'l2')
+    HNSW_M = int(os.getenv('HNSW_M', '16'))
+    HNSW_CONSTRUCTION_EF = int(os.getenv('HNSW_CONSTRUCTION_EF', '100'))
+    HNSW_SEARCH_EF = int(os.getenv('HNSW_SEARCH_EF', '100'))
+    HNSW_COLLECTION_PARAMS = json.loads(os.getenv('HNSW_COLLECTION_PARAMS', '{}'))
+    
+    # Collection Sharding (SHARD_KEY: metadata key to route by, e.g. tenant or category; empty routes by file/document hash)
+    SHARD_COUNT = int(os.getenv('SHARD_COUNT', '1'))
+    SHARD_KEY = os.getenv('SHARD_KEY', '')
+    SHARD_QUERY_WORKERS = int(os.getenv('SHARD_QUERY_WORKERS', '8'))
+    SHARD_MANIFEST_PATH = os.getenv('SHARD_MANIFEST_PATH', './data/shards.json')
+    
+    # NDJSON Streaming Ingest (batches waiting for the writer before reading pauses)
+    NDJSON_BATCH_SIZE = int(os.getenv('NDJSON_BATCH_SIZE', '256'))
+    NDJSON_MAX_PENDING_BATCHES = int(os.getenv('NDJSON_MAX_PENDING_BATCHES', '4'))
+    NDJSON_MAX_LINE_BYTES = int(os.getenv('NDJSON_MAX_LINE_BYTES', str(10 * 1024 * 1024)))
+    NDJSON_MAX_BODY_BYTES = int(os.getenv('NDJSON_MAX_BODY_BYTES', '0'))  # 0 = no limit (MAX_CONTENT_LENGTH does not apply)
+    
+    # Collection Snapshots (SNAPSHOT_RESTORE_PATH: snapshot loaded at startup when the collection is empty)
+    SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', './data/snapshots')
+    SNAPSHOT_RESTORE_PATH = os.getenv('SNAPSHOT_RESTORE_PATH', '')
+    
     # Flask Configuration
     FLASK_ENV = os.getenv('FLASK_ENV', 'development')
     FLASK_DEBUG = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
@@ -25,6 +56,7 @@ class Config:
     
     # RAG Configuration
     DEFAULT_N_RESULTS = int(os.getenv('DEFAULT_N_RESULTS', '5'))
+    MAX_BATCH_QUERIES = int(os.getenv('MAX_BATCH_QUERIES', '256'))
     MAX_CONVERSATION_HISTORY = int(os.getenv('MAX_CONVERSATION_HISTORY', '10'))
 
     # File Upload Configuration
@@ -46,4 +78,60 @@ class Config:
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', './uploads')
     
     # Flask Upload Limits
-    MAX_CONTENT_LENGTH = MAX_FILE_SIZE  # Add this line
\ No newline at end of file
+    MAX_CONTENT_LENGTH = MAX_FILE_SIZE  # Add this line
+
+    # Background Ingestion Jobs
+    JOBS_DB_PATH = os.getenv('JOBS_DB_PATH', './data/jobs.db')
+    INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', '2'))
+    MAX_PENDING_JOBS = int(os.getenv('MAX_PENDING_JOBS', '100'))
+    JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '60'))  # Jobs whose worker stops renewing are taken over after this
+    INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '256'))
+    PROCESS_POOL_WORKERS = int(os.getenv('PROCESS_POOL_WORKERS', '0'))  # 0 = CPU count
+    UPLOAD_SPOOL_MAX_SIZE = int(os.getenv('UPLOAD_SPOOL_MAX_SIZE', str(1024 * 1024)))  # bytes kept in memory per upload
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '50'))
+    PDF_PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', '20'))
+
+    # Chunk Deduplication
+    ENABLE_CHUNK_DEDUPLICATION = os.getenv('ENABLE_CHUNK_DEDUPLICATION', 'True').lower() == 'true'
+    CHUNK_INDEX_DB_PATH = os.getenv('CHUNK_INDEX_DB_PATH', './data/chunk_index.db')
+
+    # Uploaded File Registry
+    FILE_REGISTRY_DB_PATH = os.getenv('FILE_REGISTRY_DB_PATH', './data/file_registry.db')
+
+    # Tabular Data Processing
+    CSV_STREAMING = os.getenv('CSV_STREAMING', 'True').lower() == 'true'
+    CSV_READ_ROWS = int(os.getenv('CSV_READ_ROWS', '10000'))
+    EXCEL_PARALLEL_SHEETS = os.getenv('EXCEL_PARALLEL_SHEETS', 'True').lower() == 'true'
+
+    # DOCX Processing
+    DOCX_SECTION_SIZE = int(os.getenv('DOCX_SECTION_SIZE', '20000'))  # Characters per extracted section
+
+    # Vector Store Maintenance
+    DELETE_BATCH_SIZE = int(os.getenv('DELETE_BATCH_SIZE', '5000'))
+
+    # Embedding Cache
+    ENABLE_EMBEDDING_CACHE = os.getenv('ENABLE_EMBEDDING_CACHE', 'True').lower() == 'true'
+    EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', './data/embedding_cache')
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv('EMBEDDING_CACHE_MAX_ENTRIES', '200000'))
+    EMBEDDING_CACHE_DTYPE = os.getenv('EMBEDDING_CACHE_DTYPE', 'float16')  # float16 or float32
+
+    # Embedding Provider
+    EMBEDDING_PROVIDER = os.getenv('EMBEDDING_PROVIDER', 'default')  # default, onnx, sentence-transformers, hashing
+    EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')  # sentence-transformers model name
+    EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '64'))
+    EMBEDDING_WORKERS = int(os.getenv('EMBEDDING_WORKERS', '1'))  # Batches embedded concurrently
+    EMBEDDING_THREADS = int(os.getenv('EMBEDDING_THREADS', '0'))  # Intra-op threads per batch, 0 = runtime default
+    EMBEDDING_WARMUP = os.getenv('EMBEDDING_WARMUP', 'True').lower() == 'true'
+    HASHING_EMBEDDING_DIM = int(os.getenv('HASHING_EMBEDDING_DIM', '384'))
+
+    # Add Coalescing (batch concurrent single-document adds)
+    ENABLE_ADD_COALESCING = os.getenv('ENABLE_ADD_COALESCING', 'False').lower() == 'true'
+    ADD_COALESCE_WINDOW_MS = float(os.getenv('ADD_COALESCE_WINDOW_MS', '5'))
+    ADD_COALESCE_MAX_DOCS = int(os.getenv('ADD_COALESCE_MAX_DOCS', '64'))
+    
+    # Lexical Index (BM25) and Hybrid Retrieval
+    ENABLE_LEXICAL_INDEX = os.getenv('ENABLE_LEXICAL_INDEX', 'True').lower() == 'true'
+    LEXICAL_INDEX_DB_PATH = os.getenv('LEXICAL_INDEX_DB_PATH', './data/lexical_index.db')
+    RETRIEVAL_MODE = os.getenv('RETRIEVAL_MODE', 'dense').lower()
+    HYBRID_CANDIDATES = int(os.getenv('HYBRID_CANDIDATES', '50'))
+    RRF_K = int(os.getenv('RRF_K', '60'))
@@ -28,18 +28,27 @@ class RAGChatbot:
         """Add multiple documents to vector store"""
         return self.vector_store.add_documents_batch(documents, metadatas)
     
-    def retrieve_documents(self, query: str, n_results: int = None) -> Dict[str, List]:
+    def retrieve_documents(self, query: str, n_results: int = None, mode: str = None,
+                           where: Optional[Dict[str, Any]] = None,
+                           where_document: Optional[Dict[str, Any]] = None) -> Dict[str, List]:
         """Retrieve relevant documents"""
-        return self.vector_store.retrieve_documents(query, n_results)
+        return self.vector_store.retrieve_documents(query, n_results, mode, where, where_document)
     
-    def chat(self, query: str, conversation_id: str = None, n_results: int = None) -> Dict[str, Any]:
-        """Main chat function"""
+    def retrieve_documents_batch(self, queries: List[str], n_results: int = None, mode: str = None,
+                                 where: Optional[Dict[str, Any]] = None,
+                                 where_document: Optional[Dict[str, Any]] = None) -> List[Dict[str, List]]:
+        """Retrieve relevant documents for several queries at once"""
+        return self.vector_store.retrieve_documents_batch(queries, n_results, mode, where, where_document)
+    
+    def chat(self, query: str, conversation_id: str = None, n_results: int = None,
+             where: Optional[Dict[str, Any]] = None, where_document: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Main chat function; where / where_document restrict the retrieved context"""
         try:
             # Get or create conversation
             conversation_id = self.conversation_manager.get_or_create_conversation(conversation_id)
             
             # Retrieve relevant documents
-            retrieved_docs = self.retrieve_documents(query, n_results)
+            retrieved_docs = self.retrieve_documents(query, n_results, where=where, where_document=where_document)
             
             # Get conversation history
             conversation_history = self.conversation_manager.get_conversation_history(conversation_id)
@@ -0,0 +1,110 @@
+import re
+import hashlib
+import unicodedata
+from collections import Counter
+from typing import Dict, List
+from utils.db import get_connection
+from utils.logger import setup_logger
+from config import Config
+
+logger = setup_logger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+
+class ChunkIndex:
+    """Persistent map of normalized chunk hashes to stored doc IDs with reference counts
+
+    A chunk that appears in several files is embedded and stored once; every
+    file that contains it holds a reference, and the vector is only deleted
+    when the last reference is released. The stored vector keeps the
+    metadata of the file that first contributed it.
+    """
+
+    def __init__(self, db_path: str = None):
+        """Initialize chunk index"""
+        self.db_path = db_path or Config.CHUNK_INDEX_DB_PATH
+
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunk_refs (
+                    chunk_hash TEXT PRIMARY KEY,
+                    doc_id TEXT NOT NULL UNIQUE,
+                    ref_count INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+
+        logger.info(f"Chunk index initialized. Database: {self.db_path}")
+
+    @property
+    def _conn(self):
+        return get_connection(self.db_path)
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """Hash chunk text after Unicode and whitespace normalization"""
+        normalized = _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', text)).strip()
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def lookup(self, chunk_hashes: List[str]) -> Dict[str, str]:
+        """Map the given chunk hashes to existing doc IDs"""
+        found = {}
+        unique_hashes = list(set(chunk_hashes))
+
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(unique_hashes), 500):
+            batch = unique_hashes[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT chunk_hash, doc_id FROM chunk_refs WHERE chunk_hash IN ({','.join('?' * len(batch))})",
+                batch
+            ).fetchall()
+            found.update((row['chunk_hash'], row['doc_id']) for row in rows)
+
+        return found
+
+    def add_references(self, chunk_hashes: List[str], created: Dict[str, str]) -> Dict[str, str]:
+        """Register newly stored chunks and add one reference per chunk occurrence
+
+        created maps hashes of freshly stored chunks to their doc IDs. Returns
+        the doc ID referenced for every hash that is present in the index; if
+        another writer stored the same chunk first, its doc ID wins.
+        """
+        counts = Counter(chunk_hashes)
+
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chunk_refs (chunk_hash, doc_id, ref_count) VALUES (?, ?, 0)",
+                list(created.items())
+            )
+            self._conn.executemany(
+                "UPDATE chunk_refs SET ref_count = ref_count + ? WHERE chunk_hash = ?",
+                [(count, chunk_hash) for chunk_hash, count in counts.items()]
+            )
+
+        return self.lookup(list(counts))
+
+    def release(self, doc_ids: List[str]) -> List[str]:
+        """Drop one reference per doc ID occurrence and return doc IDs with no references left
+
+        Doc IDs that were never registered are returned as well, so callers
+        can delete them unconditionally.
+        """
+        counts = Counter(doc_ids)
+        orphaned = []
+
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            for doc_id, count in counts.items():
+                row = self._conn.execute(
+                    "SELECT ref_count FROM chunk_refs WHERE doc_id = ?", (doc_id,)
+                ).fetchone()
+
+                if row is None or row['ref_count'] <= count:
+                    self._conn.execute("DELETE FROM chunk_refs WHERE doc_id = ?", (doc_id,))
+                    orphaned.append(doc_id)
+                else:
+                    self._conn.execute(
+                        "UPDATE chunk_refs SET ref_count = ref_count - ? WHERE doc_id = ?", (count, doc_id)
+                    )
+
+        return orphaned
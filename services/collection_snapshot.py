@@ -0,0 +1,144 @@
+import os
+import json
+import shutil
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from utils.db import get_connection
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+EMBEDDINGS_FILE = 'embeddings.float32'
+RECORDS_FILE = 'records.jsonl'
+
+# (ids, embeddings, documents, metadatas) of one page of documents
+Page = Tuple[List[str], np.ndarray, List[Optional[str]], List[Optional[Dict[str, Any]]]]
+
+def write_snapshot(path: str, pages: Iterable[Page], info: Dict[str, Any],
+                   databases: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Write pages of documents as a snapshot directory and return its manifest
+
+    Embeddings go to one raw float32 matrix that restore memory-maps; IDs,
+    texts and metadata go to a JSON-lines sidecar, row for row. databases
+    maps names to SQLite databases (file registry, chunk index) that are
+    copied alongside with the backup API before the documents are read, so
+    every chunk they reference was already written. The manifest is written last
+    and the directory is only moved into place when complete, so a partial
+    snapshot is never picked up.
+    """
+    if os.path.exists(path):
+        raise ValueError(f"Snapshot {path} already exists")
+
+    temp_path = f"{path}.tmp"
+    shutil.rmtree(temp_path, ignore_errors=True)
+    os.makedirs(temp_path)
+
+    count = 0
+    dimension = None
+    try:
+        copied = []
+        for name, db_path in (databases or {}).items():
+            if os.path.exists(db_path):
+                target = sqlite3.connect(os.path.join(temp_path, f'{name}.db'))
+                try:
+                    get_connection(db_path).backup(target)
+                finally:
+                    target.close()
+                copied.append(name)
+
+        with open(os.path.join(temp_path, EMBEDDINGS_FILE), 'wb') as vectors, \
+                open(os.path.join(temp_path, RECORDS_FILE), 'w', encoding='utf-8') as records:
+            for ids, embeddings, documents, metadatas in pages:
+                embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+                if dimension is None:
+                    dimension = embeddings.shape[1]
+                elif embeddings.shape[1] != dimension:
+                    raise ValueError(f"Embedding dimension changed from {dimension} to {embeddings.shape[1]}")
+
+                vectors.write(embeddings.tobytes())
+                records.writelines(
+                    json.dumps({'id': doc_id, 'document': document, 'metadata': metadata}, ensure_ascii=False) + '\n'
+                    for doc_id, document, metadata in zip(ids, documents, metadatas)
+                )
+                count += len(ids)
+
+        manifest = {
+            'format_version': FORMAT_VERSION,
+            'count': count,
+            'dimension': dimension or 0,
+            'created_at': datetime.now().isoformat(),
+            'databases': copied,
+            **info
+        }
+        with open(os.path.join(temp_path, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        os.replace(temp_path, path)
+    except Exception:
+        shutil.rmtree(temp_path, ignore_errors=True)
+        raise
+
+    logger.info(f"Wrote snapshot {path}: {count} documents, dimension {manifest['dimension']}")
+    return manifest
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    """Manifest of a snapshot directory"""
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise ValueError(f"{path} is not a complete snapshot")
+
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format version {manifest.get('format_version')}")
+    return manifest
+
+def read_snapshot(path: str, page_size: int) -> Iterator[Page]:
+    """Pages of a snapshot's documents; embeddings are slices of a memory map"""
+    manifest = read_manifest(path)
+    if manifest['count'] == 0:
+        return
+
+    vectors = np.memmap(os.path.join(path, EMBEDDINGS_FILE), dtype=np.float32, mode='r',
+                        shape=(manifest['count'], manifest['dimension']))
+
+    with open(os.path.join(path, RECORDS_FILE), encoding='utf-8') as records:
+        start = 0
+        while start < manifest['count']:
+            # One parse per page rather than per row
+            lines = [records.readline() for _ in range(min(page_size, manifest['count'] - start))]
+            rows = json.loads(f"[{','.join(lines)}]")
+            yield ([row['id'] for row in rows], vectors[start:start + len(rows)],
+                   [row['document'] for row in rows], [row['metadata'] for row in rows])
+            start += len(rows)
+
+def restore_databases(path: str, databases: Dict[str, str]) -> List[str]:
+    """Overwrite the named SQLite databases with the snapshot's copies; returns the names restored"""
+    restored = []
+    for name in read_manifest(path).get('databases', []):
+        if name not in databases:
+            continue
+        source = sqlite3.connect(os.path.join(path, f'{name}.db'))
+        try:
+            # Writes through the live connection, so other connections to the database see the copy
+            source.backup(get_connection(databases[name]))
+        finally:
+            source.close()
+        restored.append(name)
+    return restored
+
+def list_snapshots(directory: str) -> List[Dict[str, Any]]:
+    """Manifests of the complete snapshots in a directory, newest first"""
+    if not os.path.isdir(directory):
+        return []
+
+    snapshots = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if os.path.exists(os.path.join(path, MANIFEST_FILE)):
+            snapshots.append({'name': name, **read_manifest(path)})
+    return sorted(snapshots, key=lambda snapshot: snapshot['created_at'], reverse=True)
@@ -0,0 +1,276 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional, Callable
+import numpy as np
+from utils.db import get_connection
+from utils.logger import setup_logger
+from config import Config
+
+logger = setup_logger(__name__)
+
+class EmbeddingCache:
+    """Persistent content-addressed cache of embeddings for one embedding model
+
+    Vectors live in a fixed-capacity memory-mapped matrix (float16 by
+    default); a SQLite index maps text hashes to matrix rows and tracks last
+    use. When the cache is full, the least recently used rows are reused.
+    Row allocation happens inside an immediate transaction, so several
+    processes can share one cache directory. Lookups only read: every row
+    carries a tag of the hash it holds, checked around each copy, so a row
+    that another process is reusing reads as a miss.
+    """
+
+    # Recorded uses written in one transaction once this many pile up
+    TOUCH_FLUSH_SIZE = 1000
+
+    def __init__(self, model_name: str, cache_dir: str = None, max_entries: int = None, dtype: str = None):
+        """Initialize embedding cache"""
+        self.model_name = model_name
+        self.cache_dir = cache_dir or Config.EMBEDDING_CACHE_PATH
+        self.max_entries = max_entries or Config.EMBEDDING_CACHE_MAX_ENTRIES
+        self.dtype = np.dtype(dtype or Config.EMBEDDING_CACHE_DTYPE)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        base_name = re.sub(r'[^A-Za-z0-9_.-]', '_', model_name)
+        self.db_path = os.path.join(self.cache_dir, f"{base_name}.db")
+        self.vectors_path = os.path.join(self.cache_dir, f"{base_name}.{self.dtype.name}.vectors")
+        self.tags_path = os.path.join(self.cache_dir, f"{base_name}.{self.dtype.name}.tags")
+
+        self.hits = 0
+        self.misses = 0
+        self._vectors = None
+        self._tags = None
+        self._touched = {}  # {text_hash: last use not yet written}
+        self._lock = threading.Lock()
+
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    text_hash TEXT PRIMARY KEY,
+                    slot INTEGER NOT NULL UNIQUE,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries (last_used)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+            # Capacity was lowered since the cache was written
+            self._conn.execute("DELETE FROM entries WHERE slot >= ?", (self.max_entries,))
+
+        logger.info(f"Embedding cache initialized for {model_name}. Path: {self.vectors_path}")
+
+    @property
+    def _conn(self):
+        return get_connection(self.db_path)
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """Hash the exact text that would be embedded"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _tag(text_hash: str) -> bytes:
+        return bytes.fromhex(text_hash[:32])
+
+    def round(self, vector: Any) -> np.ndarray:
+        """A vector as it reads back from the cache, so hits and misses embed a text identically"""
+        return np.asarray(vector, dtype=self.dtype).astype(np.float32)
+
+    def _open_vectors(self, dimension: int) -> Optional[np.memmap]:
+        """Map the vector and tag files, creating them for the given dimension if needed"""
+        if self._vectors is not None:
+            return self._vectors
+
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'dimension'").fetchone()
+        if row is None:
+            if dimension is None:
+                return None
+            with self._conn:
+                self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('dimension', ?)", (str(dimension),))
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'dimension'").fetchone()
+
+        stored_dimension = int(row['value'])
+        tags_exist = os.path.exists(self.tags_path)
+
+        # Sparse preallocation; grows in place if the capacity was raised
+        for path, size in ((self.vectors_path, self.max_entries * stored_dimension * self.dtype.itemsize),
+                           (self.tags_path, self.max_entries * 16)):
+            with open(path, 'ab') as f:
+                if f.tell() < size:
+                    f.truncate(size)
+
+        self._tags = np.memmap(self.tags_path, dtype=np.uint8, mode='r+', shape=(self.max_entries, 16))
+        if not tags_exist:
+            # Cache written before rows were tagged: its rows hold what the index says
+            for entry in self._conn.execute("SELECT text_hash, slot FROM entries"):
+                self._tags[entry['slot']] = np.frombuffer(self._tag(entry['text_hash']), dtype=np.uint8)
+            self._tags.flush()
+
+        self._vectors = np.memmap(self.vectors_path, dtype=self.dtype, mode='r+',
+                                  shape=(self.max_entries, stored_dimension))
+        return self._vectors
+
+    def _lookup_slots(self, text_hashes: List[str]) -> Dict[str, int]:
+        slots = {}
+        unique_hashes = list(set(text_hashes))
+
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(unique_hashes), 500):
+            batch = unique_hashes[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT text_hash, slot FROM entries WHERE text_hash IN ({','.join('?' * len(batch))})",
+                batch
+            ).fetchall()
+            slots.update((row['text_hash'], row['slot']) for row in rows)
+
+        return slots
+
+    def get_many(self, text_hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Return cached float32 vectors for the given hashes and record their use"""
+        found = {}
+        with self._lock:
+            vectors = self._open_vectors(None)
+
+        if vectors is not None:
+            with self._conn:
+                # One snapshot for all batches of the lookup
+                self._conn.execute("BEGIN")
+                slots = self._lookup_slots(text_hashes)
+
+            tags = self._tags
+            for text_hash, slot in slots.items():
+                tag = self._tag(text_hash)
+                if tags[slot].tobytes() != tag:
+                    continue
+                vector = np.array(vectors[slot], dtype=np.float32)
+                # Still tagged for this hash after the copy, so no writer touched the row meanwhile
+                if tags[slot].tobytes() == tag:
+                    found[text_hash] = vector
+
+        with self._lock:
+            now = time.time()
+            self._touched.update(dict.fromkeys(found, now))
+            flush = len(self._touched) >= self.TOUCH_FLUSH_SIZE
+
+            hits = sum(1 for text_hash in text_hashes if text_hash in found)
+            self.hits += hits
+            self.misses += len(text_hashes) - hits
+
+        if flush:
+            with self._conn:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._write_touches()
+
+        return found
+
+    def _write_touches(self) -> None:
+        """Write the recorded uses inside the current transaction"""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        self._conn.executemany(
+            "UPDATE entries SET last_used = MAX(last_used, ?) WHERE text_hash = ?",
+            [(last_used, text_hash) for text_hash, last_used in touched.items()]
+        )
+
+    def put_many(self, entries: Dict[str, np.ndarray]) -> None:
+        """Store vectors by text hash, evicting least recently used entries when full"""
+        if not entries:
+            return
+
+        with self._lock:
+            dimension = len(next(iter(entries.values())))
+            vectors = self._open_vectors(dimension)
+            if vectors.shape[1] != dimension:
+                logger.warning(f"Embedding dimension {dimension} does not match cache dimension {vectors.shape[1]}; not caching")
+                return
+
+        # More new vectors than the cache holds: keep the last ones
+        items = list(entries.items())[-self.max_entries:]
+        now = time.time()
+
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+
+            # Recent hits count before choosing what to evict
+            self._write_touches()
+
+            # Another process may have cached some of these meanwhile
+            existing = self._lookup_slots([text_hash for text_hash, _ in items])
+            items = [(text_hash, vector) for text_hash, vector in items if text_hash not in existing]
+            if not items:
+                return
+
+            next_slot = self._conn.execute("SELECT COALESCE(MAX(slot) + 1, 0) FROM entries").fetchone()[0]
+            slots = list(range(next_slot, min(next_slot + len(items), self.max_entries)))
+
+            shortfall = len(items) - len(slots)
+            if shortfall > 0:
+                evicted = self._conn.execute(
+                    "SELECT text_hash, slot FROM entries ORDER BY last_used LIMIT ?", (shortfall,)
+                ).fetchall()
+                self._conn.executemany("DELETE FROM entries WHERE text_hash = ?",
+                                       [(row['text_hash'],) for row in evicted])
+                slots.extend(row['slot'] for row in evicted)
+
+            # Untag rows before overwriting them, so concurrent readers see a miss rather than a mix
+            self._tags[slots] = 0
+            for (_, vector), slot in zip(items, slots):
+                vectors[slot] = np.asarray(vector, dtype=self.dtype)
+            for (text_hash, _), slot in zip(items, slots):
+                self._tags[slot] = np.frombuffer(self._tag(text_hash), dtype=np.uint8)
+            vectors.flush()
+            self._tags.flush()
+
+            self._conn.executemany(
+                "INSERT INTO entries (text_hash, slot, last_used) VALUES (?, ?, ?)",
+                [(text_hash, slot, now) for (text_hash, _), slot in zip(items, slots)]
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process and current cache size"""
+        lookups = self.hits + self.misses
+        return {
+            'model': self.model_name,
+            'entries': self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0],
+            'max_entries': self.max_entries,
+            'dtype': self.dtype.name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None
+        }
+
+class CachedEmbeddingFunction:
+    """Embedding callable that serves repeated texts from an EmbeddingCache
+
+    Only texts missing from the cache reach the wrapped embedding function.
+    """
+
+    def __init__(self, embedding_function: Callable[[List[str]], Any], model_name: str,
+                 cache: Optional[EmbeddingCache] = None):
+        self.embedding_function = embedding_function
+        self.cache = cache or EmbeddingCache(model_name)
+
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        text_hashes = [EmbeddingCache.hash_text(text) for text in input]
+        cached = self.cache.get_many(text_hashes)
+
+        # Embed each missing text once, even if it repeats within the call
+        missing = {}
+        for text, text_hash in zip(input, text_hashes):
+            if text_hash not in cached:
+                missing.setdefault(text_hash, text)
+
+        if missing:
+            embedded = self.embedding_function(list(missing.values()))
+            # Rounded to the cache dtype, as later hits for these texts will be
+            new_vectors = {
+                text_hash: self.cache.round(vector)
+                for text_hash, vector in zip(missing, embedded)
+            }
+            self.cache.put_many(new_vectors)
+            cached.update(new_vectors)
+
+        return [cached[text_hash] for text_hash in text_hashes]
@@ -0,0 +1,173 @@
+import os
+import re
+import hashlib
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Type
+import numpy as np
+from utils.logger import setup_logger
+from config import Config
+
+logger = setup_logger(__name__)
+
+class EmbeddingProvider(ABC):
+    """Base class for local embedding models
+
+    Texts are embedded in batches of EMBEDDING_BATCH_SIZE; with
+    EMBEDDING_WORKERS > 1, batches run concurrently on a thread pool (ONNX
+    Runtime and torch release the GIL while computing).
+    """
+
+    def __init__(self, batch_size: int = None, workers: int = None):
+        self.batch_size = batch_size or Config.EMBEDDING_BATCH_SIZE
+        self.workers = workers or Config.EMBEDDING_WORKERS
+        self._executor = ThreadPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+
+    @property
+    @abstractmethod
+    def model_name(self) -> str:
+        """Identifies the vectors this provider produces, e.g. for cache keys"""
+
+    @abstractmethod
+    def _embed_batch(self, texts: List[str]) -> List[np.ndarray]:
+        """Embed one batch of texts"""
+
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        batches = [input[start:start + self.batch_size] for start in range(0, len(input), self.batch_size)]
+
+        if self._executor is None or len(batches) < 2:
+            results = map(self._embed_batch, batches)
+        else:
+            results = self._executor.map(self._embed_batch, batches)
+
+        return [np.asarray(vector, dtype=np.float32) for batch in results for vector in batch]
+
+    def warm_up(self) -> None:
+        """Load the model and run one batch so the first request doesn't pay for it"""
+        try:
+            self._embed_batch(["warm up"])
+            logger.info(f"Embedding provider warmed up: {self.model_name}")
+        except Exception as e:
+            # Not fatal: the model loads on first use instead (e.g. once it can be downloaded)
+            logger.warning(f"Embedding provider warm-up failed: {str(e)}")
+
+class DefaultEmbeddingProvider(EmbeddingProvider):
+    """Chroma's default embedding function (all-MiniLM-L6-v2 on ONNX Runtime)"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        from chromadb.utils import embedding_functions
+        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+
+    @property
+    def model_name(self) -> str:
+        return 'default'
+
+    def _embed_batch(self, texts: List[str]) -> List[np.ndarray]:
+        return self.embedding_function(texts)
+
+def _threaded_onnx_mini_lm(threads: int = 0):
+    """Chroma's ONNX all-MiniLM-L6-v2 on CPU with a configurable intra-op thread count"""
+    # chromadb is only needed by the providers that use its bundled model
+    from functools import cached_property
+    from chromadb.utils.embedding_functions.onnx_mini_lm_l6_v2 import ONNXMiniLM_L6_V2
+
+    class ThreadedONNXMiniLM(ONNXMiniLM_L6_V2):
+        @cached_property
+        def model(self):
+            options = self.ort.SessionOptions()
+            options.log_severity_level = 3
+            options.graph_optimization_level = self.ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if threads:
+                options.intra_op_num_threads = threads
+
+            return self.ort.InferenceSession(
+                os.path.join(self.DOWNLOAD_PATH, self.EXTRACTED_FOLDER_NAME, "model.onnx"),
+                providers=self._preferred_providers,
+                sess_options=options
+            )
+
+    return ThreadedONNXMiniLM(preferred_providers=['CPUExecutionProvider'])
+
+class OnnxEmbeddingProvider(EmbeddingProvider):
+    """all-MiniLM-L6-v2 on ONNX Runtime with explicit CPU thread settings"""
+
+    def __init__(self, threads: int = None, **kwargs):
+        super().__init__(**kwargs)
+        self.embedding_function = _threaded_onnx_mini_lm(threads if threads is not None else Config.EMBEDDING_THREADS)
+
+    @property
+    def model_name(self) -> str:
+        # Same vectors as the default provider, so the cache is shared
+        return 'default'
+
+    def _embed_batch(self, texts: List[str]) -> List[np.ndarray]:
+        return self.embedding_function(texts)
+
+class SentenceTransformerEmbeddingProvider(EmbeddingProvider):
+    """Any sentence-transformers model on CPU (needs the sentence-transformers package)"""
+
+    def __init__(self, model: str = None, threads: int = None, **kwargs):
+        super().__init__(**kwargs)
+        try:
+            import torch
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError("The sentence-transformers embedding provider needs: pip install sentence-transformers")
+
+        threads = threads if threads is not None else Config.EMBEDDING_THREADS
+        if threads:
+            torch.set_num_threads(threads)
+
+        self.model = model or Config.EMBEDDING_MODEL
+        self.encoder = SentenceTransformer(self.model, device='cpu')
+
+    @property
+    def model_name(self) -> str:
+        return f"sentence-transformers-{self.model}"
+
+    def _embed_batch(self, texts: List[str]) -> List[np.ndarray]:
+        return list(self.encoder.encode(texts, batch_size=len(texts), convert_to_numpy=True))
+
+_TOKEN = re.compile(r'\w+')
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """Deterministic bag-of-words hashing embedder for tests and offline runs; no model download"""
+
+    def __init__(self, dimension: int = None, **kwargs):
+        super().__init__(**kwargs)
+        self.dimension = dimension or Config.HASHING_EMBEDDING_DIM
+
+    @property
+    def model_name(self) -> str:
+        return f"hashing-{self.dimension}"
+
+    def _embed_batch(self, texts: List[str]) -> List[np.ndarray]:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+
+        for row, text in enumerate(texts):
+            for token in _TOKEN.findall(text.lower()):
+                digest = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+                # Signed hashing keeps collisions from only ever adding up
+                vectors[row, digest % self.dimension] += 1.0 if digest >> 63 else -1.0
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return list(vectors / np.where(norms == 0, 1.0, norms))
+
+EMBEDDING_PROVIDERS: Dict[str, Type[EmbeddingProvider]] = {
+    'default': DefaultEmbeddingProvider,
+    'onnx': OnnxEmbeddingProvider,
+    'sentence-transformers': SentenceTransformerEmbeddingProvider,
+    'hashing': HashingEmbeddingProvider,
+}
+
+def create_embedding_provider(name: Optional[str] = None) -> EmbeddingProvider:
+    """Build the embedding provider selected by name or EMBEDDING_PROVIDER"""
+    name = (name or Config.EMBEDDING_PROVIDER).lower()
+    if name not in EMBEDDING_PROVIDERS:
+        raise ValueError(f"Unknown embedding provider '{name}'. Supported providers: {', '.join(EMBEDDING_PROVIDERS)}")
+
+    provider = EMBEDDING_PROVIDERS[name]()
+    logger.info(f"Embedding provider: {name} ({provider.model_name}), batch size {provider.batch_size}, "
+                f"{provider.workers} worker(s)")
+    return provider
@@ -1,17 +1,77 @@
 import os
 import shutil
-from typing import List, Dict, Any, Optional
+import uuid
+import queue
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from pathlib import Path
 from werkzeug.utils import secure_filename
 from werkzeug.datastructures import FileStorage
 
-from services.file_processor import FileProcessor
+from services.file_processor import FileProcessor, stream_file_chunks
+from services.chunk_index import ChunkIndex
 from services.vector_store import VectorStore
 from utils.logger import setup_logger
+from utils.process_pool import get_manager, get_process_pool, get_process_pool_size
+from utils.upload_stream import HashingSpooledFile
 from config import Config
 
 logger = setup_logger(__name__)
 
+UPLOAD_MODES = ('create', 'update')
+
+class _BatchWriter:
+    """Buffers chunks from many files and writes them to the vector store in fixed-size batches"""
+    
+    def __init__(self, add_chunks: Callable[..., Tuple[List[str], List[bool]]], batch_size: int,
+                 chunks_callback: Optional[Callable[[str, List[str]], None]] = None):
+        self.add_chunks = add_chunks
+        self.batch_size = batch_size
+        self.chunks_callback = chunks_callback
+        self.pending = []  # [(file_key, chunk_data)]
+        self.doc_ids = {}  # {file_key: [doc_id, ...]}
+        self.chunk_hashes = {}  # {file_key: [chunk_hash, ...]}
+        self.embedded = {}  # {file_key: number of newly embedded chunks}
+        self.stored = {}  # {file_key: {doc_id of a chunk stored under this file}}
+        self.errors = {}  # {file_key: error message}
+        self.written = 0
+    
+    def add(self, file_key: str, chunks: List[Dict[str, Any]]) -> None:
+        """Queue a file's chunks, flushing every full batch"""
+        for chunk_data in chunks:
+            self.pending.append((file_key, chunk_data))
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+    
+    def flush(self) -> None:
+        """Write all pending chunks as one batch"""
+        if not self.pending:
+            return
+        
+        batch, self.pending = self.pending, []
+        chunk_hashes = [ChunkIndex.hash_text(chunk_data['text']) for _, chunk_data in batch]
+        try:
+            doc_ids, new_flags = self.add_chunks([chunk_data for _, chunk_data in batch], chunk_hashes)
+        except Exception as e:
+            logger.error(f"Error writing batch of {len(batch)} chunks: {str(e)}")
+            for file_key, _ in batch:
+                self.errors[file_key] = str(e)
+            return
+        
+        if self.chunks_callback:
+            by_file = {}
+            for (file_key, _), doc_id in zip(batch, doc_ids):
+                by_file.setdefault(file_key, []).append(doc_id)
+            for file_key, file_doc_ids in by_file.items():
+                self.chunks_callback(file_key, file_doc_ids)
+        
+        for (file_key, _), doc_id, chunk_hash, is_new in zip(batch, doc_ids, chunk_hashes, new_flags):
+            self.doc_ids.setdefault(file_key, []).append(doc_id)
+            self.chunk_hashes.setdefault(file_key, []).append(chunk_hash)
+            self.embedded[file_key] = self.embedded.get(file_key, 0) + is_new
+            if is_new:
+                self.stored.setdefault(file_key, set()).add(doc_id)
+        self.written += len(doc_ids)
+
 class FileManager:
     def __init__(self, vector_store: VectorStore):
         """Initialize file manager"""
@@ -22,8 +82,11 @@ class FileManager:
         # Create upload directory if it doesn't exist
         Path(self.upload_folder).mkdir(parents=True, exist_ok=True)
         
-        # Track uploaded files (in production, use database)
-        self.uploaded_files = {}  # {file_hash: file_info}
+        # Track uploaded files in a registry shared by all worker processes
+        self.file_registry = vector_store.file_registry
+        
+        # Shared chunk hashes so repeated chunks are stored once
+        self.chunk_index = ChunkIndex() if Config.ENABLE_CHUNK_DEDUPLICATION else None
         
         logger.info(f"File manager initialized. Upload folder: {self.upload_folder}")
     
@@ -35,79 +98,340 @@ class FileManager:
         extension = Path(filename).suffix.lower().lstrip('.')
         return extension in Config.ALLOWED_EXTENSIONS
     
-    def upload_and_process_file(self, file: FileStorage, 
-                               custom_metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Upload file, process it, and add to vector store"""
+    def prepare_upload(self, file: FileStorage, seen_hashes: Optional[set] = None) -> Dict[str, Any]:
+        """Validate an upload, reject duplicates by hash, and save it into the upload folder
+        
+        Returns the saved file's path, name and info, or the duplicate response
+        when the same content was already uploaded.
+        """
+        if not file or not file.filename:
+            raise ValueError("No file provided")
+        
+        if not self.is_allowed_file(file.filename):
+            raise ValueError(f"File type not allowed. Supported types: {', '.join(Config.ALLOWED_EXTENSIONS)}")
+        
+        # Secure filename
+        filename = secure_filename(file.filename)
+        if not filename:
+            raise ValueError("Invalid filename")
+        
+        # Prefix with a unique ID so concurrent uploads of the same name don't collide
+        file_path = os.path.join(self.upload_folder, f"{uuid.uuid4().hex}_{filename}")
+        
+        stream = file.stream
+        if isinstance(stream, HashingSpooledFile):
+            # Hash was computed while the body was received; reject before touching the content
+            duplicate = self.find_duplicate(stream.hexdigest(), filename, seen_hashes)
+            if duplicate:
+                return duplicate
+            
+            stream.persist(file_path)
+            file_info = self.file_processor.get_file_info(file_path, filename, stream.hexdigest())
+        else:
+            file.save(file_path)
+            file_info = self.file_processor.get_file_info(file_path, filename)
+            
+            duplicate = self.find_duplicate(file_info['file_hash'], filename, seen_hashes)
+            if duplicate:
+                os.remove(file_path)
+                return duplicate
+        
+        if seen_hashes is not None:
+            seen_hashes.add(file_info['file_hash'])
+        
+        return {'file_path': file_path, 'filename': filename, 'file_info': file_info}
+    
+    def find_duplicate(self, file_hash: str, filename: str,
+                       seen_hashes: Optional[set] = None) -> Optional[Dict[str, Any]]:
+        """Return the duplicate response for an already uploaded file, if any"""
+        if not Config.ENABLE_DUPLICATE_DETECTION:
+            return None
+        
+        if seen_hashes is not None and file_hash in seen_hashes:
+            return {
+                'success': False,
+                'filename': filename,
+                'message': 'Duplicate file within the same upload'
+            }
+        
+        existing_file = self.file_registry.get(file_hash)
+        if existing_file is None:
+            return None
+        
+        logger.info(f"Duplicate file detected: {filename} (matches {existing_file['filename']})")
+        return {
+            'success': False,
+            'filename': filename,
+            'message': f'Duplicate file. Already uploaded as: {existing_file["filename"]}',
+            'existing_file': existing_file
+        }
+    
+    def process_saved_file(self, file_path: str, filename: str,
+                           custom_metadata: Optional[Dict[str, Any]] = None,
+                           file_info: Optional[Dict[str, Any]] = None,
+                           progress_callback: Optional[Callable[..., None]] = None,
+                           document_name: Optional[str] = None,
+                           mode: str = 'create',
+                           chunks_callback: Optional[Callable[[str, List[str]], None]] = None) -> Dict[str, Any]:
+        """Process a file already saved on disk and add its chunks to the vector store
+        
+        In 'update' mode the file replaces the latest version stored under the
+        same document name: chunks whose hash matches a chunk of the previous
+        version keep their stored vector, only new or changed chunks are
+        embedded, and chunks that disappeared are released. The previous
+        version's custom metadata is kept unless overridden.
+        
+        chunks_callback receives the file hash and the doc IDs of chunk
+        references as they are taken, so a caller can release them if the
+        process dies before the file is registered.
+        """
+        def report(stage: str, **progress):
+            if progress_callback:
+                progress_callback(stage, **progress)
+        
+        if mode not in UPLOAD_MODES:
+            raise ValueError(f"Invalid mode '{mode}'. Supported modes: {', '.join(UPLOAD_MODES)}")
+        
+        if file_info is None:
+            file_info = self.file_processor.get_file_info(file_path, filename)
+        
+        document_name = document_name or filename
+        previous = self.file_registry.get_by_document_name(document_name) if mode == 'update' else None
+        
+        if previous and previous['file_hash'] == file_info['file_hash']:
+            return {
+                'success': True,
+                'message': f'Document {document_name} is unchanged',
+                'file_info': previous,
+                'chunks_created': 0,
+                'documents_added': 0,
+                'chunks_reused': previous['total_chunks']
+            }
+        
+        # Stored chunks of the previous version, by hash, that the new version may keep
+        reusable = {}
+        if previous:
+            for chunk_hash, doc_id in zip(previous.get('chunk_hashes', []), previous['doc_ids']):
+                reusable.setdefault(chunk_hash, []).append(doc_id)
+        
+        # Stream chunks into the vector store in batches so memory stays bounded
+        report('extracting')
+        
+        doc_ids = []
+        chunk_hashes = []
+        added_doc_ids = []
+        stored_doc_ids = set()
+        previous_metadata = {}  # {doc_id: metadata before this version took the chunk over}
+        batch = []
+        fraction = None
+        embedded = 0
+        reused = 0
+        
+        def flush():
+            nonlocal embedded, reused
+            batch_hashes = [ChunkIndex.hash_text(chunk_data['text']) for chunk_data in batch]
+            batch_doc_ids = [None] * len(batch)
+            
+            kept = []
+            to_add = []
+            for i, chunk_hash in enumerate(batch_hashes):
+                if reusable.get(chunk_hash):
+                    batch_doc_ids[i] = reusable[chunk_hash].pop()
+                    kept.append(i)
+                else:
+                    to_add.append(i)
+            
+            if kept:
+                # Unchanged chunks keep their vector. Those only the previous version referenced move to
+                # the new version; chunks other files also reference keep their metadata and reach the
+                # new version through the registry's chunk membership
+                referenced = self.file_registry.referenced_elsewhere([batch_doc_ids[i] for i in kept],
+                                                                     previous['file_hash'])
+                owned = [i for i in kept if batch_doc_ids[i] not in referenced]
+                if owned:
+                    owned_doc_ids = [batch_doc_ids[i] for i in owned]
+                    for doc_id, metadata in self.vector_store.get_documents_metadata(owned_doc_ids).items():
+                        previous_metadata.setdefault(doc_id, metadata)
+                    self.vector_store.update_documents_metadata(
+                        owned_doc_ids,
+                        [batch[i]['metadata'] for i in owned],
+                        stamp_metadata=False
+                    )
+                    stored_doc_ids.update(owned_doc_ids)
+                reused += len(kept)
+            
+            if to_add:
+                new_doc_ids, new_flags = self._add_chunks(
+                    [batch[i] for i in to_add],
+                    [batch_hashes[i] for i in to_add]
+                )
+                for i, doc_id in zip(to_add, new_doc_ids):
+                    batch_doc_ids[i] = doc_id
+                added_doc_ids.extend(new_doc_ids)
+                if chunks_callback:
+                    chunks_callback(file_info['file_hash'], new_doc_ids)
+                stored_doc_ids.update(doc_id for doc_id, is_new in zip(new_doc_ids, new_flags) if is_new)
+                embedded += sum(new_flags)
+            
+            doc_ids.extend(batch_doc_ids)
+            chunk_hashes.extend(batch_hashes)
+            batch.clear()
+            
+            # Extrapolate the total from how far through the file extraction is
+            estimated_total = round(len(doc_ids) / fraction) if fraction else None
+            report('embedding', chunks_done=len(doc_ids), total_chunks=estimated_total)
+        
         try:
-            # Validate file
-            if not file or not file.filename:
-                raise ValueError("No file provided")
+            for chunk_data in self.file_processor.iter_chunks(file_path, filename, file_info):
+                batch.append(chunk_data)
+                fraction = chunk_data['progress']
+                
+                if len(batch) >= Config.INGEST_BATCH_SIZE:
+                    flush()
             
-            if not self.is_allowed_file(file.filename):
-                raise ValueError(f"File type not allowed. Supported types: {', '.join(Config.ALLOWED_EXTENSIONS)}")
+            if batch:
+                flush()
             
-            # Secure filename
-            filename = secure_filename(file.filename)
-            if not filename:
-                raise ValueError("Invalid filename")
+            if not doc_ids:
+                raise ValueError("No text content extracted from file")
             
-            # Save file temporarily
-            temp_file_path = os.path.join(self.upload_folder, filename)
-            file.save(temp_file_path)
+        except Exception:
+            # Don't leave a partially ingested file behind, and hand kept chunks back to the previous version
+            self.release_chunks(added_doc_ids)
+            if previous_metadata:
+                self.vector_store.update_documents_metadata(list(previous_metadata), list(previous_metadata.values()),
+                                                            stamp_metadata=False)
+            raise
+        
+        report('embedding', chunks_done=len(doc_ids), total_chunks=len(doc_ids))
+        chunks_created = len(doc_ids)
+        
+        if previous:
+            # Attributes given for the previous version carry over unless this upload overrides them
+            custom_metadata = {**previous.get('custom_metadata', {}), **(custom_metadata or {})}
+        
+        # Update file tracking
+        file_record = {
+            **file_info,
+            'document_name': document_name,
+            'custom_metadata': custom_metadata or {},
+            'doc_ids': doc_ids,
+            'chunk_hashes': chunk_hashes,
+            'total_chunks': chunks_created,
+            'processing_status': 'completed'
+        }
+        
+        # Chunks kept from the previous version or deduplicated against other files stay stored under their hash
+        self.file_registry.add(file_record, shared_doc_ids=set(doc_ids) - stored_doc_ids)
+        
+        result = {
+            'success': True,
+            'message': f'File {filename} processed successfully',
+            'file_info': file_record,
+            'chunks_created': chunks_created,
+            'documents_added': embedded,
+            'chunks_deduplicated': chunks_created - reused - embedded
+        }
+        
+        if previous:
+            # Release chunks that are gone from the new version and retire the old record
+            removed_doc_ids = [doc_id for doc_ids_left in reusable.values() for doc_id in doc_ids_left]
+            self.release_chunks(removed_doc_ids)
+            self.file_registry.remove(previous['file_hash'])
+            
+            result.update({
+                'message': f'Document {document_name} updated from {filename}',
+                'previous_file_hash': previous['file_hash'],
+                'chunks_reused': reused,
+                'chunks_removed': len(removed_doc_ids),
+                'embeddings_saved': chunks_created - embedded
+            })
+        
+        logger.info(f"Successfully processed {filename}: {chunks_created} chunks, {embedded} documents added")
+        
+        return result
+    
+    def _add_chunks(self, chunks: List[Dict[str, Any]],
+                    chunk_hashes: Optional[List[str]] = None) -> Tuple[List[str], List[bool]]:
+        """Add chunks to the vector store, reusing stored vectors for repeated chunks
+        
+        Returns the doc ID for each chunk and whether it was newly embedded.
+        """
+        if self.chunk_index is None:
+            doc_ids = self.vector_store.add_documents_batch(
+                [chunk_data['text'] for chunk_data in chunks],
+                [chunk_data['metadata'] for chunk_data in chunks],
+                stamp_metadata=False
+            )
+            return doc_ids, [True] * len(doc_ids)
+        
+        if chunk_hashes is None:
+            chunk_hashes = [ChunkIndex.hash_text(chunk_data['text']) for chunk_data in chunks]
+        existing = self.chunk_index.lookup(chunk_hashes)
+        
+        # Embed only the first occurrence of each chunk that isn't stored yet
+        new_positions = {}
+        for i, chunk_hash in enumerate(chunk_hashes):
+            if chunk_hash not in existing and chunk_hash not in new_positions:
+                new_positions[chunk_hash] = i
+        
+        created = {}
+        if new_positions:
+            new_doc_ids = self.vector_store.add_documents_batch(
+                [chunks[i]['text'] for i in new_positions.values()],
+                [chunks[i]['metadata'] for i in new_positions.values()],
+                stamp_metadata=False
+            )
+            created = dict(zip(new_positions, new_doc_ids))
+        
+        referenced = self.chunk_index.add_references(chunk_hashes, created)
+        
+        # Another writer may have stored the same chunk first; drop our copy
+        lost = [doc_id for chunk_hash, doc_id in created.items() if referenced.get(chunk_hash) != doc_id]
+        if lost:
+            self.vector_store.delete_documents(ids=lost)
+        
+        new_flags = [False] * len(chunks)
+        for chunk_hash, doc_id in created.items():
+            if referenced.get(chunk_hash) == doc_id:
+                new_flags[new_positions[chunk_hash]] = True
+        
+        # A concurrent delete may have released a chunk we meant to reuse
+        missing = [i for i, chunk_hash in enumerate(chunk_hashes) if chunk_hash not in referenced]
+        if missing:
+            retry_ids, retry_flags = self._add_chunks([chunks[i] for i in missing], [chunk_hashes[i] for i in missing])
+            for i, doc_id, is_new in zip(missing, retry_ids, retry_flags):
+                referenced[chunk_hashes[i]] = doc_id
+                new_flags[i] = is_new
+        
+        doc_ids = [referenced[chunk_hash] for chunk_hash in chunk_hashes]
+        return doc_ids, new_flags
+    
+    def release_chunks(self, doc_ids: List[str]) -> int:
+        """Release chunk references (one per occurrence) and delete vectors nothing else refers to"""
+        orphaned = self.chunk_index.release(doc_ids) if self.chunk_index is not None else doc_ids
+        
+        if not orphaned:
+            return 0
+        
+        return self.vector_store.delete_documents(ids=orphaned)
+    
+    def upload_and_process_file(self, file: FileStorage, 
+                               custom_metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Upload file, process it, and add to vector store"""
+        try:
+            upload = self.prepare_upload(file)
+            if 'file_path' not in upload:
+                return upload
             
             try:
-                # Get file info and check for duplicates
-                file_info = self.file_processor.get_file_info(temp_file_path, filename)
-                
-                if Config.ENABLE_DUPLICATE_DETECTION:
-                    if file_info['file_hash'] in self.uploaded_files:
-                        existing_file = self.uploaded_files[file_info['file_hash']]
-                        logger.info(f"Duplicate file detected: {filename} (matches {existing_file['filename']})")
-                        return {
-                            'success': False,
-                            'message': f'Duplicate file. Already uploaded as: {existing_file["filename"]}',
-                            'existing_file': existing_file
-                        }
-                
-                # Process file into chunks
-                chunks = self.file_processor.process_file(temp_file_path, filename, custom_metadata)
-                
-                # Add chunks to vector store
-                doc_ids = []
-                documents = []
-                metadatas = []
-                
-                for chunk_data in chunks:
-                    documents.append(chunk_data['text'])
-                    metadatas.append(chunk_data['metadata'])
-                
-                # Batch add to vector store
-                doc_ids = self.vector_store.add_documents_batch(documents, metadatas)
-                
-                # Update file tracking
-                file_record = {
-                    **file_info,
-                    'doc_ids': doc_ids,
-                    'total_chunks': len(chunks),
-                    'processing_status': 'completed'
-                }
-                
-                self.uploaded_files[file_info['file_hash']] = file_record
-                
-                logger.info(f"Successfully processed {filename}: {len(chunks)} chunks, {len(doc_ids)} documents added")
-                
-                return {
-                    'success': True,
-                    'message': f'File {filename} processed successfully',
-                    'file_info': file_record,
-                    'chunks_created': len(chunks),
-                    'documents_added': len(doc_ids)
-                }
+                return self.process_saved_file(upload['file_path'], upload['filename'],
+                                               custom_metadata, upload['file_info'])
                 
             finally:
                 # Clean up temporary file
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
+                if os.path.exists(upload['file_path']):
+                    os.remove(upload['file_path'])
                     
         except Exception as e:
             logger.error(f"Error uploading and processing file: {str(e)}")
@@ -115,26 +439,142 @@ class FileManager:
     
     def upload_multiple_files(self, files: List[FileStorage], 
                              custom_metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Upload and process multiple files"""
+        """Upload and process multiple files in parallel"""
+        items = []
+        rejected = []
+        seen_hashes = set()
+        
+        try:
+            for file in files:
+                try:
+                    upload = self.prepare_upload(file, seen_hashes)
+                except Exception as e:
+                    upload = {
+                        'success': False,
+                        'filename': file.filename if file else 'Unknown',
+                        'error': str(e)
+                    }
+                
+                if 'file_path' in upload:
+                    items.append(upload)
+                else:
+                    rejected.append(upload)
+            
+            result = self.process_saved_files(items, custom_metadata)
+            result['results'] = rejected + result['results']
+            return result
+            
+        finally:
+            for item in items:
+                if os.path.exists(item['file_path']):
+                    os.remove(item['file_path'])
+    
+    def process_saved_files(self, items: List[Dict[str, Any]],
+                            custom_metadata: Optional[Dict[str, Any]] = None,
+                            progress_callback: Optional[Callable[..., None]] = None,
+                            chunks_callback: Optional[Callable[[str, List[str]], None]] = None) -> Dict[str, Any]:
+        """Extract saved files in the process pool and write their chunks through one batching writer
+        
+        Workers send each file's chunks back in batches over a bounded queue,
+        so at most a few batches per worker are in flight however large the
+        files are.
+        """
+        pool = get_process_pool()
+        chunk_queue = get_manager().Queue(maxsize=2 * get_process_pool_size())
+        futures = {
+            item['file_info']['file_hash']: pool.submit(
+                stream_file_chunks, chunk_queue, item['file_info']['file_hash'],
+                item['file_path'], item['filename'], item['file_info'], Config.INGEST_BATCH_SIZE
+            )
+            for item in items
+        }
+        filenames = {item['file_info']['file_hash']: item['filename'] for item in items}
+        
+        writer = _BatchWriter(self._add_chunks, Config.INGEST_BATCH_SIZE, chunks_callback)
+        chunk_counts = {}
+        errors = {}
+        unfinished = set(futures)
+        
+        if progress_callback:
+            progress_callback('extracting')
+        
+        while unfinished:
+            try:
+                kind, file_hash, payload = chunk_queue.get(timeout=1)
+            except queue.Empty:
+                # A worker that died never reports back
+                for file_hash in list(unfinished):
+                    future = futures[file_hash]
+                    if future.done() and future.exception() is not None:
+                        logger.error(f"Error processing file {filenames[file_hash]}: {str(future.exception())}")
+                        errors[file_hash] = str(future.exception())
+                        unfinished.discard(file_hash)
+                continue
+            
+            if kind == 'chunks':
+                chunk_counts[file_hash] = chunk_counts.get(file_hash, 0) + len(payload)
+                writer.add(file_hash, payload)
+            elif kind == 'error':
+                logger.error(f"Error processing file {filenames[file_hash]}: {payload}")
+                errors[file_hash] = payload
+                unfinished.discard(file_hash)
+            else:
+                unfinished.discard(file_hash)
+            
+            if progress_callback:
+                progress_callback('embedding', chunks_done=writer.written,
+                                  total_chunks=sum(chunk_counts.values()))
+        
+        writer.flush()
+        errors.update(writer.errors)
+        
+        if progress_callback:
+            progress_callback('embedding', chunks_done=writer.written,
+                              total_chunks=sum(chunk_counts.values()))
+        
         results = []
         total_chunks = 0
         total_documents = 0
         
-        for file in files:
-            try:
-                result = self.upload_and_process_file(file, custom_metadata)
-                results.append(result)
-                
-                if result['success']:
-                    total_chunks += result['chunks_created']
-                    total_documents += result['documents_added']
-                    
-            except Exception as e:
+        for item in items:
+            file_info = item['file_info']
+            file_hash = file_info['file_hash']
+            doc_ids = writer.doc_ids.get(file_hash, [])
+            
+            if file_hash in errors:
+                # Drop whatever part of a failed file was already written
+                self.release_chunks(doc_ids)
                 results.append({
                     'success': False,
-                    'filename': file.filename if file else 'Unknown',
-                    'error': str(e)
+                    'filename': item['filename'],
+                    'error': errors[file_hash]
                 })
+                continue
+            
+            file_record = {
+                **file_info,
+                'document_name': item['filename'],
+                'custom_metadata': custom_metadata or {},
+                'doc_ids': doc_ids,
+                'chunk_hashes': writer.chunk_hashes.get(file_hash, []),
+                'total_chunks': chunk_counts[file_hash],
+                'processing_status': 'completed'
+            }
+            self.file_registry.add(file_record, shared_doc_ids=set(doc_ids) - writer.stored.get(file_hash, set()))
+            
+            embedded = writer.embedded.get(file_hash, 0)
+            total_chunks += chunk_counts[file_hash]
+            total_documents += embedded
+            results.append({
+                'success': True,
+                'message': f"File {item['filename']} processed successfully",
+                'file_info': file_record,
+                'chunks_created': chunk_counts[file_hash],
+                'documents_added': embedded,
+                'chunks_deduplicated': chunk_counts[file_hash] - embedded
+            })
+        
+        logger.info(f"Processed {len(items)} files in parallel: {total_documents} documents added")
         
         return {
             'success': True,
@@ -144,48 +584,34 @@ class FileManager:
             'results': results
         }
     
-    def get_uploaded_files(self) -> List[Dict[str, Any]]:
-        """Get list of all uploaded files"""
-        return list(self.uploaded_files.values())
+    def get_uploaded_files(self, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """Get a page of uploaded files, newest first"""
+        return self.file_registry.list(limit, offset)
     
-    def delete_file_documents(self, file_hash: str) -> bool:
-        """Delete all documents associated with a file"""
+    def count_uploaded_files(self) -> int:
+        """Get the number of uploaded files"""
+        return self.file_registry.count()
+    
+    def delete_file_documents(self, file_hash: str) -> Optional[int]:
+        """Delete all documents associated with a file and return how many were deleted, or None if not found"""
         try:
-            if file_hash not in self.uploaded_files:
-                return False
+            # Remove from tracking first so concurrent deletes can't release twice
+            file_record = self.file_registry.remove(file_hash)
+            if file_record is None:
+                return None
             
-            file_record = self.uploaded_files[file_hash]
             doc_ids = file_record.get('doc_ids', [])
             
-            # Delete documents from vector store
-            for doc_id in doc_ids:
-                self.vector_store.delete_document(doc_id)
-            
-            # Remove from tracking
-            del self.uploaded_files[file_hash]
+            # Delete documents no other file still refers to; those it shares resolve to the files left
+            deleted = self.release_chunks(doc_ids)
             
-            logger.info(f"Deleted {len(doc_ids)} documents for file {file_record['filename']}")
-            return True
+            logger.info(f"Deleted {deleted} of {len(doc_ids)} documents for file {file_record['filename']}")
+            return deleted
             
         except Exception as e:
             logger.error(f"Error deleting file documents: {str(e)}")
-            return False
+            raise
     
     def get_file_stats(self) -> Dict[str, Any]:
         """Get statistics about uploaded files"""
-        total_files = len(self.uploaded_files)
-        total_chunks = sum(f.get('total_chunks', 0) for f in self.uploaded_files.values())
-        total_size = sum(f.get('file_size', 0) for f in self.uploaded_files.values())
-        
-        file_types = {}
-        for file_info in self.uploaded_files.values():
-            ext = file_info.get('file_extension', 'unknown')
-            file_types[ext] = file_types.get(ext, 0) + 1
-        
-        return {
-            'total_files': total_files,
-            'total_chunks': total_chunks,
-            'total_size_bytes': total_size,
-            'total_size_mb': round(total_size / (1024 * 1024), 2),
-            'file_types': file_types
-        }
\ No newline at end of file
+        return self.file_registry.stats()
\ No newline at end of file
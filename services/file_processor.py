@@ -1,20 +1,23 @@
 import os
+import queue
 import hashlib
-from typing import List, Dict, Any, Optional, Tuple
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Callable
 from pathlib import Path
 import mimetypes
 from datetime import datetime
 
 # Document processors
 import PyPDF2
-from docx import Document
 import pandas as pd
 from openpyxl import load_workbook
 
-# Text splitting
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 from utils.logger import setup_logger
+from utils.text_splitter import RecursiveTextSplitter
+from utils.process_pool import get_manager, get_process_pool, get_process_pool_size
 from config import Config
 
 logger = setup_logger(__name__)
@@ -27,37 +30,50 @@ logger = setup_logger(__name__)
 
 
 class FileProcessor:
-    def __init__(self):
+    def __init__(self, parallel: bool = True):
         """Initialize file processor with text splitter"""
-        self.text_splitter = RecursiveCharacterTextSplitter(
+        self.text_splitter = RecursiveTextSplitter(
             chunk_size=Config.CHUNK_SIZE,
             chunk_overlap=Config.CHUNK_OVERLAP,
-            length_function=len,
             separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""]
         )
         
-        # Supported file types
+        # Whether extractors may fan work out to the shared process pool
+        self.parallel = parallel
+        
+        # Supported file types, each mapped to a generator of text blocks
         self.supported_types = {
-            '.pdf': self._process_pdf,
-            '.docx': self._process_docx,
-            '.doc': self._process_docx,  # Will try docx processor
-            '.txt': self._process_txt,
-            '.md': self._process_txt,
-            '.csv': self._process_csv,
-            '.xlsx': self._process_excel,
-            '.xls': self._process_excel,
+            '.pdf': self._iter_pdf_blocks,
+            '.docx': self._iter_docx_blocks,
+            '.doc': self._iter_docx_blocks,  # Will try docx processor
+            '.txt': self._as_blocks(self._process_txt),
+            '.md': self._as_blocks(self._process_txt),
+            '.csv': self._iter_csv_blocks if Config.CSV_STREAMING else self._as_blocks(self._process_csv),
+            '.xlsx': self._iter_excel_blocks,
+            '.xls': self._iter_excel_blocks,
         }
         
         logger.info("File processor initialized")
     
-    def get_file_info(self, file_path: str, original_filename: str) -> Dict[str, Any]:
+    @staticmethod
+    def _as_blocks(processor_func: Callable[[str], str]) -> Callable[[str], Iterator[Dict[str, Any]]]:
+        """Adapt a whole-document text extractor to the block generator interface"""
+        def iter_blocks(file_path: str) -> Iterator[Dict[str, Any]]:
+            yield {'text': processor_func(file_path), 'metadata': {}}
+        
+        iter_blocks.__name__ = processor_func.__name__
+        return iter_blocks
+    
+    def get_file_info(self, file_path: str, original_filename: str,
+                      file_hash: Optional[str] = None) -> Dict[str, Any]:
         """Extract file metadata"""
         try:
             file_stats = os.stat(file_path)
             file_extension = Path(original_filename).suffix.lower()
             
-            # Calculate file hash for duplicate detection
-            file_hash = self._calculate_file_hash(file_path)
+            # Calculate file hash for duplicate detection unless it was computed on upload
+            if file_hash is None:
+                file_hash = self._calculate_file_hash(file_path)
             
             return {
                 'filename': original_filename,
@@ -73,50 +89,67 @@ class FileProcessor:
             raise
     
     def process_file(self, file_path: str, original_filename: str, 
-                    custom_metadata: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+                    file_info: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Process file and return chunks with metadata"""
+        chunk_documents = list(self.iter_chunks(file_path, original_filename, file_info))
+        
+        if not chunk_documents:
+            raise ValueError("No text content extracted from file")
+        
+        return chunk_documents
+    
+    def iter_chunks(self, file_path: str, original_filename: str,
+                    file_info: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Stream chunks with metadata as text blocks are extracted from the file
+        
+        Each block (e.g. a PDF page) is chunked as soon as it is extracted, so
+        memory stays bounded by the block size rather than the document size.
+        Chunk metadata holds only the file_hash, block metadata such as the
+        page number, and the chunk's position; file-level attributes are
+        stored once in the file registry and joined back at retrieval.
+        """
         try:
             # Get file info
-            file_info = self.get_file_info(file_path, original_filename)
+            if file_info is None:
+                file_info = self.get_file_info(file_path, original_filename)
             
             if not file_info['is_supported']:
                 raise ValueError(f"Unsupported file type: {file_info['file_extension']}")
             
-            # Extract text content
+            # Extract text blocks
             file_extension = file_info['file_extension']
-            processor_func = self.supported_types[file_extension]
+            block_func = self.supported_types[file_extension]
             
-            logger.info(f"Processing {original_filename} with {processor_func.__name__}")
-            text_content = processor_func(file_path)
+            logger.info(f"Processing {original_filename} with {block_func.__name__}")
             
-            if not text_content or not text_content.strip():
-                raise ValueError("No text content extracted from file")
-            
-            # Split into chunks
-            chunks = self._create_chunks(text_content)
-            
-            # Create chunk documents with metadata
-            chunk_documents = []
-            for i, chunk in enumerate(chunks):
-                chunk_metadata = {
-                    **file_info,
-                    'chunk_index': i,
-                    'total_chunks': len(chunks),
-                    'chunk_size': len(chunk),
-                    'source_type': 'file_upload'
-                }
+            chunk_index = 0
+            for block in block_func(file_path):
+                if not block['text'] or not block['text'].strip():
+                    continue
                 
-                # Add custom metadata if provided
-                if custom_metadata:
-                    chunk_metadata.update(custom_metadata)
+                # Row windows are already sized to a chunk and must keep their header
+                spans = self._iter_chunk_spans(block['text']) if block.get('split', True) else [(0, len(block['text']))]
                 
-                chunk_documents.append({
-                    'text': chunk,
-                    'metadata': chunk_metadata
-                })
+                for start, end in spans:
+                    chunk = block['text'][start:end]
+                    # File-level attributes live in the file registry, keyed by file_hash
+                    chunk_metadata = {
+                        'file_hash': file_info['file_hash'],
+                        **block['metadata'],
+                        'chunk_index': chunk_index,
+                        'chunk_size': len(chunk),
+                        'char_start': start,
+                        'char_end': end
+                    }
+                    
+                    yield {
+                        'text': chunk,
+                        'metadata': chunk_metadata,
+                        'progress': block.get('progress')
+                    }
+                    chunk_index += 1
             
-            logger.info(f"Processed {original_filename}: {len(chunks)} chunks created")
-            return chunk_documents
+            logger.info(f"Processed {original_filename}: {chunk_index} chunks created")
             
         except Exception as e:
             logger.error(f"Error processing file {original_filename}: {str(e)}")
@@ -126,61 +159,97 @@ class FileProcessor:
         """Calculate SHA256 hash of file for duplicate detection"""
         hash_sha256 = hashlib.sha256()
         with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
                 hash_sha256.update(chunk)
         return hash_sha256.hexdigest()
     
-    def _create_chunks(self, text: str) -> List[str]:
-        """Split text into chunks"""
-        chunks = self.text_splitter.split_text(text)
-        # Filter out very short chunks
-        chunks = [chunk for chunk in chunks if len(chunk.strip()) > Config.MIN_CHUNK_SIZE]
-        return chunks
+    def _iter_chunk_spans(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yield (start, end) offsets of chunks, skipping very short ones"""
+        for start, end in self.text_splitter.iter_spans(text):
+            # Spans come back whitespace-stripped, so their length is the stripped length
+            if end - start > Config.MIN_CHUNK_SIZE:
+                yield start, end
     
-    def _process_pdf(self, file_path: str) -> str:
-        """Extract text from PDF file"""
+    def _iter_pdf_blocks(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """Extract PDF text page by page, one block per page"""
         try:
-            text_content = ""
             with open(file_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
+                page_count = len(pdf_reader.pages)
                 
-                for page_num, page in enumerate(pdf_reader.pages):
-                    try:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text_content += f"\n--- Page {page_num + 1} ---\n"
-                            text_content += page_text
-                    except Exception as e:
-                        logger.warning(f"Error extracting text from page {page_num + 1}: {str(e)}")
-                        continue
-            
-            return text_content.strip()
+                if self.parallel and page_count >= Config.PDF_PARALLEL_MIN_PAGES:
+                    pages = self._iter_pdf_pages_parallel(file_path, page_count)
+                else:
+                    # One reader for the whole file; pages are parsed as they are reached
+                    pages = _iter_pdf_pages(pdf_reader, 0, page_count)
+                
+                for page_num, page_text in pages:
+                    yield {
+                        'text': page_text,
+                        'metadata': {'page': page_num + 1},
+                        'progress': (page_num + 1) / page_count
+                    }
             
         except Exception as e:
             logger.error(f"Error processing PDF: {str(e)}")
             raise
     
-    def _process_docx(self, file_path: str) -> str:
-        """Extract text from DOCX file"""
-        try:
-            doc = Document(file_path)
-            text_content = ""
-            
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    text_content += paragraph.text + "\n"
-            
-            # Extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    row_text = []
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            row_text.append(cell.text.strip())
-                    if row_text:
-                        text_content += " | ".join(row_text) + "\n"
+    def _iter_pdf_pages_parallel(self, file_path: str, page_count: int) -> Iterator[Tuple[int, str]]:
+        """Extract page ranges in the process pool, yielding pages in order"""
+        pool = get_process_pool()
+        page_step = Config.PDF_PAGES_PER_TASK
+        
+        # Bound the number of ranges in flight so finished pages don't pile up in memory
+        max_in_flight = 2 * get_process_pool_size()
+        in_flight = deque()
+        
+        for start in range(0, page_count, page_step):
+            in_flight.append(pool.submit(extract_pdf_page_range, file_path, start, min(start + page_step, page_count)))
             
-            return text_content.strip()
+            if len(in_flight) >= max_in_flight:
+                yield from in_flight.popleft().result()
+        
+        while in_flight:
+            yield from in_flight.popleft().result()
+    
+    def _iter_docx_blocks(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """Stream DOCX text in document order, grouped into sections
+        
+        word/document.xml is read straight from the archive with iterparse, so
+        paragraphs and table rows come out in the order they appear and parsed
+        elements are discarded as soon as their text is taken. Lines are
+        grouped into sections of about DOCX_SECTION_SIZE characters, split on
+        paragraph boundaries, and each section is chunked as it is completed.
+        """
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                xml_size = archive.getinfo('word/document.xml').file_size or 1
+                
+                with archive.open('word/document.xml') as xml_file:
+                    lines = []
+                    length = 0
+                    section = 0
+                    
+                    for line in _iter_docx_lines(xml_file):
+                        lines.append(line)
+                        length += len(line) + 1
+                        
+                        if length >= Config.DOCX_SECTION_SIZE:
+                            section += 1
+                            yield {
+                                'text': '\n'.join(lines),
+                                'metadata': {'section': section},
+                                'progress': min(xml_file.tell() / xml_size, 1.0)
+                            }
+                            lines = []
+                            length = 0
+                    
+                    if lines:
+                        yield {
+                            'text': '\n'.join(lines),
+                            'metadata': {'section': section + 1},
+                            'progress': 1.0
+                        }
             
         except Exception as e:
             logger.error(f"Error processing DOCX: {str(e)}")
@@ -204,6 +273,49 @@ class FileProcessor:
             logger.error(f"Error processing text file: {str(e)}")
             raise
     
+    def _iter_csv_blocks(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """Stream a CSV as row-window blocks followed by a summary block
+        
+        Rows are read in chunks of CSV_READ_ROWS and grouped into windows of
+        about CHUNK_SIZE characters, each repeating the column header, so every
+        row becomes searchable while memory stays flat. Column statistics are
+        accumulated incrementally and emitted as a final summary block.
+        """
+        try:
+            file_size = os.path.getsize(file_path) or 1
+            
+            with open(file_path, 'rb') as file:
+                reader = pd.read_csv(file, chunksize=Config.CSV_READ_ROWS)
+                stats = None
+                windows = None
+                
+                for df in reader:
+                    if stats is None:
+                        stats = _ColumnStats([str(col) for col in df.columns])
+                        windows = _RowWindower(stats.columns)
+                    
+                    stats.update(df)
+                    progress = min(file.tell() / file_size, 1.0)
+                    
+                    for block in windows.add_rows(df.itertuples(index=False, name=None)):
+                        yield {**block, 'progress': progress}
+                
+                if stats is None:
+                    return
+                
+                for block in windows.finish():
+                    yield {**block, 'progress': 1.0}
+                
+                yield {
+                    'text': stats.summary("CSV Data Summary"),
+                    'metadata': {'block_type': 'summary'},
+                    'progress': 1.0
+                }
+            
+        except Exception as e:
+            logger.error(f"Error processing CSV: {str(e)}")
+            raise
+    
     def _process_csv(self, file_path: str) -> str:
         """Extract text from CSV file"""
         try:
@@ -239,42 +351,379 @@ class FileProcessor:
             logger.error(f"Error processing CSV: {str(e)}")
             raise
     
-    def _process_excel(self, file_path: str) -> str:
-        """Extract text from Excel file"""
+    def _iter_excel_blocks(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """Stream every sheet of a workbook as row-window blocks in a single pass
+        
+        xlsx workbooks are opened once in read-only mode and each sheet's rows
+        are walked exactly once; with several sheets, each sheet is walked by
+        one pool worker that streams its blocks back, and blocks are yielded
+        in workbook order. Legacy .xls files are parsed once by pandas.
+        """
+        workbook = None
         try:
-            # Load workbook to get sheet names
-            workbook = load_workbook(file_path, read_only=True)
-            sheet_names = workbook.sheetnames
+            if Path(file_path).suffix.lower() == '.xls':
+                sheets = pd.read_excel(file_path, sheet_name=None, header=None)
+                sheet_names = list(sheets)
+                sheet_blocks = (
+                    _iter_sheet_blocks(name, df.itertuples(index=False, name=None))
+                    for name, df in sheets.items()
+                )
+            else:
+                workbook = load_workbook(file_path, read_only=True, data_only=True)
+                sheet_names = workbook.sheetnames
+                
+                if self.parallel and len(sheet_names) > 1 and Config.EXCEL_PARALLEL_SHEETS:
+                    workbook.close()
+                    workbook = None
+                    sheet_blocks = self._iter_excel_sheets_parallel(file_path, sheet_names)
+                else:
+                    sheet_blocks = (
+                        _iter_sheet_blocks(name, workbook[name].iter_rows(values_only=True))
+                        for name in sheet_names
+                    )
             
-            text_content = f"Excel File Content:\n"
-            text_content += f"Sheets: {', '.join(sheet_names)}\n\n"
+            for sheet_index, blocks in enumerate(sheet_blocks):
+                for block in blocks:
+                    yield {**block, 'progress': (sheet_index + 1) / len(sheet_names)}
             
-            # Process each sheet
+        except Exception as e:
+            logger.error(f"Error processing Excel: {str(e)}")
+            raise
+        finally:
+            if workbook is not None:
+                workbook.close()
+    
+    def _iter_excel_sheets_parallel(self, file_path: str, sheet_names: List[str]) -> Iterator[Iterator[Dict[str, Any]]]:
+        """Extract sheets in the process pool, one worker per sheet, yielding their blocks in workbook order
+        
+        Each worker sends its blocks back in batches over its own small
+        queue, so a large sheet is never held whole and workers on later
+        sheets wait until the sheets before them have been consumed.
+        """
+        pool = get_process_pool()
+        manager = get_manager()
+        max_in_flight = get_process_pool_size()
+        in_flight = deque()
+        
+        def submit(sheet_name: str) -> None:
+            block_queue = manager.Queue(maxsize=2)
+            in_flight.append((block_queue, pool.submit(stream_excel_sheet, block_queue, file_path, sheet_name,
+                                                       Config.INGEST_BATCH_SIZE)))
+        
+        try:
             for sheet_name in sheet_names:
-                try:
-                    df = pd.read_excel(file_path, sheet_name=sheet_name)
-                    
-                    text_content += f"--- Sheet: {sheet_name} ---\n"
-                    text_content += f"Columns: {', '.join(df.columns.tolist())}\n"
-                    text_content += f"Rows: {len(df)}\n\n"
-                    
-                    # Add sample data
-                    if len(df) > 0:
-                        text_content += f"Sample Data:\n"
-                        text_content += df.head(5).to_string(index=False)
-                        text_content += "\n\n"
-                    
-                except Exception as e:
-                    logger.warning(f"Error processing sheet {sheet_name}: {str(e)}")
-                    continue
+                submit(sheet_name)
+                if len(in_flight) >= max_in_flight:
+                    yield _receive_sheet_blocks(*in_flight[0])
+                    in_flight.popleft()
             
-            workbook.close()
-            return text_content
+            while in_flight:
+                yield _receive_sheet_blocks(*in_flight[0])
+                in_flight.popleft()
+        finally:
+            # Abandoned early (e.g. a failed sheet): unblock workers still sending
+            for _, future in in_flight:
+                future.cancel()
+            for block_queue, future in in_flight:
+                while not future.done():
+                    try:
+                        block_queue.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+
+
+
+class _RowWindower:
+    """Groups table rows into text windows of about CHUNK_SIZE characters, each with the header"""
+    
+    def __init__(self, columns: List[str], extra_metadata: Optional[Dict[str, Any]] = None):
+        self.header = f"Columns: {' | '.join(columns)}\n"
+        self.extra_metadata = extra_metadata or {}
+        self.lines = []
+        self.length = len(self.header)
+        self.next_row = 1
+        self.window_start = 1
+    
+    def add_rows(self, rows: Iterator[tuple]) -> Iterator[Dict[str, Any]]:
+        """Add rows, yielding every window that fills up"""
+        for row in rows:
+            line = ' | '.join('' if _is_missing(value) else str(value) for value in row)
+            
+            if self.lines and self.length + len(line) + 1 > Config.CHUNK_SIZE:
+                yield self._emit()
             
+            self.lines.append(line)
+            self.length += len(line) + 1
+            self.next_row += 1
+    
+    def finish(self) -> Iterator[Dict[str, Any]]:
+        """Yield the last partial window"""
+        if self.lines:
+            yield self._emit()
+    
+    def _emit(self) -> Dict[str, Any]:
+        block = {
+            'text': self.header + '\n'.join(self.lines),
+            'metadata': {
+                **self.extra_metadata,
+                'block_type': 'rows',
+                'row_start': self.window_start,
+                'row_end': self.next_row - 1
+            },
+            'split': False
+        }
+        self.lines = []
+        self.length = len(self.header)
+        self.window_start = self.next_row
+        return block
+
+class _ColumnStats:
+    """Incrementally accumulated per-column statistics for tabular data"""
+    
+    MAX_TRACKED_UNIQUES = 1000
+    
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self.row_count = 0
+        self.non_null = {col: 0 for col in columns}
+        self.numeric = {}  # {col: [count, sum, sum_sq, min, max]}
+        self.uniques = {col: set() for col in columns}
+        self.dtypes = {}
+    
+    def update(self, df: pd.DataFrame) -> None:
+        """Fold a chunk of rows into the running statistics"""
+        df.columns = self.columns
+        self.row_count += len(df)
+        
+        for col in self.columns:
+            series = df[col]
+            self.non_null[col] += int(series.notna().sum())
+            self.dtypes.setdefault(col, str(series.dtype))
+            
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                values = series.dropna().astype(float)
+                if len(values):
+                    count, total, total_sq, low, high = self.numeric.get(col, [0, 0.0, 0.0, float('inf'), float('-inf')])
+                    self.numeric[col] = [
+                        count + len(values),
+                        total + float(values.sum()),
+                        total_sq + float((values * values).sum()),
+                        min(low, float(values.min())),
+                        max(high, float(values.max()))
+                    ]
+            elif len(self.uniques[col]) <= self.MAX_TRACKED_UNIQUES:
+                self.uniques[col].update(series.dropna().astype(str).unique()[:self.MAX_TRACKED_UNIQUES + 1])
+    
+    def summary(self, title: str) -> str:
+        """Render the statistics as text"""
+        lines = [
+            f"{title}:",
+            f"Columns: {', '.join(self.columns)}",
+            f"Total Rows: {self.row_count}",
+            "",
+            "Column Information:"
+        ]
+        
+        for col in self.columns:
+            line = f"- {col}: {self.dtypes.get(col, 'unknown')}, {self.non_null[col]} non-null"
+            if col not in self.numeric:
+                unique_count = len(self.uniques[col])
+                line += f", {unique_count}{'+' if unique_count > self.MAX_TRACKED_UNIQUES else ''} unique values"
+            lines.append(line)
+        
+        if self.numeric:
+            lines.extend(["", "Numeric Summary:"])
+            for col, (count, total, total_sq, low, high) in self.numeric.items():
+                mean = total / count
+                std = max(total_sq / count - mean * mean, 0.0) ** 0.5
+                lines.append(f"- {col}: count={count}, mean={mean:.4g}, std={std:.4g}, min={low:.4g}, max={high:.4g}")
+        
+        return "\n".join(lines)
+
+def _is_missing(value: Any) -> bool:
+    """True for None and NaN cell values"""
+    return value is None or (isinstance(value, float) and value != value)
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+def _iter_docx_lines(xml_file) -> Iterator[str]:
+    """Yield paragraph texts and ' | '-joined table rows from a document.xml stream in document order"""
+    paragraphs = []  # Text runs of the open paragraphs; text boxes can nest them
+    rows = []        # Cells of the open table rows; tables can nest inside cells
+    cells = []       # Paragraph texts of the open table cells
+    body = None
+    depth = 0
+    
+    for event, elem in ET.iterparse(xml_file, events=('start', 'end')):
+        tag = elem.tag
+        
+        if event == 'start':
+            depth += 1
+            if tag == _W + 'body':
+                body = elem
+            elif tag == _W + 'p':
+                paragraphs.append([])
+            elif tag == _W + 'tr':
+                rows.append([])
+            elif tag == _W + 'tc':
+                cells.append([])
+            continue
+        
+        depth -= 1
+        
+        if tag == _W + 't':
+            if paragraphs and elem.text:
+                paragraphs[-1].append(elem.text)
+        elif tag == _W + 'tab':
+            if paragraphs:
+                paragraphs[-1].append('\t')
+        elif tag in (_W + 'br', _W + 'cr'):
+            if paragraphs:
+                paragraphs[-1].append('\n')
+        elif tag == _W + 'p':
+            text = ''.join(paragraphs.pop()).strip()
+            if text:
+                if cells:
+                    cells[-1].append(text)
+                else:
+                    yield text
+        elif tag == _W + 'tc':
+            cell_text = '\n'.join(cells.pop()).strip()
+            if cell_text and rows:
+                rows[-1].append(cell_text)
+        elif tag == _W + 'tr':
+            row = rows.pop()
+            if row:
+                if cells:
+                    cells[-1].append(' | '.join(row))
+                else:
+                    yield ' | '.join(row)
+        
+        # Drop finished top-level blocks (document > body > block) to keep memory flat
+        if depth == 2 and body is not None:
+            body.clear()
+
+def extract_pdf_page_range(file_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """Extract text for pages [start, end) of a PDF with a fresh reader, for a pool task"""
+    with open(file_path, 'rb') as file:
+        return list(_iter_pdf_pages(PyPDF2.PdfReader(file), start, end))
+
+def _iter_pdf_pages(pdf_reader: PyPDF2.PdfReader, start: int, end: int) -> Iterator[Tuple[int, str]]:
+    """(page number, text) of the pages in [start, end) that have text; unreadable pages are skipped"""
+    for page_num in range(start, end):
+        try:
+            page_text = pdf_reader.pages[page_num].extract_text()
         except Exception as e:
-            logger.error(f"Error processing Excel: {str(e)}")
-            raise
+            logger.warning(f"Error extracting text from page {page_num + 1}: {str(e)}")
+            continue
+        if page_text:
+            yield page_num, page_text
+
+def stream_excel_sheet(block_queue, file_path: str, sheet_name: str, batch_size: int = None) -> None:
+    """Walk one sheet of an xlsx workbook inside a pool worker, sending its row-window blocks to block_queue
+    
+    Blocks are sent in lists of batch_size, followed by None once the sheet
+    is done. Errors propagate to the task's future.
+    """
+    batch_size = batch_size or Config.INGEST_BATCH_SIZE
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        batch = []
+        for block in _iter_sheet_blocks(sheet_name, workbook[sheet_name].iter_rows(values_only=True)):
+            batch.append(block)
+            if len(batch) >= batch_size:
+                block_queue.put(batch)
+                batch = []
+        if batch:
+            block_queue.put(batch)
+        block_queue.put(None)
+    finally:
+        workbook.close()
+
+def _receive_sheet_blocks(block_queue, future) -> Iterator[Dict[str, Any]]:
+    """Blocks a stream_excel_sheet task sends, re-raising its error if it fails"""
+    while True:
+        try:
+            batch = block_queue.get(timeout=1)
+        except queue.Empty:
+            if future.done():
+                future.result()
+            continue
+        if batch is None:
+            return
+        yield from batch
 
+def _iter_sheet_blocks(sheet_name: str, rows: Iterator[tuple]) -> Iterator[Dict[str, Any]]:
+    """Turn a sheet's rows into row-window blocks and a summary block; the first non-empty row is the header"""
+    rows = (row for row in rows if any(not _is_missing(value) for value in row))
+    header = next(rows, None)
+    if header is None:
+        return
+    
+    columns = []
+    for i, value in enumerate(header):
+        name = str(value) if not _is_missing(value) else f"Column{i + 1}"
+        columns.append(name if name not in columns else f"{name}.{i + 1}")
+    width = len(columns)
+    stats = _ColumnStats(columns)
+    windows = _RowWindower(columns, {'sheet': sheet_name})
+    batch = []
+    
+    for row in rows:
+        # Sheets can be ragged; fit every row to the header width
+        batch.append(tuple(row[:width]) + (None,) * (width - len(row)))
+        
+        if len(batch) >= Config.CSV_READ_ROWS:
+            stats.update(pd.DataFrame(batch, columns=columns))
+            yield from windows.add_rows(batch)
+            batch = []
+    
+    if batch:
+        stats.update(pd.DataFrame(batch, columns=columns))
+        yield from windows.add_rows(batch)
+    yield from windows.finish()
+    
+    yield {
+        'text': stats.summary(f"Sheet: {sheet_name}"),
+        'metadata': {'sheet': sheet_name, 'block_type': 'summary'}
+    }
+
+_worker_processor = None
+
+def stream_file_chunks(chunk_queue, file_key: str, file_path: str, original_filename: str,
+                       file_info: Optional[Dict[str, Any]] = None, batch_size: int = None) -> int:
+    """Process a file inside a pool worker, sending its chunks to chunk_queue in batches
+    
+    Messages are ('chunks', file_key, [chunk, ...]), then ('done', file_key,
+    chunk count) or ('error', file_key, message). A bounded queue blocks the
+    worker while the consumer is behind, so a large file is never held whole.
+    One FileProcessor is reused per process.
+    """
+    global _worker_processor
+    if _worker_processor is None:
+        # Already inside a pool worker, so don't fan out again
+        _worker_processor = FileProcessor(parallel=False)
+    
+    batch_size = batch_size or Config.INGEST_BATCH_SIZE
+    count = 0
+    try:
+        batch = []
+        for chunk in _worker_processor.iter_chunks(file_path, original_filename, file_info):
+            batch.append(chunk)
+            count += 1
+            if len(batch) >= batch_size:
+                chunk_queue.put(('chunks', file_key, batch))
+                batch = []
+        if batch:
+            chunk_queue.put(('chunks', file_key, batch))
+        if not count:
+            raise ValueError("No text content extracted from file")
+    except Exception as e:
+        chunk_queue.put(('error', file_key, str(e)))
+        return count
+    
+    chunk_queue.put(('done', file_key, count))
+    return count
 
 
 
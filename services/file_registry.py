@@ -0,0 +1,306 @@
+import json
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from utils.db import get_connection
+from utils.logger import setup_logger
+from config import Config
+
+logger = setup_logger(__name__)
+
+# File-level attributes joined back into chunk metadata at retrieval time
+FILE_ATTRIBUTE_KEYS = ('filename', 'document_name', 'file_extension', 'file_size',
+                       'file_hash', 'mime_type', 'upload_timestamp')
+
+class FileRegistry:
+    """SQLite registry of uploaded files shared by all worker processes
+
+    The database runs in WAL mode, so listing and stats queries read a
+    consistent snapshot without blocking ingestion writes.
+    """
+
+    def __init__(self, db_path: str = None):
+        """Initialize file registry"""
+        self.db_path = db_path or Config.FILE_REGISTRY_DB_PATH
+
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    file_hash TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    document_name TEXT,
+                    file_extension TEXT,
+                    file_size INTEGER NOT NULL DEFAULT 0,
+                    total_chunks INTEGER NOT NULL DEFAULT 0,
+                    upload_timestamp TEXT NOT NULL,
+                    record TEXT NOT NULL
+                )
+            """)
+
+            # Registries created before documents had logical names
+            columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(files)")}
+            if 'document_name' not in columns:
+                self._conn.execute("ALTER TABLE files ADD COLUMN document_name TEXT")
+                self._conn.execute("UPDATE files SET document_name = filename")
+
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_filename ON files (filename)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_document_name ON files (document_name, upload_timestamp)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_upload_timestamp ON files (upload_timestamp)")
+
+            # Attributes joined into chunk metadata at retrieval time
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS file_attributes (
+                    file_hash TEXT PRIMARY KEY,
+                    attributes TEXT NOT NULL
+                )
+            """)
+
+            # One row per attribute value (per element for lists), so metadata filters
+            # on file-level keys resolve to file hashes through an index
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS file_attribute_values (
+                    key TEXT NOT NULL,
+                    value,
+                    file_hash TEXT NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_attribute_values_key_value ON file_attribute_values (key, value)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_attribute_values_file_hash ON file_attribute_values (file_hash)")
+
+            # Registries created before the value index
+            if self._conn.execute("SELECT 1 FROM file_attribute_values LIMIT 1").fetchone() is None:
+                for row in self._conn.execute("SELECT file_hash, attributes FROM file_attributes").fetchall():
+                    self._index_attributes(row['file_hash'], json.loads(row['attributes']))
+
+            # Chunks each file references. A deduplicated chunk is stored once, under the
+            # file_hash of the file that first added it; shared marks the rows of the other
+            # files, which only reach the chunk through this table
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS file_chunks (
+                    file_hash TEXT NOT NULL,
+                    doc_id TEXT NOT NULL,
+                    shared INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (file_hash, doc_id)
+                ) WITHOUT ROWID
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_file_chunks_doc_id ON file_chunks (doc_id)")
+
+            # Registries created before the membership table; a chunk listed by several
+            # files may be stored under any of them, so all of their rows count as shared
+            if self._conn.execute("SELECT 1 FROM file_chunks LIMIT 1").fetchone() is None:
+                for row in self._conn.execute("SELECT file_hash, record FROM files").fetchall():
+                    self._index_chunks(row['file_hash'], json.loads(row['record']).get('doc_ids', []), ())
+                self._conn.execute(
+                    "UPDATE file_chunks SET shared = 1 WHERE doc_id IN "
+                    "(SELECT doc_id FROM file_chunks GROUP BY doc_id HAVING COUNT(*) > 1)"
+                )
+
+        logger.info(f"File registry initialized. Database: {self.db_path}")
+
+    @property
+    def _conn(self):
+        return get_connection(self.db_path)
+
+    def get(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """Get a file record by hash"""
+        row = self._conn.execute("SELECT record FROM files WHERE file_hash = ?", (file_hash,)).fetchone()
+        return json.loads(row['record']) if row else None
+
+    def get_by_document_name(self, document_name: str) -> Optional[Dict[str, Any]]:
+        """Get the latest file record stored under a logical document name"""
+        row = self._conn.execute(
+            "SELECT record FROM files WHERE document_name = ? ORDER BY upload_timestamp DESC LIMIT 1",
+            (document_name,)
+        ).fetchone()
+        return json.loads(row['record']) if row else None
+
+    def add(self, file_record: Dict[str, Any], shared_doc_ids: Iterable[str] = ()) -> None:
+        """Insert or replace a file record, its chunk-level attributes and its chunk membership
+
+        shared_doc_ids are the file's chunks stored under another file's hash
+        (deduplicated or kept from a previous version).
+        """
+        attributes = {
+            'source_type': 'file_upload',
+            **{key: file_record[key] for key in FILE_ATTRIBUTE_KEYS if key in file_record},
+            **file_record.get('custom_metadata', {})
+        }
+
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO file_attributes (file_hash, attributes) VALUES (?, ?)",
+                (file_record['file_hash'], json.dumps(attributes))
+            )
+            self._conn.execute("DELETE FROM file_attribute_values WHERE file_hash = ?", (file_record['file_hash'],))
+            self._index_attributes(file_record['file_hash'], attributes)
+            self._conn.execute("DELETE FROM file_chunks WHERE file_hash = ?", (file_record['file_hash'],))
+            self._index_chunks(file_record['file_hash'], file_record.get('doc_ids', []), shared_doc_ids)
+            self._conn.execute(
+                """INSERT OR REPLACE INTO files
+                   (file_hash, filename, document_name, file_extension, file_size, total_chunks, upload_timestamp, record)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    file_record['file_hash'],
+                    file_record['filename'],
+                    file_record.get('document_name', file_record['filename']),
+                    file_record.get('file_extension'),
+                    file_record.get('file_size', 0),
+                    file_record.get('total_chunks', 0),
+                    file_record['upload_timestamp'],
+                    json.dumps(file_record)
+                )
+            )
+
+    def _index_attributes(self, file_hash: str, attributes: Dict[str, Any]) -> None:
+        rows = []
+        for key, value in attributes.items():
+            items = value if isinstance(value, list) else [value]
+            if key == 'tags' and isinstance(value, str):
+                # Upload forms send tags as one comma-separated string; each tag matches on its own
+                items = list(dict.fromkeys([value] + [tag.strip() for tag in value.split(',') if tag.strip()]))
+            for item in items:
+                if isinstance(item, (str, int, float, bool)):
+                    rows.append((key, item, file_hash))
+
+        self._conn.executemany("INSERT INTO file_attribute_values (key, value, file_hash) VALUES (?, ?, ?)", rows)
+
+    def _index_chunks(self, file_hash: str, doc_ids: List[str], shared_doc_ids: Iterable[str]) -> None:
+        shared = set(shared_doc_ids)
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO file_chunks (file_hash, doc_id, shared) VALUES (?, ?, ?)",
+            [(file_hash, doc_id, doc_id in shared) for doc_id in dict.fromkeys(doc_ids)]
+        )
+
+    def remove(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """Delete a file record with its attributes and return it, or None if it was not registered"""
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute("SELECT record FROM files WHERE file_hash = ?", (file_hash,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM files WHERE file_hash = ?", (file_hash,))
+            self._conn.execute("DELETE FROM file_chunks WHERE file_hash = ?", (file_hash,))
+            self._conn.execute("DELETE FROM file_attributes WHERE file_hash = ?", (file_hash,))
+            self._conn.execute("DELETE FROM file_attribute_values WHERE file_hash = ?", (file_hash,))
+
+        return json.loads(row['record'])
+
+    def get_attributes(self, file_hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Map file hashes to the file-level attributes shared by all their chunks"""
+        found = {}
+        unique_hashes = list(set(file_hashes))
+
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(unique_hashes), 500):
+            batch = unique_hashes[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT file_hash, attributes FROM file_attributes WHERE file_hash IN ({','.join('?' * len(batch))})",
+                batch
+            ).fetchall()
+            found.update((row['file_hash'], json.loads(row['attributes'])) for row in rows)
+
+        return found
+
+    def has_attribute_key(self, key: str) -> bool:
+        """Whether any file carries the attribute"""
+        row = self._conn.execute("SELECT 1 FROM file_attribute_values WHERE key = ? LIMIT 1", (key,)).fetchone()
+        return row is not None
+
+    def find_files(self, key: str, operator: str, value: Any) -> List[str]:
+        """Hashes of files with an attribute value matching a Chroma-style condition
+
+        Supports $eq, $in, $gt, $gte, $lt and $lte; list attributes (e.g.
+        tags) match when any element does.
+        """
+        if operator in ('$eq', '$in'):
+            values = value if operator == '$in' else [value]
+            rows = self._conn.execute(
+                f"SELECT DISTINCT file_hash FROM file_attribute_values WHERE key = ? AND value IN ({','.join('?' * len(values))})",
+                [key, *values]
+            ).fetchall()
+        else:
+            comparison = {'$gt': '>', '$gte': '>=', '$lt': '<', '$lte': '<='}[operator]
+            rows = self._conn.execute(
+                f"SELECT DISTINCT file_hash FROM file_attribute_values WHERE key = ? AND value {comparison} ?",
+                (key, value)
+            ).fetchall()
+
+        return [row['file_hash'] for row in rows]
+
+    def referenced_elsewhere(self, doc_ids: List[str], file_hash: str) -> set:
+        """Those of the chunks that a file other than file_hash also references"""
+        found = set()
+        unique_ids = list(set(doc_ids))
+        for start in range(0, len(unique_ids), 500):
+            batch = unique_ids[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT DISTINCT doc_id FROM file_chunks WHERE file_hash != ? AND doc_id IN ({','.join('?' * len(batch))})",
+                [file_hash, *batch]
+            ).fetchall()
+            found.update(row['doc_id'] for row in rows)
+
+        return found
+
+    def shared_chunks(self, file_hashes: Optional[List[str]] = None) -> List[Tuple[str, str]]:
+        """(doc_id, file_hash) of chunks files reference but that are stored under another file's hash
+
+        Limited to the given files, or of every file when file_hashes is None.
+        """
+        if file_hashes is None:
+            rows = self._conn.execute("SELECT doc_id, file_hash FROM file_chunks WHERE shared = 1").fetchall()
+            return [(row['doc_id'], row['file_hash']) for row in rows]
+
+        found = []
+        unique_hashes = list(set(file_hashes))
+        for start in range(0, len(unique_hashes), 500):
+            batch = unique_hashes[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT doc_id, file_hash FROM file_chunks WHERE shared = 1 AND file_hash IN ({','.join('?' * len(batch))})",
+                batch
+            ).fetchall()
+            found.extend((row['doc_id'], row['file_hash']) for row in rows)
+
+        return found
+
+    def chunk_files(self, doc_ids: List[str]) -> Dict[str, str]:
+        """Map chunks to one registered file that references them"""
+        found = {}
+        unique_ids = list(set(doc_ids))
+        for start in range(0, len(unique_ids), 500):
+            batch = unique_ids[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT doc_id, file_hash FROM file_chunks WHERE doc_id IN ({','.join('?' * len(batch))})",
+                batch
+            ).fetchall()
+            for row in rows:
+                found.setdefault(row['doc_id'], row['file_hash'])
+
+        return found
+
+    def list(self, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """List file records, newest first"""
+        rows = self._conn.execute(
+            "SELECT record FROM files ORDER BY upload_timestamp DESC LIMIT ? OFFSET ?",
+            (limit if limit is not None else -1, offset)
+        ).fetchall()
+        return [json.loads(row['record']) for row in rows]
+
+    def count(self) -> int:
+        """Number of registered files"""
+        return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Aggregate file statistics"""
+        totals = self._conn.execute(
+            "SELECT COUNT(*) AS total_files, COALESCE(SUM(total_chunks), 0) AS total_chunks, "
+            "COALESCE(SUM(file_size), 0) AS total_size FROM files"
+        ).fetchone()
+        file_types = self._conn.execute(
+            "SELECT COALESCE(file_extension, 'unknown') AS ext, COUNT(*) AS n FROM files GROUP BY ext"
+        ).fetchall()
+
+        return {
+            'total_files': totals['total_files'],
+            'total_chunks': totals['total_chunks'],
+            'total_size_bytes': totals['total_size'],
+            'total_size_mb': round(totals['total_size'] / (1024 * 1024), 2),
+            'file_types': {row['ext']: row['n'] for row in file_types}
+        }
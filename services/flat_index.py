@@ -0,0 +1,482 @@
+import os
+import json
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from utils.db import get_connection
+from utils.logger import setup_logger
+from config import Config
+
+logger = setup_logger(__name__)
+
+# Largest batch VectorStore passes in one call (Chroma reports its own limit)
+MAX_BATCH_SIZE = 100000
+
+# Rows scored per matrix product; bounds the float32 copy of int8 blocks
+_BLOCK_ROWS = 16384
+
+_COMPARISONS = {'$eq': '=', '$gt': '>', '$gte': '>=', '$lt': '<', '$lte': '<='}
+
+def _metadata_value(key: str) -> str:
+    """SQL expression for a metadata key; spelled the same way as the expression indexes"""
+    path = '$."' + key + '"'
+    return "json_extract(metadata, '" + path.replace("'", "''") + "')"
+
+def _where_sql(where: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """Translate a Chroma metadata filter into an SQL condition on the JSON metadata column
+
+    As in Chroma, $ne and $nin also match documents without the key.
+    """
+    clauses, params = [], []
+    for key, condition in where.items():
+        if key in ('$and', '$or'):
+            parts = [_where_sql(sub_where) for sub_where in condition]
+            clauses.append('(' + f' {key[1:].upper()} '.join(sql for sql, _ in parts) + ')')
+            params.extend(param for _, sub_params in parts for param in sub_params)
+            continue
+
+        if not isinstance(condition, dict):
+            condition = {'$eq': condition}
+
+        column = _metadata_value(key)
+        for operator, value in condition.items():
+            if operator == '$in':
+                clauses.append(f"{column} IN ({','.join('?' * len(value))})")
+                params.extend(value)
+            elif operator == '$nin':
+                clauses.append(f"({column} IS NULL OR {column} NOT IN ({','.join('?' * len(value))}))")
+                params.extend(value)
+            elif operator == '$ne':
+                clauses.append(f"({column} IS NULL OR {column} != ?)")
+                params.append(value)
+            elif operator in _COMPARISONS:
+                clauses.append(f"{column} {_COMPARISONS[operator]} ?")
+                params.append(value)
+            else:
+                raise ValueError(f"Unsupported where operator: {operator}")
+
+    return ' AND '.join(clauses) or '1', params
+
+def _where_document_sql(where_document: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """Translate a Chroma document filter ($contains / $not_contains, $and / $or) into SQL"""
+    clauses, params = [], []
+    for operator, value in where_document.items():
+        if operator in ('$and', '$or'):
+            parts = [_where_document_sql(sub_where) for sub_where in value]
+            clauses.append('(' + f' {operator[1:].upper()} '.join(sql for sql, _ in parts) + ')')
+            params.extend(param for _, sub_params in parts for param in sub_params)
+        elif operator == '$contains':
+            clauses.append("instr(document, ?) > 0")
+            params.append(value)
+        elif operator == '$not_contains':
+            clauses.append("instr(document, ?) = 0")
+            params.append(value)
+        else:
+            raise ValueError(f"Unsupported where_document operator: {operator}")
+
+    return ' AND '.join(clauses) or '1', params
+
+def _normalize(vectors: Any) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+class FlatIndexCollection:
+    """Exact nearest-neighbour index over a memory-mapped embedding matrix
+
+    Implements the part of the Chroma collection API that VectorStore uses
+    (add, get, query, update, delete, count), so it can stand in for a
+    Chroma collection without chromadb. Embeddings are L2-normalized and
+    scored by inner product in blocks; distances are reported as squared L2
+    (2 - 2 * cosine), as in Chroma's default space. With dtype 'int8' every
+    row is scalar-quantized with its own scale, a quarter of the float32
+    size. Documents and metadata live in SQLite next to the matrix.
+
+    Several processes (e.g. web workers) may share an index directory: slots
+    are allocated and freed inside immediate SQLite transactions, and every
+    change bumps a generation counter that tells the other processes to
+    reload their map of live rows before the next search.
+    """
+
+    def __init__(self, path: str, dtype: str = None):
+        """Open or create the index stored in path"""
+        self.path = path
+        self.dtype = np.dtype(dtype or Config.FLAT_INDEX_DTYPE)
+        if self.dtype not in (np.float32, np.int8):
+            raise ValueError(f"Unsupported flat index dtype '{self.dtype.name}'. Supported: float32, int8")
+
+        os.makedirs(path, exist_ok=True)
+        self.db_path = os.path.join(path, 'index.db')
+        self.vectors_path = os.path.join(path, f"vectors.{self.dtype.name}")
+        self.scales_path = os.path.join(path, 'scales.float32')
+
+        self._lock = threading.RLock()
+        self._vectors = None
+        self._scales = None
+        self._capacity = 0
+
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS rows (
+                    slot INTEGER PRIMARY KEY,
+                    doc_id TEXT NOT NULL UNIQUE,
+                    document TEXT,
+                    metadata TEXT NOT NULL DEFAULT '{}'
+                )
+            """)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS free_slots (slot INTEGER PRIMARY KEY)")
+
+            # Filters on these keys are index lookups instead of scans over every row's JSON
+            for key in Config.FLAT_INDEX_METADATA_KEYS:
+                index_name = 'idx_rows_' + ''.join(c if c.isalnum() else '_' for c in key)
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON rows ({_metadata_value(key)})")
+
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            if self._meta('size') is None:
+                # Index written before slots were tracked in SQLite: record its gaps as free
+                slots = np.array([row['slot'] for row in self._conn.execute("SELECT slot FROM rows")], dtype=np.int64)
+                size = int(slots.max()) + 1 if len(slots) else 0
+                live = np.zeros(size, dtype=bool)
+                live[slots] = True
+                self._conn.executemany("INSERT OR IGNORE INTO free_slots (slot) VALUES (?)",
+                                       [(slot,) for slot in np.flatnonzero(~live).tolist()])
+                self._conn.execute("INSERT INTO meta (key, value) VALUES ('size', ?)", (str(size),))
+            self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', '0')")
+
+        self._dimension = None
+        self._generation = None
+        self._size = 0
+        self._live = np.zeros(0, dtype=bool)
+        self._sync()
+
+        logger.info(f"Flat index opened with {self.count()} vectors ({self.dtype.name}). Path: {self.path}")
+
+    @property
+    def _conn(self):
+        return get_connection(self.db_path)
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    def _sync(self) -> None:
+        """Reload the live-row map if another process changed the index since it was taken"""
+        with self._lock:
+            generation = self._meta('generation')
+            if generation == self._generation:
+                return
+
+            # Read in one snapshot, so the map matches the generation it is tagged with
+            with self._conn:
+                self._conn.execute("BEGIN")
+                generation = self._meta('generation')
+                dimension = self._meta('dimension')
+                size = int(self._meta('size') or 0)
+                slots = np.array([row['slot'] for row in self._conn.execute("SELECT slot FROM rows")], dtype=np.int64)
+
+            self._live = np.zeros(max(size, 1024), dtype=bool)
+            self._live[slots] = True
+            self._size = size
+            self._dimension = int(dimension) if dimension is not None else None
+            if self._dimension is not None:
+                self._ensure_capacity(self._size)
+            self._generation = generation
+
+    def _bump_generation(self) -> bool:
+        """Record a change to the slot set inside the current transaction
+
+        Returns whether this process's map was current before the change, in
+        which case the caller updates it in place instead of reloading.
+        """
+        current = self._meta('generation') == self._generation
+        self._conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'")
+        if current:
+            self._generation = self._meta('generation')
+        return current
+
+    def _ensure_capacity(self, required: int) -> None:
+        """Map the matrix files, growing them (by doubling) to hold at least required rows"""
+        if self._vectors is not None and required <= self._capacity:
+            return
+
+        row_bytes = self._dimension * self.dtype.itemsize
+        existing = os.path.getsize(self.vectors_path) // row_bytes if os.path.exists(self.vectors_path) else 0
+        capacity = max(required, existing, 2 * self._capacity, 1024)
+        files = [(self.vectors_path, self.dtype, (capacity, self._dimension))]
+        if self.dtype == np.int8:
+            files.append((self.scales_path, np.dtype(np.float32), (capacity,)))
+
+        mapped = []
+        for file_path, dtype, shape in files:
+            # Sparse growth; existing rows stay where they are
+            with open(file_path, 'ab') as f:
+                size = int(np.prod(shape)) * dtype.itemsize
+                if f.tell() < size:
+                    f.truncate(size)
+            mapped.append(np.memmap(file_path, dtype=dtype, mode='r+', shape=shape))
+
+        self._vectors = mapped[0]
+        self._scales = mapped[1] if len(mapped) > 1 else None
+        self._capacity = capacity
+
+    def count(self) -> int:
+        """Number of stored vectors"""
+        self._sync()
+        return int(np.count_nonzero(self._live))
+
+    def add(self, ids: List[str], embeddings: Any, metadatas: Optional[List[Dict[str, Any]]] = None,
+            documents: Optional[List[str]] = None) -> None:
+        """Store vectors with their documents and metadata; existing IDs are overwritten"""
+        vectors = _normalize(embeddings)
+        metadatas = metadatas or [None] * len(ids)
+        documents = documents or [None] * len(ids)
+
+        with self._lock, self._conn:
+            # Held until the rows are committed, so no other process takes the same slots
+            self._conn.execute("BEGIN IMMEDIATE")
+
+            dimension = self._meta('dimension')
+            if dimension is None:
+                self._conn.execute("INSERT INTO meta (key, value) VALUES ('dimension', ?)", (str(vectors.shape[1]),))
+                dimension = vectors.shape[1]
+            self._dimension = int(dimension)
+            if vectors.shape[1] != self._dimension:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self._dimension}")
+
+            # The last occurrence of a repeated ID wins, as with separate adds
+            rows = {doc_id: i for i, doc_id in enumerate(ids)}
+            slots = self._slots_for_ids(list(rows))
+            new_ids = [doc_id for doc_id in rows if doc_id not in slots]
+            slots.update(zip(new_ids, self._allocate(len(new_ids))))
+
+            ordered_slots = np.array([slots[doc_id] for doc_id in rows], dtype=np.int64)
+            size = int(self._meta('size'))
+            self._ensure_capacity(size)
+            self._write_vectors(ordered_slots, vectors[list(rows.values())])
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rows (slot, doc_id, document, metadata) VALUES (?, ?, ?, ?)",
+                [(slots[doc_id], doc_id, documents[i], json.dumps(metadatas[i] or {})) for doc_id, i in rows.items()]
+            )
+
+            if self._bump_generation():
+                if size > len(self._live):
+                    self._live = np.concatenate([self._live, np.zeros(max(size, 2 * len(self._live)) - len(self._live), dtype=bool)])
+                self._live[ordered_slots] = True
+                self._size = size
+
+    def _allocate(self, count: int) -> List[int]:
+        """Take count free slots inside the current transaction, reusing deleted ones first"""
+        if not count:
+            return []
+        slots = [row['slot'] for row in self._conn.execute(
+            "SELECT slot FROM free_slots ORDER BY slot LIMIT ?", (count,)
+        )]
+        if slots:
+            self._conn.execute("DELETE FROM free_slots WHERE slot <= ?", (slots[-1],))
+
+        size = int(self._meta('size'))
+        slots.extend(range(size, size + count - len(slots)))
+        self._conn.execute("UPDATE meta SET value = ? WHERE key = 'size'", (str(max(size, slots[-1] + 1)),))
+        return slots
+
+    def _write_vectors(self, slots: np.ndarray, vectors: np.ndarray) -> None:
+        if self._scales is None:
+            self._vectors[slots] = vectors
+        else:
+            # Per-row symmetric scale maps the largest component to 127
+            scales = np.abs(vectors).max(axis=1) / 127
+            scales[scales == 0] = 1.0
+            self._vectors[slots] = np.round(vectors / scales[:, None]).astype(np.int8)
+            self._scales[slots] = scales
+            self._scales.flush()
+        self._vectors.flush()
+
+    def _slots_for_ids(self, ids: List[str]) -> Dict[str, int]:
+        slots = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT doc_id, slot FROM rows WHERE doc_id IN ({','.join('?' * len(batch))})", batch
+            ).fetchall()
+            slots.update((row['doc_id'], row['slot']) for row in rows)
+        return slots
+
+    def _select(self, columns: str, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+                where_document: Optional[Dict[str, Any]] = None, limit: Optional[int] = None,
+                offset: Optional[int] = None) -> List[Any]:
+        """Rows matching all given filters, in slot order"""
+        conditions, params = [], []
+        for condition, build in ((where, _where_sql), (where_document, _where_document_sql)):
+            if condition:
+                sql, condition_params = build(condition)
+                conditions.append(sql)
+                params.extend(condition_params)
+
+        query = f"SELECT {columns} FROM rows WHERE {' AND '.join(conditions) or '1'}"
+        if ids is None:
+            paging = " LIMIT ? OFFSET ?" if limit is not None or offset else ""
+            paging_params = [limit if limit is not None else -1, offset or 0] if paging else []
+            return self._conn.execute(query + " ORDER BY slot" + paging, params + paging_params).fetchall()
+
+        rows = []
+        unique_ids = list(dict.fromkeys(ids))
+        for start in range(0, len(unique_ids), 500):
+            batch = unique_ids[start:start + 500]
+            rows.extend(self._conn.execute(
+                f"{query} AND doc_id IN ({','.join('?' * len(batch))})", params + batch
+            ).fetchall())
+        rows.sort(key=lambda row: row['slot'])
+        return rows[offset or 0:(offset or 0) + limit if limit is not None else None]
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None,
+            where_document: Optional[Dict[str, Any]] = None,
+            include: List[str] = ('metadatas', 'documents')) -> Dict[str, Any]:
+        """Stored documents by ID and/or filter; 'embeddings' in include returns the stored (normalized) vectors"""
+        rows = self._select('slot, doc_id, document, metadata', ids, where, where_document, limit, offset)
+        embeddings = None
+        if 'embeddings' in include:
+            self._sync()
+            slots = np.array([row['slot'] for row in rows], dtype=np.int64)
+            if len(slots):
+                with self._lock:
+                    # Rows another process added since the last sync may lie past the mapped matrix
+                    self._ensure_capacity(int(slots.max()) + 1)
+            embeddings = np.asarray(self._vectors[slots], dtype=np.float32) if len(slots) \
+                else np.zeros((0, self._dimension or 0), dtype=np.float32)
+            if self._scales is not None:
+                embeddings *= self._scales[slots, None]
+
+        return {
+            'ids': [row['doc_id'] for row in rows],
+            'embeddings': embeddings,
+            'documents': [row['document'] for row in rows] if 'documents' in include else None,
+            'metadatas': [json.loads(row['metadata']) or None for row in rows] if 'metadatas' in include else None
+        }
+
+    def query(self, query_embeddings: Any, n_results: int = 10, where: Optional[Dict[str, Any]] = None,
+              where_document: Optional[Dict[str, Any]] = None,
+              include: List[str] = ('metadatas', 'documents', 'distances'),
+              ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Exact top-k neighbours of each query embedding, among the given IDs when ids is set"""
+        queries = _normalize(query_embeddings)
+
+        self._sync()
+        with self._lock:
+            vectors, scales, size = self._vectors, self._scales, self._size
+            mask = self._live[:size].copy()
+
+        candidates = None
+        if ids is not None or where or where_document:
+            candidates = np.array([row['slot'] for row in self._select('slot', ids, where, where_document)],
+                                  dtype=np.int64)
+            candidates = candidates[candidates < size]
+            candidates = candidates[mask[candidates]]
+
+        k = min(n_results, int(np.count_nonzero(mask)) if candidates is None else len(candidates))
+        if k == 0:
+            empty = [[] for _ in queries]
+            return {'ids': empty, 'documents': empty, 'metadatas': empty, 'distances': empty}
+
+        # Keep each block's k best per query, then pick the overall k best among them.
+        # A filtered query only reads and scores the rows that passed the filter
+        best_scores, best_slots = [], []
+        total = size if candidates is None else len(candidates)
+        for start in range(0, total, _BLOCK_ROWS):
+            end = min(start + _BLOCK_ROWS, total)
+            if candidates is None:
+                block_slots = np.arange(start, end)
+                block_mask = mask[start:end]
+                if not block_mask.any():
+                    continue
+                block = vectors[start:end]
+            else:
+                block_slots = candidates[start:end]
+                block_mask = None
+                block = vectors[block_slots]
+
+            scores = np.asarray(block, dtype=np.float32) @ queries.T
+            if scales is not None:
+                scores *= scales[block_slots, None]
+            if block_mask is not None:
+                scores[~block_mask] = -np.inf
+
+            block_k = min(k, end - start)
+            top = np.argpartition(-scores, block_k - 1, axis=0)[:block_k]
+            best_scores.append(np.take_along_axis(scores, top, axis=0))
+            best_slots.append(block_slots[top])
+
+        scores = np.concatenate(best_scores)
+        slots = np.concatenate(best_slots)
+        order = np.argsort(-scores, axis=0, kind='stable')[:k]
+        top_scores = np.take_along_axis(scores, order, axis=0).T
+        top_slots = np.take_along_axis(slots, order, axis=0).T
+
+        rows = {}
+        wanted = np.unique(top_slots).tolist()
+        for start in range(0, len(wanted), 500):
+            batch = wanted[start:start + 500]
+            rows.update((row['slot'], row) for row in self._conn.execute(
+                f"SELECT slot, doc_id, document, metadata FROM rows WHERE slot IN ({','.join('?' * len(batch))})", batch
+            ))
+
+        results = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        for query_scores, query_slots in zip(top_scores, top_slots):
+            # Rows deleted after the mask was taken are dropped
+            hits = [(rows[slot], score) for slot, score in zip(query_slots.tolist(), query_scores.tolist())
+                    if slot in rows and score != -np.inf]
+            results['ids'].append([row['doc_id'] for row, _ in hits])
+            results['documents'].append([row['document'] for row, _ in hits])
+            results['metadatas'].append([json.loads(row['metadata']) or None for row, _ in hits])
+            results['distances'].append([max(0.0, 2.0 - 2.0 * score) for _, score in hits])
+
+        return {key: value for key, value in results.items() if key == 'ids' or key in include}
+
+    def update(self, ids: List[str], metadatas: Optional[List[Dict[str, Any]]] = None,
+               documents: Optional[List[str]] = None, embeddings: Any = None) -> None:
+        """Update stored entries; metadata is merged as in Chroma (None values remove keys)"""
+        with self._lock, self._conn:
+            # Keeps another process from freeing and reusing these slots mid-update
+            self._conn.execute("BEGIN IMMEDIATE")
+            slots = self._slots_for_ids(list(ids))
+            missing = [doc_id for doc_id in ids if doc_id not in slots]
+            if missing:
+                logger.warning(f"Update skipped {len(missing)} unknown IDs")
+
+            if metadatas is not None:
+                self._conn.executemany(
+                    "UPDATE rows SET metadata = json_patch(metadata, ?) WHERE doc_id = ?",
+                    [(json.dumps(metadata or {}), doc_id) for doc_id, metadata in zip(ids, metadatas)]
+                )
+            if documents is not None:
+                self._conn.executemany("UPDATE rows SET document = ? WHERE doc_id = ?",
+                                       [(document, doc_id) for doc_id, document in zip(ids, documents)])
+
+            if embeddings is not None:
+                vectors = _normalize(embeddings)
+                known = [i for i, doc_id in enumerate(ids) if doc_id in slots]
+                self._dimension = int(self._meta('dimension'))
+                self._ensure_capacity(int(self._meta('size')))
+                self._write_vectors(np.array([slots[ids[i]] for i in known], dtype=np.int64), vectors[known])
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+               where_document: Optional[Dict[str, Any]] = None) -> None:
+        """Delete entries by ID and/or filter"""
+        if ids is None and where is None and where_document is None:
+            raise ValueError("Either ids, where or where_document must be given")
+
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            slots = [row['slot'] for row in self._select('slot', ids, where, where_document)]
+
+            for start in range(0, len(slots), 500):
+                batch = slots[start:start + 500]
+                self._conn.execute(f"DELETE FROM rows WHERE slot IN ({','.join('?' * len(batch))})", batch)
+            self._conn.executemany("INSERT OR IGNORE INTO free_slots (slot) VALUES (?)", [(slot,) for slot in slots])
+
+            if self._bump_generation():
+                self._live[slots] = False
@@ -0,0 +1,352 @@
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from services.file_manager import FileManager
+from utils.db import get_connection
+from utils.helpers import get_current_timestamp
+from utils.logger import setup_logger
+from config import Config
+
+logger = setup_logger(__name__)
+
+class JobQueueFullError(Exception):
+    """Raised when too many ingestion jobs are already pending"""
+    pass
+
+class IngestionJobQueue:
+    """Ingestion jobs persisted in SQLite and shared by all worker processes
+
+    Each queued or running job is leased by the process that will run it,
+    and a heartbeat thread keeps renewing that process's leases. A job runs
+    only after its owner claims it with a conditional update, so it never
+    runs twice at once. Jobs whose lease ran out, because their worker died,
+    are taken over by another worker. That worker first releases the chunk
+    references the job had written, then retries the job.
+    """
+    ACTIVE_STATUSES = ('queued', 'running')
+
+    def __init__(self, file_manager: FileManager, db_path: str = None, max_workers: int = None,
+                 lease_seconds: float = None):
+        """Initialize the ingestion job queue and resume abandoned jobs"""
+        self.file_manager = file_manager
+        self.db_path = db_path or Config.JOBS_DB_PATH
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or Config.INGEST_WORKERS,
+            thread_name_prefix='ingest'
+        )
+        self._lock = threading.Lock()
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds or Config.JOB_LEASE_SECONDS
+
+        self._create_tables()
+        self._resume_unfinished_jobs()
+
+        self._stopped = threading.Event()
+        self._heartbeat = threading.Thread(target=self._renew_leases, name='ingest-heartbeat', daemon=True)
+        self._heartbeat.start()
+
+        logger.info(f"Ingestion job queue initialized. Jobs database: {self.db_path}")
+
+    @property
+    def _conn(self):
+        return get_connection(self.db_path)
+
+    def _create_tables(self) -> None:
+        """Create the jobs table if needed"""
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    chunks_done INTEGER NOT NULL DEFAULT 0,
+                    total_chunks INTEGER,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    stage_started_at TEXT,
+                    finished_at TEXT
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)")
+
+            # Jobs databases created before leases
+            columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if 'owner' not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN lease_until REAL")
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+
+            # Chunk references a job has taken for a file that is not registered yet
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS job_chunks (
+                    job_id TEXT NOT NULL,
+                    file_hash TEXT NOT NULL,
+                    doc_id TEXT NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_job_chunks_job_id ON job_chunks (job_id)")
+
+    def _renew_leases(self) -> None:
+        """Keep this process's jobs leased and take over jobs whose worker stopped"""
+        while not self._stopped.wait(self.lease_seconds / 3):
+            try:
+                with self._conn:
+                    self._conn.execute(
+                        "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status IN (?, ?)",
+                        (time.time() + self.lease_seconds, self.owner, *self.ACTIVE_STATUSES)
+                    )
+                self._resume_unfinished_jobs()
+            except Exception as e:
+                logger.error(f"Error renewing ingestion job leases: {str(e)}")
+
+    def _resume_unfinished_jobs(self) -> None:
+        """Take over queued or running jobs whose lease expired and run them again"""
+        rows = self._conn.execute(
+            "SELECT job_id FROM jobs WHERE status IN (?, ?) AND (lease_until IS NULL OR lease_until < ?) "
+            "ORDER BY created_at",
+            (*self.ACTIVE_STATUSES, time.time())
+        ).fetchall()
+
+        resumed = 0
+        for row in rows:
+            job_id = row['job_id']
+            with self._conn:
+                # Only one worker wins the takeover
+                taken = self._conn.execute(
+                    "UPDATE jobs SET status = 'queued', stage = 'queued', chunks_done = 0, owner = ?, lease_until = ? "
+                    "WHERE job_id = ? AND status IN (?, ?) AND (lease_until IS NULL OR lease_until < ?)",
+                    (self.owner, time.time() + self.lease_seconds, job_id, *self.ACTIVE_STATUSES, time.time())
+                ).rowcount
+            if not taken:
+                continue
+
+            self._release_job_chunks(job_id)
+            self.executor.submit(self._run, job_id)
+            resumed += 1
+
+        if resumed:
+            logger.info(f"Resumed {resumed} abandoned ingestion jobs")
+
+    def _record_job_chunks(self, job_id: str, file_hash: str, doc_ids: List[str]) -> None:
+        with self._conn:
+            self._conn.executemany("INSERT INTO job_chunks (job_id, file_hash, doc_id) VALUES (?, ?, ?)",
+                                   [(job_id, file_hash, doc_id) for doc_id in doc_ids])
+
+    def _release_job_chunks(self, job_id: str) -> None:
+        """Release the chunk references an abandoned run of a job left behind
+
+        Files the run managed to register keep theirs.
+        """
+        rows = self._conn.execute("SELECT file_hash, doc_id FROM job_chunks WHERE job_id = ?", (job_id,)).fetchall()
+        registered = {file_hash for file_hash in {row['file_hash'] for row in rows}
+                      if self.file_manager.file_registry.get(file_hash) is not None}
+        doc_ids = [row['doc_id'] for row in rows if row['file_hash'] not in registered]
+        if doc_ids:
+            deleted = self.file_manager.release_chunks(doc_ids)
+            logger.info(f"Released {len(doc_ids)} chunk references of abandoned job {job_id} ({deleted} deleted)")
+        self._forget_job_chunks(job_id)
+
+    def _forget_job_chunks(self, job_id: str) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+
+    def pending_count(self) -> int:
+        """Count jobs that are queued or running"""
+        row = self._conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", self.ACTIVE_STATUSES
+        ).fetchone()
+        return row[0]
+
+    def submit_file(self, file_path: str, filename: str,
+                    custom_metadata: Optional[Dict[str, Any]] = None,
+                    file_info: Optional[Dict[str, Any]] = None,
+                    document_name: Optional[str] = None,
+                    mode: str = 'create') -> Dict[str, Any]:
+        """Queue a saved file for background ingestion"""
+        return self._submit('file', {
+            'file_path': file_path,
+            'filename': filename,
+            'custom_metadata': custom_metadata or {},
+            'file_info': file_info,
+            'document_name': document_name,
+            'mode': mode
+        })
+
+    def submit_files(self, items: List[Dict[str, Any]],
+                     custom_metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Queue several saved files for one parallel ingestion job"""
+        return self._submit('files', {
+            'files': items,
+            'custom_metadata': custom_metadata or {}
+        })
+
+    def _submit(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Persist a new job and hand it to the worker pool"""
+        with self._lock:
+            if self.pending_count() >= Config.MAX_PENDING_JOBS:
+                raise JobQueueFullError(f"Too many pending ingestion jobs (limit {Config.MAX_PENDING_JOBS})")
+
+            job_id = str(uuid.uuid4())
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO jobs (job_id, kind, status, stage, payload, created_at, owner, lease_until) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, 'queued', 'queued', json.dumps(payload), get_current_timestamp(),
+                     self.owner, time.time() + self.lease_seconds)
+                )
+
+        self.executor.submit(self._run, job_id)
+        logger.info(f"Queued {kind} ingestion job {job_id}")
+        return self.get_job(job_id)
+
+    @staticmethod
+    def _payload_files(kind: str, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """List the saved files a job payload refers to"""
+        return payload['files'] if kind == 'files' else [payload]
+
+    def _update(self, job_id: str, **fields) -> None:
+        """Update columns of a job row"""
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._conn:
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE job_id = ?",
+                (*fields.values(), job_id)
+            )
+
+    def _run(self, job_id: str) -> None:
+        """Claim a queued job and run its ingestion pipeline"""
+        now = get_current_timestamp()
+        with self._conn:
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = 'running', stage = 'extracting', started_at = ?, stage_started_at = ?, "
+                "owner = ?, lease_until = ?, attempts = attempts + 1 WHERE job_id = ? AND status = 'queued' AND owner = ?",
+                (now, now, self.owner, time.time() + self.lease_seconds, job_id, self.owner)
+            ).rowcount
+        if not claimed:
+            # Already run, or taken over by another worker
+            return
+
+        row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        payload = json.loads(row['payload'])
+
+        current_stage = {'name': 'extracting'}
+
+        def on_progress(stage: str, chunks_done: int = 0, total_chunks: int = None):
+            fields = {'stage': stage, 'chunks_done': chunks_done, 'total_chunks': total_chunks}
+            if stage != current_stage['name']:
+                current_stage['name'] = stage
+                fields['stage_started_at'] = get_current_timestamp()
+            self._update(job_id, **fields)
+
+        def record_chunks(file_hash: str, doc_ids: List[str]):
+            self._record_job_chunks(job_id, file_hash, doc_ids)
+
+        # Files an abandoned run already registered are not ingested again
+        registered = {}
+        if row['attempts'] > 1:
+            for item in self._payload_files(row['kind'], payload):
+                record = self.file_manager.file_registry.get(item['file_info']['file_hash']) if item.get('file_info') else None
+                if record is not None:
+                    registered[record['file_hash']] = record
+
+        try:
+            if row['kind'] == 'files':
+                result = self.file_manager.process_saved_files(
+                    [item for item in payload['files'] if item['file_info']['file_hash'] not in registered],
+                    payload['custom_metadata'],
+                    progress_callback=on_progress,
+                    chunks_callback=record_chunks
+                )
+                result['results'] += [
+                    {'success': True, 'message': f"File {record['filename']} processed successfully", 'file_info': record}
+                    for record in registered.values()
+                ]
+                result['total_files_processed'] += len(registered)
+            elif registered:
+                record = next(iter(registered.values()))
+                result = {'success': True, 'message': f"File {record['filename']} processed successfully",
+                          'file_info': record}
+            else:
+                result = self.file_manager.process_saved_file(
+                    payload['file_path'],
+                    payload['filename'],
+                    payload['custom_metadata'],
+                    payload['file_info'],
+                    progress_callback=on_progress,
+                    document_name=payload.get('document_name'),
+                    mode=payload.get('mode', 'create'),
+                    chunks_callback=record_chunks
+                )
+            self._update(
+                job_id,
+                status='completed',
+                stage='completed',
+                result=json.dumps(result),
+                finished_at=get_current_timestamp()
+            )
+            logger.info(f"Ingestion job {job_id} completed")
+
+        except Exception as e:
+            logger.error(f"Ingestion job {job_id} failed: {str(e)}")
+            self._update(
+                job_id,
+                status='failed',
+                stage='failed',
+                error=str(e),
+                finished_at=get_current_timestamp()
+            )
+
+        finally:
+            # The chunks now belong to registered files, or were released when the run failed
+            self._forget_job_chunks(job_id)
+            for item in self._payload_files(row['kind'], payload):
+                if os.path.exists(item['file_path']):
+                    os.remove(item['file_path'])
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get job status, progress and ETA"""
+        row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        payload = json.loads(row['payload'])
+        job = {
+            'job_id': row['job_id'],
+            'kind': row['kind'],
+            'filenames': [item['filename'] for item in self._payload_files(row['kind'], payload)],
+            'status': row['status'],
+            'stage': row['stage'],
+            'chunks_done': row['chunks_done'],
+            'total_chunks': row['total_chunks'],
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at'],
+            'eta_seconds': self._estimate_eta(row)
+        }
+
+        if row['result']:
+            job['result'] = json.loads(row['result'])
+        if row['error']:
+            job['error'] = row['error']
+
+        return job
+
+    def _estimate_eta(self, row) -> Optional[float]:
+        """Estimate remaining seconds from the embedding rate so far"""
+        if row['stage'] != 'embedding' or not row['total_chunks'] or not row['chunks_done']:
+            return None
+
+        elapsed = (datetime.now() - datetime.fromisoformat(row['stage_started_at'])).total_seconds()
+        remaining = row['total_chunks'] - row['chunks_done']
+        return round(elapsed / row['chunks_done'] * remaining, 1)
@@ -0,0 +1,149 @@
+import re
+import time
+from typing import Iterable, List, Tuple
+from utils.db import get_connection
+from utils.logger import setup_logger
+from config import Config
+
+logger = setup_logger(__name__)
+
+# Words, plus compounds such as part numbers and error codes (AB-1234, E.42, 0x1F:03)
+_COMPOUND = re.compile(r'\w+(?:[-./:]\w+)*')
+_WORD = re.compile(r'\w+')
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms of a text; compounds are kept whole and also split into their words"""
+    terms = []
+    for match in _COMPOUND.finditer(text.lower()):
+        compound = match.group()
+        terms.append(compound)
+        if not compound.isalnum():
+            terms.extend(_WORD.findall(compound))
+    return terms
+
+class LexicalIndex:
+    """Persistent BM25 inverted index over document texts, keyed by vector store doc ID
+
+    Backed by an SQLite FTS5 table, which stores the postings on disk and
+    ranks matches with BM25. Texts are tokenized here and stored as
+    space-separated terms, so part numbers and codes survive as single terms.
+    """
+
+    def __init__(self, db_path: str = None):
+        """Initialize lexical index"""
+        self.db_path = db_path or Config.LEXICAL_INDEX_DB_PATH
+
+        with self._conn:
+            # Terms only; document text and metadata stay in the vector store
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS postings USING fts5(terms, tokenize=\"unicode61 tokenchars '_-./:'\")"
+            )
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    rowid INTEGER PRIMARY KEY,
+                    doc_id TEXT NOT NULL UNIQUE
+                )
+            """)
+            # When the last full rebuild started and finished, shared by all worker processes
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS rebuild_state (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    started_at REAL NOT NULL,
+                    finished_at REAL
+                )
+            """)
+
+        logger.info(f"Lexical index initialized. Database: {self.db_path}")
+
+    @property
+    def _conn(self):
+        return get_connection(self.db_path)
+
+    def count(self) -> int:
+        """Number of indexed documents"""
+        return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def add(self, doc_ids: List[str], documents: List[str]) -> None:
+        """Index documents, replacing any already indexed under the same IDs"""
+        with self._conn:
+            self._delete(doc_ids)
+            for doc_id, document in zip(doc_ids, documents):
+                rowid = self._conn.execute("INSERT INTO documents (doc_id) VALUES (?)", (doc_id,)).lastrowid
+                self._conn.execute("INSERT INTO postings (rowid, terms) VALUES (?, ?)",
+                                   (rowid, ' '.join(tokenize(document))))
+
+    def remove(self, doc_ids: List[str]) -> None:
+        """Remove documents from the index; unknown IDs are ignored"""
+        with self._conn:
+            self._delete(doc_ids)
+
+    def _delete(self, doc_ids: List[str]) -> None:
+        unique_ids = list(set(doc_ids))
+
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(unique_ids), 500):
+            batch = unique_ids[start:start + 500]
+            placeholders = ','.join('?' * len(batch))
+            rowids = [row['rowid'] for row in self._conn.execute(
+                f"SELECT rowid FROM documents WHERE doc_id IN ({placeholders})", batch
+            )]
+            if rowids:
+                self._conn.executemany("DELETE FROM postings WHERE rowid = ?", [(rowid,) for rowid in rowids])
+                self._conn.execute(f"DELETE FROM documents WHERE doc_id IN ({placeholders})", batch)
+
+    def clear(self) -> None:
+        """Remove every document from the index"""
+        with self._conn:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM documents")
+
+    def claim_rebuild(self, stale_seconds: float = 3600) -> bool:
+        """Whether this process should run the rebuild of an empty index at startup
+
+        Only one of the workers starting together gets it; the others skip
+        the rebuild unless the one in progress has not finished within
+        stale_seconds (e.g. its worker died).
+        """
+        now = time.time()
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute("SELECT started_at, finished_at FROM rebuild_state WHERE id = 1").fetchone()
+            if row is not None and (row['finished_at'] is not None or now - row['started_at'] < stale_seconds):
+                return False
+            self._conn.execute("INSERT OR REPLACE INTO rebuild_state (id, started_at, finished_at) VALUES (1, ?, NULL)",
+                               (now,))
+        return True
+
+    def rebuild(self, pages: Iterable[Tuple[List[str], List[str]]]) -> int:
+        """Replace the index contents with the given (doc_ids, documents) pages; return the number indexed"""
+        self.clear()
+        indexed = 0
+        for doc_ids, documents in pages:
+            self.add(doc_ids, documents)
+            indexed += len(doc_ids)
+
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO rebuild_state (id, started_at, finished_at) VALUES "
+                               "(1, COALESCE((SELECT started_at FROM rebuild_state WHERE id = 1), ?), ?)",
+                               (time.time(), time.time()))
+
+        logger.info(f"Rebuilt lexical index with {indexed} documents")
+        return indexed
+
+    def search(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        """Best matching doc IDs with their BM25 scores (higher is better)"""
+        # Quote each term so FTS5 reads it literally; any term may match
+        terms = dict.fromkeys(tokenize(query))
+        if not terms:
+            return []
+
+        match = ' OR '.join(f'"{term}"' for term in terms)
+        rows = self._conn.execute("""
+            SELECT documents.doc_id, hits.rank
+            FROM (SELECT rowid, rank FROM postings WHERE postings MATCH ? ORDER BY rank LIMIT ?) AS hits
+            JOIN documents ON documents.rowid = hits.rowid
+            ORDER BY hits.rank
+        """, (match, limit)).fetchall()
+
+        # FTS5 ranks by negated BM25
+        return [(row['doc_id'], -row['rank']) for row in rows]
@@ -0,0 +1,135 @@
+import json
+import queue
+import threading
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Tuple
+from utils.logger import setup_logger
+from config import Config
+
+logger = setup_logger(__name__)
+
+_DONE = object()
+
+# Rejected lines reported back in full; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+def _parse_record(line: bytes) -> Tuple[str, Dict[str, Any]]:
+    """(text, metadata) of one NDJSON line; ValueError if it is not a valid document"""
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        raise ValueError("Record must be a JSON object")
+
+    text = record.get('text')
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("Text must be a non-empty string")
+
+    metadata = record.get('metadata') or {}
+    if not isinstance(metadata, dict):
+        raise ValueError("Metadata must be a dictionary")
+
+    return text.strip(), metadata
+
+def ingest_ndjson(stream: BinaryIO, add_batch: Callable[[List[str], List[Dict[str, Any]]], List[str]],
+                  batch_size: int = None, max_pending_batches: int = None,
+                  max_line_bytes: int = None) -> Iterator[Dict[str, Any]]:
+    """Add the documents of an NDJSON stream in batches, yielding running counts
+
+    Each line is a {"text": ..., "metadata": {...}} object. Lines are parsed
+    as they arrive and grouped into batches that a writer thread embeds and
+    inserts. At most max_pending_batches wait for the writer; when they are
+    all taken the reader stops reading the stream, so a client sending faster
+    than documents can be embedded is slowed down instead of buffered.
+    Invalid lines are counted and skipped. Running counts are yielded as each
+    batch is queued, then a final update with done=True once everything is
+    written; if a write fails, reading stops and the final update carries
+    the error.
+    """
+    batch_size = batch_size or Config.NDJSON_BATCH_SIZE
+    max_line_bytes = max_line_bytes or Config.NDJSON_MAX_LINE_BYTES
+    pending = queue.Queue(maxsize=max_pending_batches or Config.NDJSON_MAX_PENDING_BATCHES)
+    written = queue.Queue()
+    counts = {'received': 0, 'accepted': 0, 'rejected': 0, 'written': 0, 'batches': 0}
+    errors = []
+    failure = []
+
+    def write() -> None:
+        while True:
+            batch = pending.get()
+            if batch is _DONE:
+                return
+            if failure:
+                # Keep draining so the reader never blocks on a dead writer
+                continue
+            try:
+                add_batch(batch[0], batch[1])
+                written.put(len(batch[0]))
+            except Exception as e:
+                logger.error(f"Error writing NDJSON batch of {len(batch[0])} documents: {str(e)}")
+                failure.append(str(e))
+
+    def progress(done: bool = False) -> Dict[str, Any]:
+        while True:
+            try:
+                counts['written'] += written.get_nowait()
+                counts['batches'] += 1
+            except queue.Empty:
+                break
+        update = {**counts, 'pending_batches': pending.qsize(), 'done': done}
+        if done:
+            update['errors'] = errors
+            update['error'] = failure[0] if failure else None
+        return update
+
+    writer = threading.Thread(target=write, name='ndjson-writer', daemon=True)
+    writer.start()
+
+    texts, metadatas = [], []
+    try:
+        line_number = 0
+        while not failure:
+            line = stream.readline(max_line_bytes + 1)
+            if not line:
+                break
+            line_number += 1
+
+            if len(line) > max_line_bytes and not line.endswith(b'\n'):
+                # Skip the rest of an oversized line
+                while line and not line.endswith(b'\n'):
+                    line = stream.readline(max_line_bytes + 1)
+                counts['received'] += 1
+                counts['rejected'] += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'line': line_number, 'error': f"Line exceeds {max_line_bytes} bytes"})
+                continue
+
+            if not line.strip():
+                continue
+            counts['received'] += 1
+
+            try:
+                text, metadata = _parse_record(line)
+            except ValueError as e:
+                counts['rejected'] += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'line': line_number, 'error': str(e)})
+                continue
+
+            texts.append(text)
+            metadatas.append(metadata)
+            counts['accepted'] += 1
+
+            if len(texts) == batch_size:
+                # Blocks while the writer is max_pending_batches behind
+                pending.put((texts, metadatas))
+                texts, metadatas = [], []
+                yield progress()
+
+        if texts and not failure:
+            pending.put((texts, metadatas))
+    finally:
+        pending.put(_DONE)
+        writer.join()
+
+    final = progress(done=True)
+    logger.info(f"NDJSON ingest finished: {final['written']} written, {final['rejected']} rejected"
+                + (f", failed: {final['error']}" if final['error'] else ""))
+    yield final
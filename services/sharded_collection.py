@@ -0,0 +1,335 @@
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Callable, Tuple
+import numpy as np
+from utils.logger import setup_logger
+from config import Config
+
+logger = setup_logger(__name__)
+
+def load_shard_manifest(path: str = None) -> Optional[List[str]]:
+    """Shard collection names recorded in the manifest, or None if there is none"""
+    path = path or Config.SHARD_MANIFEST_PATH
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['shards']
+
+def shard_manifest_version(path: str = None) -> Optional[Tuple[int, int]]:
+    """Changes whenever the manifest is rewritten; None if there is no manifest"""
+    try:
+        stat = os.stat(path or Config.SHARD_MANIFEST_PATH)
+    except FileNotFoundError:
+        return None
+    # The manifest is replaced, never edited, so a rewrite is also a new inode
+    return stat.st_mtime_ns, stat.st_ino
+
+def save_shard_manifest(names: List[str], path: str = None) -> None:
+    """Atomically record the shard collection names"""
+    path = path or Config.SHARD_MANIFEST_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'shards': names}, f)
+    os.replace(temp_path, path)
+
+def shard_name(index: int) -> str:
+    """Collection name of a shard; shard 0 is the unsharded collection, so existing data stays put"""
+    return Config.COLLECTION_NAME if index == 0 else f"{Config.COLLECTION_NAME}_shard{index}"
+
+class ShardedCollection:
+    """Spreads documents over several collections and searches them in parallel
+
+    Exposes the same collection API as a single Chroma or flat collection.
+    Each document goes to one shard chosen by rendezvous hashing of its
+    routing key: the SHARD_KEY metadata value (e.g. tenant or category) when
+    the document has one, otherwise its file_hash, otherwise its ID. Adding a
+    shard therefore only reassigns about 1/N of the documents, which
+    rebalance() moves with their stored vectors. Queries fan out to the
+    shards on a thread pool and the per-shard top-k lists are merged by
+    distance; an equality filter on SHARD_KEY only searches the shards that
+    key routes to. Lookups, updates and deletes by ID go to every shard.
+
+    Every operation first checks the shard manifest, so shards added by
+    another worker process are opened before anything is routed.
+    """
+
+    def __init__(self, names: List[str], open_collection: Callable[[str], Any]):
+        """Open the named shard collections"""
+        self.names = list(names)
+        self.open_collection = open_collection
+        self.shards = [open_collection(name) for name in self.names]
+        self.shard_key = Config.SHARD_KEY
+        self._executor = ThreadPoolExecutor(max_workers=Config.SHARD_QUERY_WORKERS, thread_name_prefix='shard-query')
+        self._manifest_version = shard_manifest_version()
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self) -> None:
+        """Open shards that another process added to the manifest since it was last read"""
+        if shard_manifest_version() == self._manifest_version:
+            return
+
+        with self._refresh_lock:
+            version = shard_manifest_version()
+            if version == self._manifest_version:
+                return
+
+            names = load_shard_manifest() or []
+            if names[:len(self.names)] != self.names:
+                logger.warning(f"Shard manifest {names} does not extend the open shards {self.names}; keeping them")
+            elif len(names) > len(self.names):
+                # Shards before names, so a concurrent route never points past the shard list
+                self.shards = self.shards + [self.open_collection(name) for name in names[len(self.names):]]
+                self.names = list(names)
+                logger.info(f"Picked up shards from the manifest; {len(self.names)} shards in total")
+            self._manifest_version = version
+
+    def _map(self, func: Callable[[Any], Any], shard_indexes: Optional[List[int]] = None) -> List[Any]:
+        """Run func on each (selected) shard in parallel, results in shard order"""
+        shards = self.shards if shard_indexes is None else [self.shards[i] for i in shard_indexes]
+        if len(shards) == 1:
+            return [func(shards[0])]
+        return list(self._executor.map(func, shards))
+
+    @staticmethod
+    def _weight(routing_key: Any, name: str) -> int:
+        digest = hashlib.blake2b(f"{name}\x00{routing_key}".encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
+
+    def _route_key(self, routing_key: Any) -> int:
+        return max(range(len(self.names)), key=lambda i: self._weight(routing_key, self.names[i]))
+
+    def route(self, doc_id: str, metadata: Optional[Dict[str, Any]]) -> int:
+        """Index of the shard a document belongs on"""
+        metadata = metadata or {}
+        routing_key = metadata.get(self.shard_key) if self.shard_key else None
+        if routing_key is None:
+            routing_key = metadata.get('file_hash') or doc_id
+        return self._route_key(routing_key)
+
+    def _shards_for_where(self, where: Optional[Dict[str, Any]]) -> Optional[List[int]]:
+        """Shards that can hold matches of an equality / $in filter on SHARD_KEY; None means all"""
+        if not where or not self.shard_key:
+            return None
+
+        clauses = where['$and'] if '$and' in where else [where]
+        for clause in clauses:
+            condition = clause.get(self.shard_key) if isinstance(clause, dict) and len(clause) == 1 else None
+            if condition is None:
+                continue
+            if not isinstance(condition, dict):
+                condition = {'$eq': condition}
+            if '$eq' in condition:
+                return [self._route_key(condition['$eq'])]
+            if '$in' in condition:
+                return sorted({self._route_key(value) for value in condition['$in']})
+        return None
+
+    def count(self) -> int:
+        """Number of documents over all shards"""
+        self.refresh()
+        return sum(self._map(lambda shard: shard.count()))
+
+    def shard_counts(self) -> List[Dict[str, Any]]:
+        """Name and document count of every shard"""
+        self.refresh()
+        return [{'name': name, 'document_count': count}
+                for name, count in zip(self.names, self._map(lambda shard: shard.count()))]
+
+    def add(self, ids: List[str], embeddings: Any, metadatas: Optional[List[Dict[str, Any]]] = None,
+            documents: Optional[List[str]] = None) -> None:
+        """Add documents, each to the shard it routes to"""
+        self.refresh()
+        metadatas = metadatas if metadatas is not None else [None] * len(ids)
+        documents = documents if documents is not None else [None] * len(ids)
+
+        groups = {}
+        for i, (doc_id, metadata) in enumerate(zip(ids, metadatas)):
+            groups.setdefault(self.route(doc_id, metadata), []).append(i)
+
+        def add_group(shard_index: int) -> None:
+            positions = groups[shard_index]
+            self.shards[shard_index].add(
+                ids=[ids[i] for i in positions],
+                embeddings=[embeddings[i] for i in positions],
+                metadatas=[metadatas[i] for i in positions],
+                documents=[documents[i] for i in positions]
+            )
+
+        list(self._executor.map(add_group, groups))
+
+    def _locate(self, ids: List[str]) -> Dict[int, List[str]]:
+        """Group IDs by the shard currently holding them"""
+        found = self._map(lambda shard: shard.get(ids=ids, include=[])['ids'])
+        return {shard_index: shard_ids for shard_index, shard_ids in enumerate(found) if shard_ids}
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None,
+            where_document: Optional[Dict[str, Any]] = None,
+            include: List[str] = ('metadatas', 'documents')) -> Dict[str, Any]:
+        """Documents by ID and/or filter; pages run through the shards in order"""
+        self.refresh()
+        if ids is not None:
+            parts = self._map(lambda shard: shard.get(ids=ids, where=where, where_document=where_document,
+                                                      include=list(include)))
+            return self._concat(parts, include)
+
+        parts = []
+        skip = offset or 0
+        remaining = limit
+        for shard in self.shards:
+            if remaining is not None and remaining <= 0:
+                break
+            if skip:
+                # Skip whole shards without reading their rows
+                if where is None and where_document is None:
+                    matched = shard.count()
+                else:
+                    matched = len(shard.get(where=where, where_document=where_document, include=[])['ids'])
+                if skip >= matched:
+                    skip -= matched
+                    continue
+
+            part = shard.get(where=where, where_document=where_document, limit=remaining, offset=skip or None,
+                             include=list(include))
+            skip = 0
+            if remaining is not None:
+                remaining -= len(part['ids'])
+            parts.append(part)
+
+        return self._concat(parts, include)
+
+    @staticmethod
+    def _concat(parts: List[Dict[str, Any]], include: List[str]) -> Dict[str, Any]:
+        result = {'ids': [doc_id for part in parts for doc_id in part['ids']]}
+        for key in ('documents', 'metadatas'):
+            result[key] = [item for part in parts for item in part[key]] if key in include else None
+        result['embeddings'] = None
+        if 'embeddings' in include:
+            vectors = [np.asarray(part['embeddings']) for part in parts if len(part['ids'])]
+            result['embeddings'] = np.concatenate(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        return result
+
+    def query(self, query_embeddings: Any, n_results: int = 10, where: Optional[Dict[str, Any]] = None,
+              where_document: Optional[Dict[str, Any]] = None,
+              include: List[str] = ('metadatas', 'documents', 'distances'),
+              ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Top-k of each shard, merged by distance; among the given IDs when ids is set"""
+        self.refresh()
+        include = list(include) if 'distances' in include else [*include, 'distances']
+
+        def search(shard):
+            shard_ids = None
+            if ids is not None:
+                # Chroma rejects query IDs the collection does not hold
+                shard_ids = shard.get(ids=ids, include=[])['ids']
+                if not shard_ids:
+                    return {key: [[] for _ in query_embeddings] for key in ('ids', 'documents', 'metadatas', 'distances')}
+            return shard.query(query_embeddings=query_embeddings, n_results=n_results, where=where,
+                               where_document=where_document, include=include, ids=shard_ids)
+
+        parts = self._map(search, self._shards_for_where(where))
+
+        results = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        for query_index in range(len(query_embeddings)):
+            candidates = [
+                (distance, shard_number, position)
+                for shard_number, part in enumerate(parts)
+                for position, distance in enumerate(part['distances'][query_index])
+            ]
+            # A document being moved by rebalance() can briefly be in two shards
+            best = []
+            seen = set()
+            for candidate in sorted(candidates):
+                doc_id = parts[candidate[1]]['ids'][query_index][candidate[2]]
+                if doc_id not in seen:
+                    seen.add(doc_id)
+                    best.append(candidate)
+                    if len(best) == n_results:
+                        break
+
+            results['ids'].append([parts[shard]['ids'][query_index][position] for _, shard, position in best])
+            results['distances'].append([distance for distance, _, _ in best])
+            for key in ('documents', 'metadatas'):
+                if key in include:
+                    results[key].append([parts[shard][key][query_index][position] for _, shard, position in best])
+
+        return {key: value for key, value in results.items() if key == 'ids' or key in include}
+
+    def update(self, ids: List[str], metadatas: Optional[List[Dict[str, Any]]] = None,
+               documents: Optional[List[str]] = None, embeddings: Any = None) -> None:
+        """Update documents in whichever shard holds them"""
+        self.refresh()
+        positions = {doc_id: i for i, doc_id in enumerate(ids)}
+        for shard_index, shard_ids in self._locate(ids).items():
+            selected = [positions[doc_id] for doc_id in shard_ids]
+            self.shards[shard_index].update(
+                ids=shard_ids,
+                metadatas=[metadatas[i] for i in selected] if metadatas is not None else None,
+                documents=[documents[i] for i in selected] if documents is not None else None,
+                embeddings=[embeddings[i] for i in selected] if embeddings is not None else None
+            )
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+               where_document: Optional[Dict[str, Any]] = None) -> None:
+        """Delete by ID and/or filter on every shard holding matches"""
+        self.refresh()
+        if ids is not None:
+            for shard_index, shard_ids in self._locate(ids).items():
+                self.shards[shard_index].delete(ids=shard_ids, where=where, where_document=where_document)
+            return
+
+        self._map(lambda shard: shard.delete(where=where, where_document=where_document))
+
+    def add_shards(self, count: int) -> List[str]:
+        """Create count new empty shards; documents only move on rebalance()"""
+        self.refresh()
+        added = []
+        with self._refresh_lock:
+            for _ in range(count):
+                name = shard_name(len(self.names))
+                self.shards.append(self.open_collection(name))
+                self.names.append(name)
+                added.append(name)
+
+            save_shard_manifest(self.names)
+            self._manifest_version = shard_manifest_version()
+        logger.info(f"Added shards {', '.join(added)}; {len(self.names)} shards in total")
+        return added
+
+    def rebalance(self, page_size: int = 1000) -> Dict[str, int]:
+        """Move every document to the shard it now routes to, keeping its stored vector"""
+        self.refresh()
+        moved = {}
+        for source_index, shard in enumerate(self.shards):
+            offset = 0
+            while True:
+                page = shard.get(limit=page_size, offset=offset, include=['embeddings', 'metadatas', 'documents'])
+                if not page['ids']:
+                    break
+
+                groups = {}
+                for i, (doc_id, metadata) in enumerate(zip(page['ids'], page['metadatas'])):
+                    target_index = self.route(doc_id, metadata)
+                    if target_index != source_index:
+                        groups.setdefault(target_index, []).append(i)
+
+                for target_index, positions in groups.items():
+                    # Copy first, so an interruption leaves a duplicate rather than a loss
+                    self.shards[target_index].add(
+                        ids=[page['ids'][i] for i in positions],
+                        embeddings=[page['embeddings'][i] for i in positions],
+                        metadatas=[page['metadatas'][i] for i in positions],
+                        documents=[page['documents'][i] for i in positions]
+                    )
+                    shard.delete(ids=[page['ids'][i] for i in positions])
+                    moved[self.names[target_index]] = moved.get(self.names[target_index], 0) + len(positions)
+
+                # Moved documents left the shard, so only the kept ones advance the page
+                offset += len(page['ids']) - sum(len(positions) for positions in groups.values())
+
+        logger.info(f"Rebalanced shards: moved {sum(moved.values())} documents")
+        return moved
@@ -1,30 +1,254 @@
-import chromadb
-from chromadb.config import Settings
-from typing import List, Dict, Any, Optional
+import time
+import queue
+import threading
+import os
+import json
+from concurrent.futures import Future
+from typing import List, Dict, Any, Optional, Callable, NamedTuple, Union
+from services.file_registry import FileRegistry
+from services.lexical_index import LexicalIndex
+from services.flat_index import FlatIndexCollection, MAX_BATCH_SIZE as FLAT_INDEX_MAX_BATCH_SIZE
+from services.sharded_collection import ShardedCollection, load_shard_manifest, shard_manifest_version
+from services.collection_snapshot import write_snapshot, read_snapshot, read_manifest, restore_databases
+from services.embedding_cache import CachedEmbeddingFunction
+from services.embedding_provider import create_embedding_provider
 from utils.logger import setup_logger
 from utils.helpers import generate_doc_id, add_timestamp_to_metadata
 from config import Config
 
 logger = setup_logger(__name__)
 
+RETRIEVAL_MODES = ('dense', 'hybrid')
+
+class _FilterBranch(NamedTuple):
+    """One part of a resolved metadata filter: documents passing where, among ids when set
+
+    ids maps each document to the file it is attributed to.
+    """
+    where: Optional[Dict[str, Any]]
+    ids: Optional[Dict[str, str]]
+
+_NO_FILTER = [_FilterBranch(None, None)]
+
+# Comparisons on file-level keys, resolved to the files matching them positively
+_NEGATIONS = {'$ne': '$eq', '$nin': '$in'}
+
+def _condition_key(key: str, operator: str, value: Any) -> str:
+    return json.dumps([key, operator, value], sort_keys=True)
+
+def _combine(operator: str, clauses: List[Union[Dict[str, Any], bool]]) -> Union[Dict[str, Any], bool]:
+    """Join clauses with $and/$or, folding those already known to be true or false"""
+    absorbing = operator == '$or'
+    if any(clause is absorbing for clause in clauses):
+        return absorbing
+    clauses = [clause for clause in clauses if not isinstance(clause, bool)]
+    if not clauses:
+        return not absorbing
+    return clauses[0] if len(clauses) == 1 else {operator: clauses}
+
+class _CoalescingWriter:
+    """Gathers concurrent single-document adds into one embedding call and one collection write
+    
+    A background thread takes the first waiting document, keeps collecting
+    for up to window_ms or until max_docs are pending, writes them as one
+    batch, then resolves every caller's future with its doc ID (or the
+    batch's error).
+    """
+    
+    def __init__(self, write_batch: Callable[[List[str], List[Dict[str, Any]], List[str]], None],
+                 window_ms: float, max_docs: int):
+        self.write_batch = write_batch
+        self.window = window_ms / 1000
+        self.max_docs = max_docs
+        self.pending = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='vector-store-coalescer', daemon=True)
+        self.thread.start()
+    
+    def submit(self, text: str, metadata: Dict[str, Any], doc_id: str) -> Future:
+        """Queue a prepared document; the future resolves to its doc ID once its batch commits"""
+        future = Future()
+        self.pending.put((text, metadata, doc_id, future))
+        return future
+    
+    def _run(self) -> None:
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.window
+            
+            while len(batch) < self.max_docs:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            try:
+                self.write_batch([item[0] for item in batch], [item[1] for item in batch], [item[2] for item in batch])
+            except Exception as e:
+                logger.error(f"Error writing coalesced batch of {len(batch)} documents: {str(e)}")
+                for item in batch:
+                    item[3].set_exception(e)
+                continue
+            
+            logger.info(f"Added {len(batch)} coalesced documents")
+            for item in batch:
+                item[3].set_result(item[2])
+
 class VectorStore:
     def __init__(self):
         """Initialize ChromaDB vector store"""
         try:
-            self.client = chromadb.PersistentClient(path=Config.CHROMA_DB_PATH)
+            # Documents and queries are embedded here and passed to Chroma as vectors,
+            # so repeated texts (re-uploads, repeated queries) come from the embedding cache
+            self.embedding_provider = create_embedding_provider()
+            if Config.EMBEDDING_WARMUP:
+                self.embedding_provider.warm_up()
             
-            # Create or get collection
-            try:
-                self.collection = self.client.get_collection(name=Config.COLLECTION_NAME)
-                logger.info(f"Loaded existing collection: {Config.COLLECTION_NAME}")
-            except:
-                self.collection = self.client.create_collection(name=Config.COLLECTION_NAME)
-                logger.info(f"Created new collection: {Config.COLLECTION_NAME}")
+            self.embedding_function = self.embedding_provider
+            self.embedding_cache = None
+            if Config.ENABLE_EMBEDDING_CACHE:
+                self.embedding_function = CachedEmbeddingFunction(self.embedding_provider,
+                                                                  self.embedding_provider.model_name)
+                self.embedding_cache = self.embedding_function.cache
+            
+            if Config.VECTOR_BACKEND == 'flat':
+                # In-process exact search over a memory-mapped matrix; no chromadb needed
+                self.client = None
+                self.database_path = Config.FLAT_INDEX_PATH
+                self.max_batch_size = FLAT_INDEX_MAX_BATCH_SIZE
+            elif Config.VECTOR_BACKEND == 'chroma':
+                import chromadb
+                self.client = chromadb.PersistentClient(path=Config.CHROMA_DB_PATH)
+                self.database_path = Config.CHROMA_DB_PATH
+                self.max_batch_size = self.client.get_max_batch_size()
+            else:
+                raise ValueError(f"Unknown vector backend '{Config.VECTOR_BACKEND}'. Supported backends: chroma, flat")
+            
+            # One collection, or several shards searched in parallel
+            self._shard_lock = threading.Lock()
+            shard_names = load_shard_manifest() or [Config.COLLECTION_NAME]
+            if max(len(shard_names), Config.SHARD_COUNT) > 1:
+                self.collection = ShardedCollection(shard_names, self._open_collection)
+                if Config.SHARD_COUNT > len(shard_names):
+                    self.collection.add_shards(Config.SHARD_COUNT - len(shard_names))
+                    if self.collection.count() > 0:
+                        logger.warning("New shards stay empty until POST /admin/shards/rebalance moves documents to them")
+                logger.info(f"Using {len(self.collection.names)} shards of {Config.COLLECTION_NAME}")
+            else:
+                self.collection = self._open_collection(Config.COLLECTION_NAME)
+            
+            # File-level attributes of uploaded files, joined into chunk metadata on retrieval
+            self.file_registry = FileRegistry()
+            
+            # BM25 index over the same documents, for hybrid retrieval
+            self.lexical_index = None
+            if Config.ENABLE_LEXICAL_INDEX:
+                self.lexical_index = LexicalIndex()
+                if self.lexical_index.count() == 0 and self.collection.count() > 0:
+                    # Collection predates the index; one worker rebuilds it while the others start
+                    if self.lexical_index.claim_rebuild():
+                        self.rebuild_lexical_index()
+                    else:
+                        logger.info("Lexical index is being rebuilt by another worker")
+            
+            # Warm start a new replica from a snapshot instead of re-embedding
+            if Config.SNAPSHOT_RESTORE_PATH and self.collection.count() == 0:
+                self.import_snapshot(Config.SNAPSHOT_RESTORE_PATH)
+            
+            # Opt-in: batch concurrent add_document calls
+            self.coalescer = None
+            if Config.ENABLE_ADD_COALESCING:
+                self.coalescer = _CoalescingWriter(self._write_documents, Config.ADD_COALESCE_WINDOW_MS,
+                                                   Config.ADD_COALESCE_MAX_DOCS)
                 
         except Exception as e:
             logger.error(f"Failed to initialize vector store: {str(e)}")
             raise
     
+    @property
+    def collection(self):
+        """The document collection; switches to shards once another worker process starts sharding"""
+        if not isinstance(self._collection, ShardedCollection) \
+                and shard_manifest_version() != self._shard_manifest_version:
+            with self._shard_lock:
+                version = shard_manifest_version()
+                if not isinstance(self._collection, ShardedCollection) and version != self._shard_manifest_version:
+                    shard_names = load_shard_manifest() or [Config.COLLECTION_NAME]
+                    if len(shard_names) > 1:
+                        self._collection = ShardedCollection(shard_names, self._open_collection)
+                        logger.info(f"Switched to {len(shard_names)} shards of {Config.COLLECTION_NAME} from the manifest")
+                    self._shard_manifest_version = version
+        return self._collection
+    
+    @collection.setter
+    def collection(self, collection) -> None:
+        self._collection = collection
+        self._shard_manifest_version = shard_manifest_version()
+    
+    def _open_collection(self, name: str):
+        """Open or create a collection (or shard) of the configured backend"""
+        if self.client is None:
+            return FlatIndexCollection(os.path.join(Config.FLAT_INDEX_PATH, name))
+        
+        # Create or get collection
+        params = self.hnsw_params(name)
+        try:
+            collection = self.client.get_collection(name=name)
+        except:
+            collection = self.client.create_collection(name=name, configuration={'hnsw': {
+                'space': params['space'],
+                'max_neighbors': params['M'],
+                'ef_construction': params['construction_ef'],
+                'ef_search': params['search_ef']
+            }})
+            logger.info(f"Created new collection: {name} (HNSW {params})")
+            return collection
+        
+        logger.info(f"Loaded existing collection: {name}")
+        self._apply_hnsw_params(collection, params)
+        return collection
+    
+    @staticmethod
+    def hnsw_params(name: str) -> Dict[str, Any]:
+        """HNSW settings of a collection: the Config defaults with its HNSW_COLLECTION_PARAMS overrides"""
+        params = {
+            'space': Config.HNSW_SPACE,
+            'M': Config.HNSW_M,
+            'construction_ef': Config.HNSW_CONSTRUCTION_EF,
+            'search_ef': Config.HNSW_SEARCH_EF
+        }
+        
+        # Shards use their collection's overrides, then their own
+        if name.startswith(f"{Config.COLLECTION_NAME}_shard"):
+            params.update(Config.HNSW_COLLECTION_PARAMS.get(Config.COLLECTION_NAME, {}))
+        params.update(Config.HNSW_COLLECTION_PARAMS.get(name, {}))
+        
+        unknown = set(params) - {'space', 'M', 'construction_ef', 'search_ef'}
+        if unknown:
+            raise ValueError(f"Unknown HNSW parameters for collection '{name}': {', '.join(sorted(unknown))}")
+        if params['space'] not in ('l2', 'cosine', 'ip'):
+            raise ValueError(f"Unknown HNSW space '{params['space']}'. Supported spaces: l2, cosine, ip")
+        return params
+    
+    def _apply_hnsw_params(self, collection, params: Dict[str, Any]) -> None:
+        """Bring an existing collection's search_ef in line; the other settings are fixed when it is built"""
+        current = (collection.configuration or {}).get('hnsw') or {}
+        if not current:
+            return
+        
+        if current.get('ef_search') != params['search_ef']:
+            collection.modify(configuration={'hnsw': {'ef_search': params['search_ef']}})
+            logger.info(f"Set search_ef of {collection.name} to {params['search_ef']}")
+        
+        built = {'space': current.get('space'), 'M': current.get('max_neighbors'),
+                 'construction_ef': current.get('ef_construction')}
+        changed = {key: value for key, value in built.items() if value != params[key]}
+        if changed:
+            logger.warning(f"Collection {collection.name} was built with HNSW {changed}; the configured values "
+                           f"only apply to newly created collections")
+    
     def _sanitize_metadata(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """Convert metadata to ChromaDB-compatible format"""
         if not metadata:
@@ -57,12 +281,12 @@ class VectorStore:
             metadata['doc_id'] = doc_id
             metadata = self._sanitize_metadata(metadata)
             
+            if self.coalescer is not None:
+                # Returns once the batch holding this document has been written
+                return self.coalescer.submit(text, metadata, doc_id).result()
+            
             # Add to collection
-            self.collection.add(
-                documents=[text],
-                metadatas=[metadata],
-                ids=[doc_id]
-            )
+            self._write_documents([text], [metadata], [doc_id])
             
             logger.info(f"Added document with ID: {doc_id}")
             return doc_id
@@ -71,8 +295,14 @@ class VectorStore:
             logger.error(f"Error adding document: {str(e)}")
             raise
     
-    def add_documents_batch(self, documents: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> List[str]:
-        """Add multiple documents to vector store"""
+    def add_documents_batch(self, documents: List[str], metadatas: Optional[List[Dict[str, Any]]] = None,
+                            stamp_metadata: bool = True) -> List[str]:
+        """Add multiple documents to vector store
+        
+        With stamp_metadata=False the per-document timestamp and doc_id are
+        not stored; retrieval restores doc_id from the ID and file chunks take
+        their timestamp from the file registry.
+        """
         try:
             doc_ids = [generate_doc_id() for _ in documents]
             
@@ -82,17 +312,16 @@ class VectorStore:
             # Add timestamp and doc_id to each metadata, then sanitize
             sanitized_metadatas = []
             for i, metadata in enumerate(metadatas):
-                metadata = add_timestamp_to_metadata(metadata)
-                metadata['doc_id'] = doc_ids[i]
+                if stamp_metadata:
+                    metadata = add_timestamp_to_metadata(metadata)
+                    metadata['doc_id'] = doc_ids[i]
                 sanitized_metadata = self._sanitize_metadata(metadata)
                 sanitized_metadatas.append(sanitized_metadata)
             
-            # Add to collection
-            self.collection.add(
-                documents=documents,
-                metadatas=sanitized_metadatas,
-                ids=doc_ids
-            )
+            # Add to collection, within its per-call size limit
+            for start in range(0, len(documents), self.max_batch_size):
+                end = start + self.max_batch_size
+                self._write_documents(documents[start:end], sanitized_metadatas[start:end], doc_ids[start:end])
             
             logger.info(f"Added {len(documents)} documents")
             return doc_ids
@@ -101,26 +330,441 @@ class VectorStore:
             logger.error(f"Error adding documents batch: {str(e)}")
             raise
     
-    def retrieve_documents(self, query: str, n_results: int = None) -> Dict[str, List]:
+    def _write_documents(self, documents: List[str], metadatas: List[Dict[str, Any]], doc_ids: List[str]) -> None:
+        """Embed documents and add them to the collection in one write"""
+        self.collection.add(
+            documents=documents,
+            embeddings=self.embedding_function(documents),
+            metadatas=metadatas,
+            ids=doc_ids
+        )
+        if self.lexical_index is not None:
+            self.lexical_index.add(doc_ids, documents)
+    
+    def rebuild_lexical_index(self, page_size: int = 1000) -> int:
+        """Re-index every document in the collection for lexical search"""
+        def pages():
+            offset = 0
+            while True:
+                page = self.collection.get(limit=page_size, offset=offset, include=['documents'])
+                if not page['ids']:
+                    break
+                yield page['ids'], page['documents']
+                offset += len(page['ids'])
+        
+        try:
+            return self.lexical_index.rebuild(pages())
+        except Exception as e:
+            logger.error(f"Error rebuilding lexical index: {str(e)}")
+            raise
+    
+    def _snapshot_databases(self) -> Dict[str, str]:
+        """SQLite databases a snapshot carries so uploaded files keep their attributes, membership and dedup references"""
+        return {'file_registry': self.file_registry.db_path, 'chunk_index': Config.CHUNK_INDEX_DB_PATH}
+    
+    def export_snapshot(self, path: str, page_size: int = 5000) -> Dict[str, Any]:
+        """Write every document with its stored embedding, plus the file registry and chunk index, to a snapshot directory"""
+        def pages():
+            offset = 0
+            while True:
+                page = self.collection.get(limit=page_size, offset=offset,
+                                           include=['embeddings', 'documents', 'metadatas'])
+                if not page['ids']:
+                    break
+                yield page['ids'], page['embeddings'], page['documents'], page['metadatas']
+                offset += len(page['ids'])
+        
+        try:
+            started = time.perf_counter()
+            manifest = write_snapshot(path, pages(), {
+                'collection_name': Config.COLLECTION_NAME,
+                'embedding_model': self.embedding_provider.model_name
+            }, self._snapshot_databases())
+            return {**manifest, 'path': path, 'seconds': round(time.perf_counter() - started, 3)}
+        except Exception as e:
+            logger.error(f"Error exporting snapshot to {path}: {str(e)}")
+            raise
+    
+    def import_snapshot(self, path: str) -> Dict[str, Any]:
+        """Bulk-load a snapshot into the empty collection with its stored embeddings (nothing is re-embedded)
+        
+        The snapshot's file registry and chunk index replace the local ones.
+        """
+        try:
+            manifest = read_manifest(path)
+            if manifest['embedding_model'] != self.embedding_provider.model_name:
+                raise ValueError(f"Snapshot was embedded with {manifest['embedding_model']}, "
+                                 f"but the embedding provider is {self.embedding_provider.model_name}")
+            if self.collection.count() > 0:
+                raise ValueError("Snapshots can only be restored into an empty collection")
+            
+            started = time.perf_counter()
+            if self.lexical_index is not None:
+                self.lexical_index.clear()
+            
+            for ids, embeddings, documents, metadatas in read_snapshot(path, self.max_batch_size):
+                self.collection.add(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+                if self.lexical_index is not None:
+                    self.lexical_index.add(ids, documents)
+            restore_databases(path, self._snapshot_databases())
+            
+            seconds = round(time.perf_counter() - started, 3)
+            logger.info(f"Restored {manifest['count']} documents from snapshot {path} in {seconds}s")
+            return {**manifest, 'path': path, 'seconds': seconds}
+        except Exception as e:
+            logger.error(f"Error importing snapshot from {path}: {str(e)}")
+            raise
+    
+    def get_documents_metadata(self, doc_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Stored metadata of documents by ID, as written (without file attributes)"""
+        try:
+            page = self.collection.get(ids=doc_ids, include=['metadatas'])
+            return {doc_id: metadata or {} for doc_id, metadata in zip(page['ids'], page['metadatas'])}
+        except Exception as e:
+            logger.error(f"Error getting document metadata: {str(e)}")
+            raise
+    
+    def update_documents_metadata(self, doc_ids: List[str], metadatas: List[Dict[str, Any]],
+                                  stamp_metadata: bool = True) -> None:
+        """Replace metadata of stored documents without re-embedding them"""
+        try:
+            sanitized_metadatas = []
+            for doc_id, metadata in zip(doc_ids, metadatas):
+                if stamp_metadata:
+                    metadata = add_timestamp_to_metadata(dict(metadata))
+                    metadata['doc_id'] = doc_id
+                sanitized_metadatas.append(self._sanitize_metadata(metadata))
+            
+            self.collection.update(ids=doc_ids, metadatas=sanitized_metadatas)
+            
+            logger.info(f"Updated metadata of {len(doc_ids)} documents")
+            
+        except Exception as e:
+            logger.error(f"Error updating document metadata: {str(e)}")
+            raise
+    
+    def retrieve_documents(self, query: str, n_results: int = None, mode: str = None,
+                           where: Optional[Dict[str, Any]] = None,
+                           where_document: Optional[Dict[str, Any]] = None) -> Dict[str, List]:
         """Retrieve relevant documents for a query"""
+        try:
+            return self.retrieve_documents_batch([query], n_results, mode, where, where_document)[0]
+            
+        except Exception as e:
+            logger.error(f"Error retrieving documents: {str(e)}")
+            return {'documents': [], 'metadatas': [], 'distances': []}
+    
+    def retrieve_documents_batch(self, queries: List[str], n_results: int = None, mode: str = None,
+                                 where: Optional[Dict[str, Any]] = None,
+                                 where_document: Optional[Dict[str, Any]] = None) -> List[Dict[str, List]]:
+        """Retrieve relevant documents for many queries with one embedding call and one collection query
+        
+        Results are returned in query order. mode 'dense' (default:
+        RETRIEVAL_MODE) ranks by embedding distance; 'hybrid' fuses the dense
+        candidates with BM25 matches by reciprocal rank and adds their fused
+        'scores' (distances are None for documents only the lexical index found).
+        where (metadata) and where_document (text) filters use Chroma's syntax
+        and are applied inside the index search.
+        """
         try:
             if n_results is None:
                 n_results = Config.DEFAULT_N_RESULTS
-                
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results
+            
+            mode = mode or Config.RETRIEVAL_MODE
+            if mode not in RETRIEVAL_MODES:
+                raise ValueError(f"Unknown retrieval mode '{mode}'. Supported modes: {', '.join(RETRIEVAL_MODES)}")
+            hybrid = mode == 'hybrid' and self.lexical_index is not None
+            branches = self._prepare_where(where)
+            where_document = where_document or None
+            
+            # File whose membership matched, for hits that reach a file only through it
+            labels = {}
+            ids, documents, metadatas, distances = self._query_branches(
+                self.embedding_function(queries),
+                max(n_results, Config.HYBRID_CANDIDATES) if hybrid else n_results,
+                branches, where_document, labels
             )
+            scores = None
             
-            return {
-                'documents': results['documents'][0] if results['documents'] else [],
-                'metadatas': results['metadatas'][0] if results['metadatas'] else [],
-                'distances': results['distances'][0] if results['distances'] else []
-            }
+            if hybrid:
+                ids, documents, metadatas, distances, scores = self._fuse_lexical(
+                    queries, ids, documents, metadatas, distances, n_results, branches, where_document, labels
+                )
+            
+            # Resolve file attributes for all queries' hits in one registry lookup
+            joined = self._join_file_attributes(
+                [doc_id for query_ids in ids for doc_id in query_ids],
+                [metadata for query_metadatas in metadatas for metadata in query_metadatas],
+                labels
+            )
+            
+            batch_results = []
+            offset = 0
+            for i, (query_documents, query_distances) in enumerate(zip(documents, distances)):
+                query_results = {
+                    'documents': query_documents,
+                    'metadatas': joined[offset:offset + len(query_documents)],
+                    'distances': query_distances
+                }
+                if scores is not None:
+                    query_results['scores'] = scores[i]
+                batch_results.append(query_results)
+                offset += len(query_documents)
+            
+            return batch_results
             
         except Exception as e:
-            logger.error(f"Error retrieving documents: {str(e)}")
-            return {'documents': [], 'metadatas': [], 'distances': []}
+            logger.error(f"Error retrieving documents batch: {str(e)}")
+            raise
+    
+    def _query_branches(self, query_embeddings: Any, n_results: int, branches: List[_FilterBranch],
+                        where_document: Optional[Dict[str, Any]], labels: Dict[str, str]):
+        """(ids, documents, metadatas, distances) of each query's top n_results over all filter branches"""
+        parts = []
+        for branch in branches:
+            branch_ids = None
+            if branch.ids is not None:
+                # Chroma rejects query IDs it does not hold, so keep the members still stored
+                branch_ids = self.collection.get(ids=list(branch.ids), where=branch.where,
+                                                 where_document=where_document, include=[])['ids']
+                if not branch_ids:
+                    continue
+                for doc_id in branch_ids:
+                    labels.setdefault(doc_id, branch.ids[doc_id])
+            
+            results = self.collection.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                where=branch.where,
+                where_document=where_document,
+                **({'ids': branch_ids} if branch_ids is not None else {})
+            )
+            parts.append(results)
+        
+        if len(parts) == 1:
+            return tuple(parts[0][key] or [[] for _ in query_embeddings]
+                         for key in ('ids', 'documents', 'metadatas', 'distances'))
+        
+        # Merge the branches by distance; a document can match through several
+        merged = ([], [], [], [])
+        for query_index in range(len(query_embeddings)):
+            hits = sorted(
+                (
+                    (distance, doc_id, document, metadata)
+                    for results in parts
+                    for doc_id, document, metadata, distance in zip(
+                        results['ids'][query_index], results['documents'][query_index],
+                        results['metadatas'][query_index], results['distances'][query_index]
+                    )
+                ),
+                key=lambda hit: hit[0]
+            )
+            best = []
+            seen = set()
+            for hit in hits:
+                if hit[1] not in seen:
+                    seen.add(hit[1])
+                    best.append(hit)
+                    if len(best) == n_results:
+                        break
+            for values, position in zip(merged, (1, 2, 3, 0)):
+                values.append([hit[position] for hit in best])
+        return merged
+    
+    def _get_branches(self, doc_ids: List[str], branches: List[_FilterBranch],
+                      where_document: Optional[Dict[str, Any]], labels: Dict[str, str]) -> Dict[str, Any]:
+        """Map the given documents that pass any filter branch to (document, metadata)"""
+        fetched = {}
+        for branch in branches:
+            branch_ids = [doc_id for doc_id in doc_ids
+                          if doc_id not in fetched and (branch.ids is None or doc_id in branch.ids)]
+            if not branch_ids:
+                continue
+            page = self.collection.get(ids=branch_ids, where=branch.where, where_document=where_document,
+                                       include=['documents', 'metadatas'])
+            for doc_id, document, metadata in zip(page['ids'], page['documents'], page['metadatas']):
+                fetched[doc_id] = (document, metadata)
+                if branch.ids is not None:
+                    labels.setdefault(doc_id, branch.ids[doc_id])
+        return fetched
+    
+    def _fuse_lexical(self, queries: List[str], ids: List[List[str]], documents: List[List[str]],
+                      metadatas: List[List[Dict[str, Any]]], distances: List[List[float]], n_results: int,
+                      branches: List[_FilterBranch] = _NO_FILTER, where_document: Optional[Dict[str, Any]] = None,
+                      labels: Optional[Dict[str, str]] = None):
+        """Merge each query's dense candidates with its BM25 matches by reciprocal rank fusion"""
+        candidates = max(n_results, Config.HYBRID_CANDIDATES)
+        fused = []
+        
+        for query, dense_ids in zip(queries, ids):
+            scores = {}
+            lexical_ids = [doc_id for doc_id, _ in self.lexical_index.search(query, candidates)]
+            for ranking in (dense_ids, lexical_ids):
+                for rank, doc_id in enumerate(ranking, start=1):
+                    scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (Config.RRF_K + rank)
+            fused.append(sorted(scores.items(), key=lambda item: item[1], reverse=True))
+        
+        # Per query: doc ID -> (document, metadata, distance) of its dense hits
+        hits = [
+            {doc_id: hit for doc_id, *hit in zip(*query_hits)}
+            for query_hits in zip(ids, documents, metadatas, distances)
+        ]
+        
+        # Fetch lexical-only documents for all queries at once, applying the filters
+        missing = list(dict.fromkeys(
+            doc_id for query_fused, query_hits in zip(fused, hits)
+            for doc_id, _ in query_fused if doc_id not in query_hits
+        ))
+        fetched = {}
+        if missing:
+            fetched = {doc_id: (document, metadata, None) for doc_id, (document, metadata)
+                       in self._get_branches(missing, branches, where_document, labels if labels is not None else {}).items()}
+        
+        fused_ids, fused_documents, fused_metadatas, fused_distances, fused_scores = [], [], [], [], []
+        for query_fused, query_hits in zip(fused, hits):
+            # Documents filtered out or deleted since they were indexed are skipped
+            ranked = [(doc_id, score, query_hits.get(doc_id) or fetched.get(doc_id)) for doc_id, score in query_fused]
+            ranked = [item for item in ranked if item[2] is not None][:n_results]
+            
+            fused_ids.append([doc_id for doc_id, _, _ in ranked])
+            fused_documents.append([hit[0] for _, _, hit in ranked])
+            fused_metadatas.append([hit[1] for _, _, hit in ranked])
+            fused_distances.append([hit[2] for _, _, hit in ranked])
+            fused_scores.append([round(score, 6) for _, score, _ in ranked])
+        
+        return fused_ids, fused_documents, fused_metadatas, fused_distances, fused_scores
+    
+    def _prepare_where(self, where: Optional[Dict[str, Any]]) -> List[_FilterBranch]:
+        """Resolve a metadata filter into branches the collection can search
+        
+        File chunks keep file-level attributes (filename, upload_timestamp,
+        custom metadata such as category or tags) in the file registry, so
+        conditions on such keys are resolved against the registry's value
+        index. A chunk matches when some file referencing it satisfies the
+        filter, as if every file stored its own copy. Chunks are checked
+        against the file they are stored under by their file_hash; chunks a
+        file shares with one added earlier are stored under that file's hash,
+        so they are selected by ID from the registry's chunk membership and
+        checked against each referencing file's attributes instead.
+        """
+        if not where:
+            return _NO_FILTER
+        
+        files = {}
+        self._resolve_file_conditions(where, files)
+        stored = self._rewrite_where(where, files)
+        branches = [] if stored is False else [_FilterBranch(None if stored is True else stored, None)]
+        if not files:
+            return branches
+        
+        # Files with the same outcome for every file-level condition share one branch.
+        # Files matching none of them only matter when the filter can still pass (e.g. $ne)
+        matching_files = set().union(*files.values())
+        unmatched = self._rewrite_where(where, files, '')
+        groups = {}
+        for doc_id, file_hash in self.file_registry.shared_chunks(None if unmatched is not False else list(matching_files)):
+            outcome = tuple(file_hash in file_hashes for file_hashes in files.values())
+            group = groups.setdefault(outcome, (file_hash, {}))
+            group[1].setdefault(doc_id, file_hash)
+        
+        for file_hash, ids in groups.values():
+            file_where = self._rewrite_where(where, files, file_hash)
+            if file_where is not False:
+                branches.append(_FilterBranch(None if file_where is True else file_where, ids))
+        return branches
+    
+    def _resolve_file_conditions(self, where: Dict[str, Any], files: Dict[str, set]) -> None:
+        """Collect the hashes of files matching each file-level condition of a filter"""
+        for key, condition in where.items():
+            if key in ('$and', '$or'):
+                for sub_where in condition:
+                    self._resolve_file_conditions(sub_where, files)
+                continue
+            
+            conditions = condition.items() if isinstance(condition, dict) else [('$eq', condition)]
+            for operator, value in conditions:
+                condition_key = _condition_key(key, operator, value)
+                if condition_key not in files and self.file_registry.has_attribute_key(key):
+                    files[condition_key] = set(self.file_registry.find_files(key, _NEGATIONS.get(operator, operator), value))
+    
+    def _rewrite_where(self, where: Dict[str, Any], files: Dict[str, set],
+                       file_hash: Optional[str] = None) -> Union[Dict[str, Any], bool]:
+        """Chroma filter in one-condition-per-clause form, or True/False when it no longer depends on the chunk
+        
+        File-level conditions are checked against the file a chunk is stored
+        under, or decided for file_hash when given.
+        """
+        clauses = []
+        for key, condition in where.items():
+            if key in ('$and', '$or'):
+                clauses.append(_combine(key, [self._rewrite_where(sub_where, files, file_hash) for sub_where in condition]))
+                continue
+            
+            conditions = condition.items() if isinstance(condition, dict) else [('$eq', condition)]
+            for operator, value in conditions:
+                clauses.append(self._rewrite_condition(key, operator, value, files, file_hash))
+        
+        return _combine('$and', clauses)
+    
+    def _rewrite_condition(self, key: str, operator: str, value: Any, files: Dict[str, set],
+                           file_hash: Optional[str]) -> Union[Dict[str, Any], bool]:
+        clause = {key: {operator: value}}
+        file_hashes = files.get(_condition_key(key, operator, value))
+        if file_hashes is None:
+            return clause
+        
+        negated = operator in _NEGATIONS
+        if file_hash is not None:
+            return (file_hash in file_hashes) != negated
+        
+        by_file_hash = bool(file_hashes) and key != 'file_hash'
+        if negated:
+            # Like Chroma, documents without the key match; exclude chunks stored under files that have the value
+            return {'$and': [clause, {'file_hash': {'$nin': sorted(file_hashes)}}]} if by_file_hash else clause
+        
+        if operator in ('$gt', '$gte', '$lt', '$lte') and isinstance(value, str):
+            # Chroma compares numbers only; string ranges (e.g. upload dates) resolve through the registry
+            return {'file_hash': {'$in': sorted(file_hashes)}} if file_hashes else False
+        
+        return {'$or': [clause, {'file_hash': {'$in': sorted(file_hashes)}}]} if by_file_hash else clause
+    
+    def _join_file_attributes(self, doc_ids: List[str], metadatas: List[Dict[str, Any]],
+                              labels: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """Expand chunk metadata that only references its file with the file's attributes
+        
+        labels maps shared chunks found through a file's membership to that
+        file, which then replaces the file the chunk is stored under. Chunks
+        whose file was deleted while other files still share them are
+        attributed to one of those files.
+        """
+        labels = dict(labels or {})
+        file_hashes = [labels.get(doc_id) or metadata.get('file_hash')
+                       for doc_id, metadata in zip(doc_ids, metadatas)
+                       if doc_id in labels or (metadata and metadata.get('file_hash'))]
+        attributes = self.file_registry.get_attributes(file_hashes) if file_hashes else {}
+        
+        orphaned = [doc_id for doc_id, metadata in zip(doc_ids, metadatas)
+                    if doc_id not in labels and metadata and metadata.get('file_hash')
+                    and metadata['file_hash'] not in attributes]
+        if orphaned:
+            labels.update(self.file_registry.chunk_files(orphaned))
+            missing = [file_hash for file_hash in labels.values() if file_hash not in attributes]
+            attributes.update(self.file_registry.get_attributes(missing) if missing else {})
+        
+        joined = []
+        for doc_id, metadata in zip(doc_ids, metadatas):
+            metadata = dict(metadata or {})
+            if doc_id in labels:
+                metadata['file_hash'] = labels[doc_id]
+            file_attributes = attributes.get(metadata.get('file_hash'))
+            if file_attributes:
+                # Chunks stored before normalization already carry these keys
+                metadata = {**self._sanitize_metadata(file_attributes), **metadata}
+                metadata.setdefault('timestamp', file_attributes.get('upload_timestamp'))
+            metadata.setdefault('doc_id', doc_id)
+            joined.append(metadata)
+        
+        return joined
     
     def get_collection_info(self) -> Dict[str, Any]:
         """Get information about the collection"""
@@ -129,18 +773,103 @@ class VectorStore:
             return {
                 'collection_name': Config.COLLECTION_NAME,
                 'document_count': count,
-                'database_path': Config.CHROMA_DB_PATH
+                'vector_backend': Config.VECTOR_BACKEND,
+                'database_path': self.database_path,
+                'embedding_cache': self.embedding_cache.stats() if self.embedding_cache else None,
+                'shards': self.list_shards(),
+                'hnsw': self.hnsw_params(Config.COLLECTION_NAME) if self.client is not None else None
             }
         except Exception as e:
             logger.error(f"Error getting collection info: {str(e)}")
             raise
     
+    def list_shards(self) -> List[Dict[str, Any]]:
+        """Name and document count of each shard (a single entry when unsharded)"""
+        if isinstance(self.collection, ShardedCollection):
+            return self.collection.shard_counts()
+        return [{'name': Config.COLLECTION_NAME, 'document_count': self.collection.count()}]
+    
+    def add_shards(self, count: int, rebalance: bool = True) -> Dict[str, Any]:
+        """Add empty shards and optionally move documents onto them"""
+        try:
+            if not isinstance(self.collection, ShardedCollection):
+                # Start sharding: the current collection becomes shard 0
+                self.collection = ShardedCollection([Config.COLLECTION_NAME], self._open_collection)
+            
+            added = self.collection.add_shards(count)
+            moved = self.collection.rebalance() if rebalance else {}
+            return {'added': added, 'moved': moved, 'shards': self.list_shards()}
+            
+        except Exception as e:
+            logger.error(f"Error adding shards: {str(e)}")
+            raise
+    
+    def rebalance_shards(self) -> Dict[str, Any]:
+        """Move documents to the shards they route to, e.g. after adding shards or changing SHARD_KEY"""
+        try:
+            if not isinstance(self.collection, ShardedCollection):
+                return {'moved': {}, 'shards': self.list_shards()}
+            
+            moved = self.collection.rebalance()
+            return {'moved': moved, 'shards': self.list_shards()}
+            
+        except Exception as e:
+            logger.error(f"Error rebalancing shards: {str(e)}")
+            raise
+    
     def delete_document(self, doc_id: str) -> bool:
         """Delete a document by ID"""
         try:
             self.collection.delete(ids=[doc_id])
+            if self.lexical_index is not None:
+                self.lexical_index.remove([doc_id])
             logger.info(f"Deleted document with ID: {doc_id}")
             return True
         except Exception as e:
             logger.error(f"Error deleting document {doc_id}: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+    
+    def delete_documents(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+                         batch_size: Optional[int] = None) -> int:
+        """Delete documents by ID list or metadata filter in bounded batches; return the number deleted
+        
+        IDs are deleted as given, without checking that they exist. A where
+        filter (e.g. {'file_hash': ...}) is resolved a page of matching IDs at
+        a time so no single call grows with the number of matches.
+        """
+        if ids is None and where is None:
+            raise ValueError("Either ids or where must be given")
+        
+        batch_size = min(batch_size or Config.DELETE_BATCH_SIZE, self.max_batch_size)
+        deleted = 0
+        
+        try:
+            if ids is not None:
+                unique_ids = list(dict.fromkeys(ids))
+                for start in range(0, len(unique_ids), batch_size):
+                    batch = unique_ids[start:start + batch_size]
+                    if where is not None:
+                        # Only the listed documents that match the filter
+                        batch = self.collection.get(ids=batch, where=where, include=[])['ids']
+                        if not batch:
+                            continue
+                    self.collection.delete(ids=batch)
+                    if self.lexical_index is not None:
+                        self.lexical_index.remove(batch)
+                    deleted += len(batch)
+            else:
+                while True:
+                    batch = self.collection.get(where=where, limit=batch_size, include=[])['ids']
+                    if not batch:
+                        break
+                    self.collection.delete(ids=batch)
+                    if self.lexical_index is not None:
+                        self.lexical_index.remove(batch)
+                    deleted += len(batch)
+            
+            logger.info(f"Deleted {deleted} documents")
+            return deleted
+            
+        except Exception as e:
+            logger.error(f"Error deleting documents: {str(e)}")
+            raise
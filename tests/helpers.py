@@ -0,0 +1,20 @@
+from unittest import mock
+from config import Config
+
+def isolated_config(directory: str, **overrides):
+    """Patch every storage path of Config into directory, with the deterministic hashing embedder"""
+    return mock.patch.multiple(Config, **{
+        'CHROMA_DB_PATH': f'{directory}/chroma_db',
+        'FLAT_INDEX_PATH': f'{directory}/flat_index',
+        'SHARD_MANIFEST_PATH': f'{directory}/shards.json',
+        'UPLOAD_FOLDER': f'{directory}/uploads',
+        'JOBS_DB_PATH': f'{directory}/jobs.db',
+        'CHUNK_INDEX_DB_PATH': f'{directory}/chunk_index.db',
+        'FILE_REGISTRY_DB_PATH': f'{directory}/file_registry.db',
+        'EMBEDDING_CACHE_PATH': f'{directory}/embedding_cache',
+        'LEXICAL_INDEX_DB_PATH': f'{directory}/lexical_index.db',
+        'SNAPSHOT_DIR': f'{directory}/snapshots',
+        'EMBEDDING_PROVIDER': 'hashing',
+        'EMBEDDING_WARMUP': False,
+        **overrides
+    })
@@ -1,5 +1,14 @@
+import atexit
+import shutil
+import tempfile
 import unittest
 import json
-from app import create_app
+from tests.helpers import isolated_config
+
+# Importing the app builds the chatbot and job queue, so keep their data out of the repo
+_directory = tempfile.mkdtemp()
+atexit.register(shutil.rmtree, _directory, True)
+with isolated_config(_directory):
+    from app import create_app
 
 # class TestAPI
\ No newline at end of file
@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from tests.helpers import isolated_config
+from tests.test_file_filters import paragraph
+
+class TestSnapshotRoundTrip(unittest.TestCase):
+    """A replica restored from a snapshot keeps the uploaded files' attributes, filters and dedup references"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.snapshot_path = os.path.join(self.directory, 'snapshot')
+
+        with isolated_config(os.path.join(self.directory, 'primary'), CHUNK_SIZE=300, CHUNK_OVERLAP=0):
+            from services.vector_store import VectorStore
+            from services.file_manager import FileManager
+            vector_store = VectorStore()
+            file_manager = FileManager(vector_store)
+
+            self.files = {}
+            for filename, paragraphs, category in (('a.txt', range(0, 10), 'x'), ('b.txt', range(1, 11), 'y')):
+                path = os.path.join(self.directory, filename)
+                with open(path, 'w') as f:
+                    f.write('\n\n'.join(paragraph(i) for i in paragraphs))
+                result = file_manager.process_saved_file(path, filename, {'category': category})
+                self.files[filename] = result['file_info']['file_hash']
+
+            manifest = vector_store.export_snapshot(self.snapshot_path)
+            self.assertEqual(manifest['count'], 11)
+            self.assertEqual(sorted(manifest['databases']), ['chunk_index', 'file_registry'])
+
+        self.config = isolated_config(os.path.join(self.directory, 'replica'), CHUNK_SIZE=300, CHUNK_OVERLAP=0,
+                                      SNAPSHOT_RESTORE_PATH=self.snapshot_path)
+        self.config.start()
+        self.vector_store = VectorStore()
+        self.file_manager = FileManager(self.vector_store)
+
+    def tearDown(self):
+        self.config.stop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def retrieve(self, where):
+        return self.vector_store.retrieve_documents('alpha3 beta5', n_results=20, where=where)
+
+    def test_restored_store_keeps_files(self):
+        self.assertEqual(self.vector_store.collection.count(), 11)
+        self.assertEqual(self.file_manager.count_uploaded_files(), 2)
+
+        results = self.retrieve({'category': 'y'})
+        self.assertEqual(len(results['documents']), 10)
+        self.assertEqual({metadata['filename'] for metadata in results['metadatas']}, {'b.txt'})
+        self.assertEqual(len(self.retrieve({'filename': 'a.txt'})['documents']), 10)
+
+    def test_restored_store_deletes_and_deduplicates(self):
+        self.assertEqual(self.file_manager.delete_file_documents(self.files['a.txt']), 1)
+        self.assertEqual(self.vector_store.collection.count(), 10)
+        self.assertEqual(len(self.retrieve({'filename': 'b.txt'})['documents']), 10)
+
+        # Chunks already stored are referenced, not embedded again
+        path = os.path.join(self.directory, 'c.txt')
+        with open(path, 'w') as f:
+            f.write('\n\n'.join(paragraph(i) for i in range(1, 6)))
+        result = self.file_manager.process_saved_file(path, 'c.txt')
+        self.assertEqual(result['documents_added'], 0)
+
+        self.assertEqual(self.file_manager.delete_file_documents(self.files['b.txt']), 5)
+        self.assertEqual(self.vector_store.collection.count(), 5)
+
+if __name__ == '__main__':
+    unittest.main()
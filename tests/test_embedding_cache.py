@@ -0,0 +1,65 @@
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from services.embedding_cache import EmbeddingCache, CachedEmbeddingFunction
+
+def vector(i):
+    return np.full(4, i / 3, dtype=np.float32)
+
+class TestEmbeddingCache(unittest.TestCase):
+    """Hits, misses and least-recently-used eviction of the shared embedding cache"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = EmbeddingCache('model', self.directory, max_entries=4, dtype='float16')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_hits_and_misses(self):
+        self.cache.put_many({'a' * 64: vector(1), 'b' * 64: vector(2)})
+
+        found = self.cache.get_many(['a' * 64, 'c' * 64])
+        self.assertEqual(list(found), ['a' * 64])
+        np.testing.assert_array_equal(found['a' * 64], self.cache.round(vector(1)))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_evicts_least_recently_used(self):
+        hashes = [EmbeddingCache.hash_text(f"text {i}") for i in range(5)]
+        self.cache.put_many({text_hash: vector(i) for i, text_hash in enumerate(hashes[:4])})
+        self.cache.get_many([hashes[0]])
+
+        # Uses recorded since the last write count when choosing what to evict
+        self.cache.put_many({hashes[4]: vector(4)})
+        found = self.cache.get_many(hashes)
+        self.assertEqual(sorted(found), sorted([hashes[0], hashes[2], hashes[3], hashes[4]]))
+        np.testing.assert_array_equal(found[hashes[4]], self.cache.round(vector(4)))
+
+    def test_row_reused_by_another_process_reads_as_miss(self):
+        hashes = [EmbeddingCache.hash_text(f"text {i}") for i in range(8)]
+        self.cache.put_many({text_hash: vector(i) for i, text_hash in enumerate(hashes[:4])})
+        stale_slots = self.cache._lookup_slots([hashes[0]])
+
+        # Fills every row with other texts
+        other = EmbeddingCache('model', self.directory, max_entries=4, dtype='float16')
+        other.put_many({text_hash: vector(i) for i, text_hash in enumerate(hashes[4:])})
+
+        # As if the index was read just before the other process evicted the row
+        with mock.patch.object(self.cache, '_lookup_slots', return_value=stale_slots):
+            self.assertEqual(self.cache.get_many([hashes[0]]), {})
+
+    def test_hits_and_misses_embed_the_same_text_identically(self):
+        embed = mock.Mock(side_effect=lambda texts: [np.full(4, 0.1234567, dtype=np.float32) for _ in texts])
+        function = CachedEmbeddingFunction(embed, 'model', cache=self.cache)
+
+        miss = function(['text'])[0]
+        hit = function(['text'])[0]
+        self.assertEqual(embed.call_count, 1)
+        np.testing.assert_array_equal(miss, hit)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from openpyxl import Workbook
+
+from services.file_processor import FileProcessor
+
+class TestExcelExtraction(unittest.TestCase):
+    """Sheets extracted in the process pool match a single sequential pass"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'book.xlsx')
+
+        workbook = Workbook()
+        large = workbook.active
+        large.title = 'large'
+        large.append([None])
+        large.append(['id', 'name', 'score'])
+        for i in range(3000):
+            # Blank rows are skipped, so row numbers count data rows
+            large.append([i, f"name{i % 37}", i * 0.5] if i % 97 else [None])
+        workbook.create_sheet('small').append(['a', 'b'])
+        workbook['small'].append([1, 'x'])
+        workbook.create_sheet('empty')
+        workbook.create_sheet('last').append(['only header'])
+        workbook.save(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_parallel_sheets_match_sequential_pass(self):
+        sequential = list(FileProcessor(parallel=False)._iter_excel_blocks(self.path))
+        parallel = list(FileProcessor(parallel=True)._iter_excel_blocks(self.path))
+
+        self.assertEqual(parallel, sequential)
+
+        rows = [block['metadata'] for block in sequential
+                if block['metadata'].get('sheet') == 'large' and block['metadata']['block_type'] == 'rows']
+        self.assertEqual(rows[0]['row_start'], 1)
+        self.assertTrue(all(a['row_end'] + 1 == b['row_start'] for a, b in zip(rows, rows[1:])))
+        self.assertEqual(rows[-1]['row_end'], 3000 - 31)
+
+        summary = next(block['text'] for block in sequential
+                       if block['metadata'] == {'sheet': 'large', 'block_type': 'summary'})
+        self.assertIn("Total Rows: 2969", summary)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from tests.helpers import isolated_config
+
+def paragraph(i: int) -> str:
+    return ' '.join(f'{word}{i}' for word in ('alpha', 'beta', 'gamma', 'delta', 'omega') * 8)
+
+class TestSharedChunkFilters(unittest.TestCase):
+    """Files sharing deduplicated chunks, where each shared chunk is stored under the first file's hash"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config = isolated_config(self.directory, CHUNK_SIZE=300, CHUNK_OVERLAP=0, INGEST_BATCH_SIZE=4)
+        self.config.start()
+
+        from services.vector_store import VectorStore
+        from services.file_manager import FileManager
+        self.vector_store = VectorStore()
+        self.file_manager = FileManager(self.vector_store)
+
+        # b.txt shares 9 of its 10 chunks with a.txt
+        self.files = {}
+        for filename, paragraphs, category in (('a.txt', range(0, 10), 'x'), ('b.txt', range(1, 11), 'y')):
+            path = os.path.join(self.directory, filename)
+            with open(path, 'w') as f:
+                f.write('\n\n'.join(paragraph(i) for i in paragraphs))
+            result = self.file_manager.process_saved_file(path, filename, {'category': category})
+            self.assertEqual(result['chunks_created'], 10)
+            self.files[filename] = result['file_info']['file_hash']
+
+    def tearDown(self):
+        self.config.stop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def retrieve(self, where, mode='dense'):
+        return self.vector_store.retrieve_documents('alpha3 beta5', n_results=20, mode=mode, where=where)
+
+    def test_file_level_filters_find_shared_chunks(self):
+        for where in ({'filename': 'b.txt'}, {'category': 'y'}, {'file_hash': self.files['b.txt']}):
+            for mode in ('dense', 'hybrid'):
+                results = self.retrieve(where, mode)
+                self.assertEqual(len(results['documents']), 10, where)
+                self.assertEqual({metadata['filename'] for metadata in results['metadatas']}, {'b.txt'})
+                self.assertEqual({metadata['file_hash'] for metadata in results['metadatas']}, {self.files['b.txt']})
+
+        self.assertEqual(len(self.retrieve({'filename': 'a.txt'})['documents']), 10)
+
+    def test_combined_filters(self):
+        self.assertEqual(len(self.retrieve({'$or': [{'filename': 'a.txt'}, {'filename': 'b.txt'}]})['documents']), 11)
+        self.assertEqual(len(self.retrieve({'$and': [{'filename': 'b.txt'}, {'category': 'y'}]})['documents']), 10)
+        self.assertEqual(len(self.retrieve({'$and': [{'filename': 'b.txt'}, {'category': 'x'}]})['documents']), 0)
+
+        # Each file's chunks are checked against that file's attributes, as if it stored its own copies
+        results = self.retrieve({'category': {'$ne': 'x'}})
+        self.assertEqual(len(results['documents']), 10)
+        self.assertEqual({metadata['filename'] for metadata in results['metadatas']}, {'b.txt'})
+
+    def write(self, filename, paragraphs):
+        path = os.path.join(self.directory, filename)
+        with open(path, 'w') as f:
+            f.write('\n\n'.join(paragraph(i) for i in paragraphs))
+        return path
+
+    def test_update_keeps_chunks_of_other_files(self):
+        # The new b.txt keeps 5 chunks shared with a.txt and its own chunk 10
+        path = self.write('b2.txt', list(range(5, 11)) + [20, 21])
+        result = self.file_manager.process_saved_file(path, 'b2.txt', document_name='b.txt', mode='update')
+        self.assertEqual(result['chunks_reused'], 6)
+        self.assertEqual(result['documents_added'], 2)
+
+        self.assertEqual(len(self.retrieve({'filename': 'a.txt'})['documents']), 10)
+        results = self.retrieve({'document_name': 'b.txt'})
+        self.assertEqual(len(results['documents']), 8)
+        self.assertEqual({metadata['filename'] for metadata in results['metadatas']}, {'b2.txt'})
+
+        # Attributes of the previous version carry over
+        self.assertEqual(len(self.retrieve({'category': 'y'})['documents']), 8)
+
+    def test_failed_update_restores_previous_version(self):
+        path = self.write('b2.txt', list(range(10, 0, -1)) + [20])
+        chunks = list(self.file_manager.file_processor.iter_chunks(path, 'b2.txt',
+                                                                   self.file_manager.file_processor.get_file_info(path, 'b2.txt')))
+
+        def failing_chunks(*args):
+            yield from chunks[:8]
+            raise RuntimeError('extraction failed')
+
+        with mock.patch.object(self.file_manager.file_processor, 'iter_chunks', failing_chunks):
+            with self.assertRaises(RuntimeError):
+                self.file_manager.process_saved_file(path, 'b2.txt', document_name='b.txt', mode='update')
+
+        for filename in ('a.txt', 'b.txt'):
+            results = self.retrieve({'filename': filename})
+            self.assertEqual(len(results['documents']), 10)
+            self.assertEqual({metadata['file_hash'] for metadata in results['metadatas']}, {self.files[filename]})
+        self.assertEqual(len(self.retrieve({'filename': 'b2.txt'})['documents']), 0)
+
+    def test_delete_file_with_shared_chunks(self):
+        deleted = self.file_manager.delete_file_documents(self.files['a.txt'])
+        self.assertEqual(deleted, 1)
+        self.assertEqual(self.vector_store.file_registry.get_attributes([self.files['a.txt']]), {})
+
+        # Chunks b.txt shares stay stored under a.txt's hash and now resolve to b.txt
+        results = self.vector_store.retrieve_documents('alpha3 beta5', n_results=20)
+        self.assertEqual(len(results['documents']), 10)
+        self.assertEqual({metadata['filename'] for metadata in results['metadatas']}, {'b.txt'})
+        self.assertEqual(len(self.retrieve({'filename': 'b.txt'})['documents']), 10)
+        self.assertEqual(len(self.retrieve({'filename': 'a.txt'})['documents']), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from services.flat_index import FlatIndexCollection
+
+class TestSharedFlatIndex(unittest.TestCase):
+    """Two handles on one index directory, as two web workers would hold, see each other's changes"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.first = FlatIndexCollection(self.directory)
+        self.second = FlatIndexCollection(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_adds_and_deletes_are_visible_to_the_other_handle(self):
+        self.first.add(['a'], np.ones((1, 8)))
+        self.assertEqual(self.second.count(), 1)
+        self.assertEqual(self.second.query(np.ones((1, 8)), 5)['ids'], [['a']])
+
+        self.second.add(['b'], -np.ones((1, 8)))
+        self.first.delete(ids=['a'])
+        self.assertEqual(self.second.query(np.ones((1, 8)), 5)['ids'], [['b']])
+
+    def test_handles_never_share_a_slot(self):
+        vectors = np.eye(8)
+        for i in range(4):
+            self.first.add([f'first-{i}'], vectors[i:i + 1])
+            self.second.add([f'second-{i}'], vectors[4 + i:5 + i])
+        self.second.delete(ids=['first-0'])
+        self.first.add(['first-4'], -np.ones((1, 8)))
+
+        stored = self.first.get(include=['embeddings'])
+        self.assertEqual(len(stored['ids']), 8)
+        for doc_id, embedding in zip(stored['ids'], stored['embeddings']):
+            self.assertEqual(self.second.query(embedding[None, :], 1)['ids'], [[doc_id]])
+
+if __name__ == '__main__':
+    unittest.main()
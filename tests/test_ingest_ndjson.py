@@ -0,0 +1,54 @@
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from tests.helpers import isolated_config
+from config import Config
+
+class TestIngestNdjsonRoute(unittest.TestCase):
+    """The streaming route is not bound by the app-wide MAX_CONTENT_LENGTH"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config = isolated_config(self.directory, MAX_FILE_SIZE=1024)
+        self.config.start()
+
+        # The routes module builds its chatbot and job queue on import
+        from app import create_app
+        from api import routes
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+        self.added = []
+        patcher = mock.patch.object(routes.chatbot, 'add_documents_batch',
+                                    side_effect=lambda texts, metadatas: self.added.extend(texts) or texts)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.body = ''.join(json.dumps({'text': f'document {i} ' + 'x' * 100}) + '\n' for i in range(100)).encode()
+        self.assertGreater(len(self.body), self.app.config['MAX_CONTENT_LENGTH'])
+
+    def tearDown(self):
+        self.config.stop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_body_larger_than_max_content_length(self):
+        response = self.client.post('/ingest_ndjson?batch_size=16', data=self.body,
+                                    content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+
+        final = json.loads(response.get_data(as_text=True).splitlines()[-1])
+        self.assertTrue(final['done'])
+        self.assertEqual(final['written'], 100)
+        self.assertEqual(len(self.added), 100)
+
+    def test_body_limit(self):
+        with mock.patch.object(Config, 'NDJSON_MAX_BODY_BYTES', 2048):
+            response = self.client.post('/ingest_ndjson', data=self.body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.added, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import PyPDF2
+
+from config import Config
+from services.file_processor import FileProcessor
+
+def write_pdf(path, page_texts):
+    """A minimal PDF with one line of Helvetica text per page"""
+    page_ids = [4 + 2 * i for i in range(len(page_texts))]
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % i for i in page_ids)
+           + b"] /Count %d >>" % len(page_texts),
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    for page_id, text in zip(page_ids, page_texts):
+        stream = b"BT /F1 12 Tf 72 720 Td (" + text.encode() + b") Tj ET"
+        objects[page_id] = (b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+                            b"/Resources << /Font << /F1 3 0 R >> >> >>" % (page_id + 1))
+        objects[page_id + 1] = b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+
+    body = b"%PDF-1.4\n"
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(body)
+        body += b"%d 0 obj\n" % number + objects[number] + b"\nendobj\n"
+    xref = len(body)
+    body += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    body += b"".join(b"%010d 00000 n \n" % offsets[number] for number in sorted(objects))
+    body += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, 'wb') as f:
+        f.write(body)
+
+class TestPdfExtraction(unittest.TestCase):
+    """PDF pages come out in order, whether read by one reader or by page-range pool tasks"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'doc.pdf')
+        write_pdf(self.path, [f"Page {i + 1} text" for i in range(12)])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_sequential_pass_uses_one_reader(self):
+        with mock.patch.object(PyPDF2, 'PdfReader', wraps=PyPDF2.PdfReader) as reader:
+            blocks = list(FileProcessor(parallel=False)._iter_pdf_blocks(self.path))
+
+        self.assertEqual(reader.call_count, 1)
+        self.assertEqual([block['metadata']['page'] for block in blocks], list(range(1, 13)))
+        self.assertEqual(blocks[4]['text'].strip(), "Page 5 text")
+
+    def test_pool_tasks_match_sequential_pass(self):
+        sequential = list(FileProcessor(parallel=False)._iter_pdf_blocks(self.path))
+        with mock.patch.multiple(Config, PDF_PARALLEL_MIN_PAGES=1, PDF_PAGES_PER_TASK=5):
+            parallel = list(FileProcessor(parallel=True)._iter_pdf_blocks(self.path))
+
+        self.assertEqual(parallel, sequential)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import shutil
+import tempfile
+import unittest
+
+from tests.helpers import isolated_config
+
+class TestShardsAcrossWorkers(unittest.TestCase):
+    """Shards added through one VectorStore, as by one web worker, are used by another on the same data"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config = isolated_config(self.directory)
+        self.config.start()
+
+        from services.vector_store import VectorStore
+        self.first = VectorStore()
+        self.second = VectorStore()
+        self.first.add_documents_batch([f"document {i}" for i in range(20)],
+                                       [{'file_hash': f"file{i}"} for i in range(20)])
+
+    def tearDown(self):
+        self.config.stop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def shard_names(self, vector_store):
+        return [shard['name'] for shard in vector_store.list_shards()]
+
+    def test_unsharded_store_switches_to_shards(self):
+        self.first.add_shards(2)
+
+        self.assertEqual(self.shard_names(self.second), self.shard_names(self.first))
+        self.assertEqual(self.second.collection.count(), 20)
+
+    def test_sharded_store_routes_to_shards_added_elsewhere(self):
+        self.first.add_shards(1)
+        self.second.add_shards(1)
+        self.assertEqual(len(self.shard_names(self.first)), 3)
+
+        self.first.add_documents_batch([f"extra {i}" for i in range(20)],
+                                       [{'file_hash': f"extra{i}"} for i in range(20)])
+        self.assertEqual(self.first.list_shards(), self.second.list_shards())
+        self.assertEqual(self.second.collection.count(), 40)
+
+if __name__ == '__main__':
+    unittest.main()
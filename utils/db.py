@@ -0,0 +1,26 @@
+import sqlite3
+import threading
+from pathlib import Path
+
+_local = threading.local()
+
+def get_connection(db_path: str) -> sqlite3.Connection:
+    """Get a thread-local SQLite connection in WAL mode"""
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(db_path)
+    if conn is None:
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        conn = sqlite3.connect(db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+
+        # WAL lets readers proceed while a writer holds the database
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+
+        connections[db_path] = conn
+
+    return conn
@@ -0,0 +1,36 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.managers import SyncManager
+from config import Config
+
+_pool = None
+_manager = None
+_pool_lock = threading.Lock()
+
+def get_process_pool_size() -> int:
+    """Number of worker processes in the shared pool"""
+    return Config.PROCESS_POOL_WORKERS or os.cpu_count() or 1
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Get the shared process pool used for CPU-bound file processing"""
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            # Spawn rather than fork: the web process runs request and ingestion threads
+            _pool = ProcessPoolExecutor(
+                max_workers=get_process_pool_size(),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+def get_manager() -> SyncManager:
+    """Get the shared manager whose queues can be handed to pool tasks"""
+    global _manager
+
+    with _pool_lock:
+        if _manager is None:
+            _manager = multiprocessing.get_context('spawn').Manager()
+        return _manager
@@ -0,0 +1,114 @@
+import re
+from collections import deque
+from typing import List, Iterator, Tuple, Optional
+
+Span = Tuple[int, int]
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", ".", "!", "?", ",", " ", ""]
+
+class RecursiveTextSplitter:
+    """Recursive character text splitter that works on character offsets
+
+    Follows the semantics of langchain's RecursiveCharacterTextSplitter with
+    keep_separator=True and strip_whitespace=True: split on the first
+    separator present, keep each separator at the start of the following
+    piece, merge pieces up to chunk_size with chunk_overlap, and recurse into
+    pieces that are still too long with the remaining separators. Splits are
+    tracked as (start, end) spans into the original text, so no intermediate
+    strings are created and chunks are produced lazily.
+    """
+
+    def __init__(self, chunk_size: int, chunk_overlap: int, separators: Optional[List[str]] = None):
+        if chunk_overlap > chunk_size:
+            raise ValueError(f"Chunk overlap ({chunk_overlap}) is larger than chunk size ({chunk_size})")
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = separators if separators is not None else DEFAULT_SEPARATORS
+        self._patterns = [re.compile(re.escape(separator)) if separator else None for separator in self.separators]
+
+    def split_text(self, text: str) -> List[str]:
+        """Split text into chunk strings"""
+        return [text[start:end] for start, end in self.iter_spans(text)]
+
+    def iter_spans(self, text: str) -> Iterator[Span]:
+        """Lazily yield (start, end) offsets of each chunk"""
+        yield from self._split(text, 0, len(text), 0)
+
+    def _choose_separator(self, text: str, start: int, end: int, level: int) -> Tuple[int, Optional[int]]:
+        """Pick the first separator present in text[start:end]; return it and the level to recurse with"""
+        for i in range(level, len(self.separators)):
+            if not self.separators[i]:
+                return i, None
+            if self._patterns[i].search(text, start, end):
+                return i, i + 1 if i + 1 < len(self.separators) else None
+        return len(self.separators) - 1, None
+
+    def _pieces(self, text: str, start: int, end: int, separator_index: int) -> Iterator[Span]:
+        """Split text[start:end] on a separator, keeping it at the start of each following piece"""
+        pattern = self._patterns[separator_index]
+        if pattern is None:
+            for i in range(start, end):
+                yield (i, i + 1)
+            return
+
+        piece_start = start
+        for match in pattern.finditer(text, start, end):
+            if match.start() > piece_start:
+                yield (piece_start, match.start())
+            piece_start = match.start()
+        if end > piece_start:
+            yield (piece_start, end)
+
+    def _split(self, text: str, start: int, end: int, level: int) -> Iterator[Span]:
+        separator_index, next_level = self._choose_separator(text, start, end, level)
+
+        good_splits = []
+        for piece_start, piece_end in self._pieces(text, start, end, separator_index):
+            if piece_end - piece_start < self.chunk_size:
+                good_splits.append((piece_start, piece_end))
+                continue
+
+            if good_splits:
+                yield from self._merge(text, good_splits)
+                good_splits = []
+
+            if next_level is None:
+                yield (piece_start, piece_end)
+            else:
+                yield from self._split(text, piece_start, piece_end, next_level)
+
+        if good_splits:
+            yield from self._merge(text, good_splits)
+
+    def _merge(self, text: str, splits: List[Span]) -> Iterator[Span]:
+        """Merge contiguous splits into chunks of at most chunk_size with overlap"""
+        current = deque()
+        total = 0
+
+        for split_start, split_end in splits:
+            length = split_end - split_start
+
+            if total + length > self.chunk_size and current:
+                yield from self._strip(text, current[0][0], current[-1][1])
+
+                # Drop splits from the front until the remainder fits as overlap
+                while total > self.chunk_overlap or (total + length > self.chunk_size and total > 0):
+                    dropped_start, dropped_end = current.popleft()
+                    total -= dropped_end - dropped_start
+
+            current.append((split_start, split_end))
+            total += length
+
+        if current:
+            yield from self._strip(text, current[0][0], current[-1][1])
+
+    @staticmethod
+    def _strip(text: str, start: int, end: int) -> Iterator[Span]:
+        """Trim surrounding whitespace from a span, yielding it only if anything is left"""
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end > start:
+            yield (start, end)
@@ -0,0 +1,103 @@
+import io
+import os
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import BinaryIO
+from flask import Request
+from config import Config
+
+class HashingSpooledFile(io.RawIOBase):
+    """Spooled upload buffer that computes SHA-256 while bytes are written
+
+    Data is kept in memory until it exceeds max_size, then rolled over to a
+    named temporary file in the upload folder so it can later be moved into
+    place without copying.
+    """
+
+    def __init__(self, max_size: int = None, dir: str = None):
+        super().__init__()
+        self.max_size = max_size if max_size is not None else Config.UPLOAD_SPOOL_MAX_SIZE
+        self.dir = dir or Config.UPLOAD_FOLDER
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._file = io.BytesIO()
+        self._temp_path = None
+
+    def hexdigest(self) -> str:
+        """SHA-256 of everything written so far"""
+        return self._sha256.hexdigest()
+
+    def _rollover(self) -> None:
+        """Move the in-memory buffer to a named file on disk"""
+        Path(self.dir).mkdir(parents=True, exist_ok=True)
+        disk_file = tempfile.NamedTemporaryFile(dir=self.dir, prefix='.upload_', delete=False)
+        disk_file.write(self._file.getbuffer())
+        self._file = disk_file
+        self._temp_path = disk_file.name
+
+    def write(self, data) -> int:
+        self._sha256.update(data)
+        written = self._file.write(data)
+        self.size += written
+
+        if isinstance(self._file, io.BytesIO) and self.size > self.max_size:
+            self._rollover()
+
+        return written
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+    def readinto(self, buffer) -> int:
+        return self._file.readinto(buffer)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def persist(self, file_path: str) -> None:
+        """Store the received bytes at file_path, renaming instead of copying when on disk"""
+        if self._temp_path:
+            self._file.close()
+            os.replace(self._temp_path, file_path)
+            self._temp_path = None
+            self._file = open(file_path, 'rb')
+        else:
+            with open(file_path, 'wb') as f:
+                f.write(self._file.getbuffer())
+
+    def close(self) -> None:
+        if not self.closed:
+            self._file.close()
+            if self._temp_path and os.path.exists(self._temp_path):
+                os.remove(self._temp_path)
+        super().close()
+
+def receive_stream(stream: BinaryIO, block_size: int = 64 * 1024) -> HashingSpooledFile:
+    """Read a raw request body into a hashing spooled file"""
+    spooled = HashingSpooledFile()
+    for block in iter(lambda: stream.read(block_size), b""):
+        spooled.write(block)
+    spooled.seek(0)
+    return spooled
+
+class HashingRequest(Request):
+    """Request whose multipart file parts are hashed as they are received"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingSpooledFile()